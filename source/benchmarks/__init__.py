@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+PyScribus benchmarks.
+
+Written for `asv <https://asv.readthedocs.io>`_ (``asv run`` in the
+directory of ``asv.conf.json``), but can also be run without it with
+``python -m benchmarks``.
+"""
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Minimal runner of the asv benchmarks, for when asv is not installed.
+
+Runs each time_* and peakmem_* benchmark once per parameter set, and
+prints the wall time or the peak memory.
+
+As with asv, peak memory is the peak resident set size (RSS) of a new
+process running the setup and the benchmark, so it includes memory
+allocated by lxml and Pillow. Without the resource module (Windows), it
+is the peak of memory allocated by Python (tracemalloc), labelled
+"Python heap": allocations of lxml and Pillow are missing.
+
+Usage::
+
+    python -m benchmarks [--max-objects N] [name filter]
+
+--max-objects skips parameter sets with more page objects than N
+(1000 by default, 0 for no limit).
+"""
+
+# Imports ===============================================================#
+
+import sys
+import time
+import inspect
+import itertools
+import importlib
+import tracemalloc
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+MODULES = [
+    "benchmarks.bench_sla",
+    "benchmarks.bench_stories",
+    "benchmarks.bench_tables",
+    "benchmarks.bench_wireframe",
+]
+
+# Fonctions =============================================================#
+
+def parameter_sets(bench_class):
+    """
+    Returns the parameter sets of an asv benchmark class, as tuples.
+    """
+
+    params = getattr(bench_class, "params", [])
+
+    if not params:
+        return [()]
+
+    if isinstance(params[0], list):
+        return list(itertools.product(*params))
+
+    return [(p,) for p in params]
+
+def peak_rss(module_name: str, class_name: str, method_name: str,
+        params: tuple):
+    """
+    Run a peakmem benchmark, returns the peak RSS of the process in
+    bytes. Run in a new process by run_one(), which reads the printed
+    value.
+    """
+
+    bench_class = getattr(importlib.import_module(module_name), class_name)
+    instance = bench_class()
+
+    if hasattr(instance, "setup"):
+        instance.setup(*params)
+
+    getattr(instance, method_name)(*params)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak
+
+    return peak * 1024
+
+def run_one(bench_class, method_name, params):
+    """
+    Run a benchmark method once, returns its result as a string.
+    """
+
+    if method_name.startswith("peakmem_") and resource is not None:
+        code = "import benchmarks.__main__ as b; print(b.peak_rss{!r})".format(
+            (bench_class.__module__, bench_class.__name__, method_name, params)
+        )
+
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, check=True
+        )
+
+        peak = int(process.stdout.split()[-1])
+
+        return "{:.1f} MiB".format(peak / 1048576)
+
+    instance = bench_class()
+
+    if hasattr(instance, "setup"):
+        instance.setup(*params)
+
+    method = getattr(instance, method_name)
+
+    if method_name.startswith("peakmem_"):
+        tracemalloc.start()
+        method(*params)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return "{:.1f} MiB (Python heap)".format(peak / 1048576)
+
+    start = time.perf_counter()
+    method(*params)
+    elapsed = time.perf_counter() - start
+
+    return "{:.4f} s".format(elapsed)
+
+def main(argv):
+    max_objects = 1000
+    name_filter = ""
+
+    args = list(argv)
+
+    while args:
+        arg = args.pop(0)
+
+        if arg == "--max-objects":
+            max_objects = int(args.pop(0))
+        else:
+            name_filter = arg
+
+    for module_name in MODULES:
+
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as error:
+            print("{}: skipped ({})".format(module_name, error))
+            continue
+
+        for class_name, bench_class in inspect.getmembers(
+                module, inspect.isclass):
+
+            if bench_class.__module__ != module.__name__:
+                continue
+
+            for method_name in dir(bench_class):
+
+                if not method_name.startswith(("time_", "peakmem_")):
+                    continue
+
+                full_name = "{}.{}.{}".format(
+                    module_name.split(".")[-1], class_name, method_name
+                )
+
+                if name_filter not in full_name:
+                    continue
+
+                for params in parameter_sets(bench_class):
+                    too_big = [
+                        p for p in params
+                        if isinstance(p, int) and max_objects
+                        and p > max_objects
+                    ]
+
+                    if too_big:
+                        continue
+
+                    try:
+                        result = run_one(bench_class, method_name, params)
+                    except ImportError as error:
+                        result = "skipped ({})".format(error)
+                    except Exception as error:
+                        result = "failed ({}: {})".format(
+                            type(error).__name__, error
+                        )
+
+                    print(
+                        "{}{}: {}".format(
+                            full_name,
+                            list(params) if params else "",
+                            result
+                        )
+                    )
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of SLA parsing and serialization.
+"""
+
+# Imports ===============================================================#
+
+from benchmarks import synthetic
+
+import pyscribus.dimensions as dimensions
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Classes ===============================================================#
+
+class DocumentSize:
+    """
+    Parsing and serialization of documents from 10 to 100k page objects,
+    with short stories.
+    """
+
+    params = synthetic.DOCUMENT_SIZES
+    param_names = ["objects"]
+    timeout = 1800
+
+    def setup(self, objects):
+        self.slafile = synthetic.document(objects)
+        self.xml_string = synthetic.tostring(self.slafile)
+
+    def time_parse(self, objects):
+        synthetic.fromstring(self.xml_string)
+
+    def time_serialize(self, objects):
+        synthetic.tostring(self.slafile)
+
+    def peakmem_parse(self, objects):
+        synthetic.fromstring(self.xml_string)
+
+    def peakmem_serialize(self, objects):
+        synthetic.tostring(self.slafile)
+
+
+class StoryLength:
+    """
+    Parsing and serialization of documents with short to book-length
+    stories.
+    """
+
+    params = list(synthetic.STORY_LENGTHS.keys())
+    param_names = ["story_length"]
+    timeout = 1800
+
+    def setup(self, story_length):
+        self.slafile = synthetic.document(10, story_length)
+        self.xml_string = synthetic.tostring(self.slafile)
+
+    def time_parse(self, story_length):
+        synthetic.fromstring(self.xml_string)
+
+    def time_serialize(self, story_length):
+        synthetic.tostring(self.slafile)
+
+    def peakmem_parse(self, story_length):
+        synthetic.fromstring(self.xml_string)
+
+
+class Copy:
+    """
+    Copies of whole documents, and XML round trip of the copies.
+    """
+
+    params = [10, 1000]
+    param_names = ["objects"]
+
+    def setup(self, objects):
+        self.slafile = synthetic.document(objects)
+
+    def time_document_copy(self, objects):
+        self.slafile.document.copy()
+
+    def time_sla_copy_roundtrip(self, objects):
+        synthetic.fromstring(synthetic.tostring(self.slafile.copy()))
+
+
+class Formatting:
+    """
+    Conversion of dimensions from and to XML strings, as done for every
+    attribute of every page object.
+    """
+
+    def setup(self):
+        self.values = [str(round(index * 0.25, 2)) for index in range(10000)]
+        self.dims = [
+            dimensions.Dim(float(value)) for value in self.values
+        ]
+
+    def time_dim_fromxml(self):
+        for value in self.values:
+            dimensions.Dim(float(value), "pt")
+
+    def time_dim_toxml(self):
+        for dim in self.dims:
+            dim.toxmlstr()
+            dim.toxmlstr(True)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
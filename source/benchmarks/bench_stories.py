@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of stories building and templating.
+"""
+
+# Imports ===============================================================#
+
+import random
+
+from benchmarks import synthetic
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Classes ===============================================================#
+
+class StoryBuilding:
+    """
+    Story building with Story.append_paragraphs, from a short story to a
+    book-length one.
+    """
+
+    params = list(synthetic.STORY_LENGTHS.keys())
+    param_names = ["story_length"]
+    timeout = 1800
+
+    def time_append_paragraphs(self, story_length):
+        synthetic.story(random.Random(synthetic.SEED), story_length)
+
+    def peakmem_append_paragraphs(self, story_length):
+        synthetic.story(random.Random(synthetic.SEED), story_length)
+
+
+class Templating:
+    """
+    Templating of all the stories of a document.
+    """
+
+    params = [[10, 1000, 10000], ["short", "chapter"]]
+    param_names = ["objects", "story_length"]
+    timeout = 1800
+
+    datas = {
+        "%Title%": "A title",
+        "%Lead%": "Some lead",
+        "%Author%": "Somebody",
+    }
+
+    def setup(self, objects, story_length):
+        self.slafile = synthetic.document(objects, story_length)
+
+    def time_templatable_stories(self, objects, story_length):
+        self.slafile.templatable_stories()
+
+    def time_feed_templatable(self, objects, story_length):
+        for story in self.slafile.templatable_stories():
+            story.feed_templatable(Templating.datas)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
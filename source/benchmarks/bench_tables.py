@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of table frames building.
+"""
+
+# Imports ===============================================================#
+
+import random
+
+from benchmarks import synthetic
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Classes ===============================================================#
+
+class TableBuilding:
+    """
+    Table frames of rows × rows cells, built with append_rows and
+    append_columns.
+    """
+
+    params = [4, 16, 64]
+    param_names = ["rows"]
+    timeout = 600
+
+    def setup(self, rows):
+        self.slafile = synthetic.document(0)
+        self.table = self._build(rows)
+
+    def _build(self, rows):
+        return synthetic.table(
+            random.Random(synthetic.SEED),
+            self.slafile, self.slafile.document, 1, 0, 0, rows, rows
+        )
+
+    def time_build(self, rows):
+        self._build(rows)
+
+    def time_toxml(self, rows):
+        self.table.toxml()
+
+    def peakmem_build(self, rows):
+        self._build(rows)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmarks of wireframe drawing (requires Pillow).
+"""
+
+# Imports ===============================================================#
+
+import io
+
+from benchmarks import synthetic
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Classes ===============================================================#
+
+class WireframeDrawing:
+    """
+    Wireframe of documents from 10 to 10k page objects, with the Pillow
+    and the SVG backends.
+    """
+
+    params = [[10, 1000, 10000], ["pillow", "svg"]]
+    param_names = ["objects", "backend"]
+    timeout = 1800
+
+    def setup(self, objects, backend):
+        # Imported here so other benchmarks don't require Pillow
+        import pyscribus.extra.wireframe as wireframe
+
+        self.slafile = synthetic.document(objects)
+
+        self.wireframe = wireframe.Wireframe()
+        self.wireframe.from_sla(self.slafile)
+
+    def _draw(self, backend):
+        if backend == "svg":
+            # Written in memory, to not measure the disk
+            return self.wireframe.draw(
+                backend="svg", stylesheet=True, output=io.StringIO()
+            )
+
+        return self.wireframe.draw(stylesheet=True)
+
+    def time_draw(self, objects, backend):
+        self._draw(backend)
+
+    def peakmem_draw(self, objects, backend):
+        self._draw(backend)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Deterministic generator of synthetic SLA documents for benchmarks.
+
+The same size, story length and seed always produce the same document.
+"""
+
+# Imports ===============================================================#
+
+import math
+import random
+
+import lxml.etree as ET
+
+import pyscribus.sla as sla
+import pyscribus.pages as pages
+import pyscribus.stories as stories
+import pyscribus.pageobjects as pageobjects
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+SEED = 1337
+
+VERSION = "1.5.5"
+
+# Page objects per page
+PER_PAGE = 12
+
+# Paragraphs count of each story length
+STORY_LENGTHS = {
+    "short": 3,
+    "chapter": 200,
+    "book": 5000,
+}
+
+# Page objects count of each document size
+DOCUMENT_SIZES = [10, 1000, 10000, 100000]
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim "
+    "veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea "
+    "commodo consequat duis aute irure in reprehenderit voluptate velit "
+    "esse cillum fugiat nulla pariatur excepteur sint occaecat cupidatat "
+    "non proident sunt culpa qui officia deserunt mollit anim id est "
+    "laborum"
+).split()
+
+PLACEHOLDERS = ["%Title%", "%Lead%", "%Author%"]
+
+# Fonctions =============================================================#
+
+def paragraph(rng, words=40):
+    """
+    Returns a paragraph in PSM (PyScribus Story Markup) with some
+    emphasis.
+
+    :type rng: random.Random
+    :param rng: Random generator
+    :type words: int
+    :param words: Words count
+    :rtype: str
+    """
+
+    text = []
+
+    for index in range(words):
+        word = rng.choice(WORDS)
+        draw = rng.random()
+
+        if draw < 0.05:
+            word = "<em>{}</em>".format(word)
+        elif draw < 0.08:
+            word = "<strong>{}</strong>".format(word)
+
+        text.append(word)
+
+    return " ".join(text)
+
+def story(rng, length="short", sla_parent=False, doc_parent=False,
+        pgo_parent=False):
+    """
+    Returns a story with a templatable title and lead, followed by
+    paragraphs of text.
+
+    :type rng: random.Random
+    :param rng: Random generator
+    :type length: str, int
+    :param length: Key of STORY_LENGTHS, or paragraphs count
+    :rtype: pyscribus.stories.Story
+    """
+
+    if isinstance(length, str):
+        length = STORY_LENGTHS[length]
+
+    new_story = stories.Story(sla_parent, doc_parent, pgo_parent)
+    new_story.fromdefault()
+
+    new_story.append_paragraphs(
+        [{"text": PLACEHOLDERS[0]}, {"text": PLACEHOLDERS[1]}]
+    )
+
+    new_story.append_paragraphs(
+        [
+            {"text": paragraph(rng, rng.randint(20, 80))}
+            for i in range(length)
+        ]
+    )
+
+    return new_story
+
+def table(rng, slafile, document, object_id, x, y, rows=4, columns=3):
+    """
+    Returns a table frame of rows × columns cells, built with
+    TableObject.append_rows and TableObject.append_columns.
+
+    :rtype: pyscribus.pageobjects.TableObject
+    """
+
+    frame = pageobjects.TableObject(
+        slafile, document, posx=x, posy=y, width=90, height=20
+    )
+    frame.object_id = str(object_id)
+
+    first = pageobjects.TableCell(
+        frame, default=True, row=0, column=0,
+        posx=0, posy=0, width=30, height=20, fillshade=100
+    )
+    frame.cells.append(first)
+
+    if rows > 1:
+        frame.append_rows(rows - 1)
+
+    if columns > 1:
+        frame.append_columns(columns - 1)
+
+    for cell in frame.cells:
+        cell.story.append_paragraph(text=rng.choice(WORDS))
+
+    return frame
+
+def document(objects=10, story_length="short", seed=SEED):
+    """
+    Returns a SLA made from Document.fromdefault, with objects page
+    objects spread over as many pages as needed.
+
+    About 70% of page objects are text frames, 15% image frames and
+    15% table frames.
+
+    :type objects: int
+    :param objects: Page objects count
+    :type story_length: str, int
+    :param story_length: Story length of text frames (see STORY_LENGTHS)
+    :type seed: int
+    :param seed: Random generator seed
+    :rtype: pyscribus.sla.SLA
+    """
+
+    rng = random.Random(seed)
+
+    slafile = sla.SLA(version=VERSION, templating=True)
+    slafile.fromdefault()
+
+    doc = slafile.document
+
+    # --- Pages ---------------------------------------------------------
+
+    doc.pages = []
+    page_count = max(1, math.ceil(objects / PER_PAGE))
+
+    for number in range(1, page_count + 1):
+        page = pages.Page()
+        page.fromdefault()
+        page.number = number
+
+        height = page.box.dims["height"].value
+
+        page.box.set_box(
+            top_lx=100.0, top_ly=20.0 + (number - 1) * (height + 40),
+            width=page.box.dims["width"].value,
+            height=height
+        )
+
+        doc.pages.append(page)
+
+    doc.page_number = page_count
+
+    # --- Page objects --------------------------------------------------
+
+    for index in range(objects):
+        page = doc.pages[index // PER_PAGE]
+        slot = index % PER_PAGE
+
+        x = page.box.getx("top-left") + 40 + (slot % 3) * 170
+        y = page.box.gety("top-left") + 40 + (slot // 3) * 190
+
+        draw = rng.random()
+
+        if draw < 0.7:
+            frame = pageobjects.TextObject(
+                slafile, doc, posx=x, posy=y, width=160, height=180
+            )
+            frame.stories.append(
+                story(rng, story_length, slafile, doc, frame)
+            )
+            frame.have_stories = True
+            frame.columns["count"] = 1
+
+        elif draw < 0.85:
+            frame = pageobjects.ImageObject(
+                slafile, doc, posx=x, posy=y, width=160, height=180,
+                filepath="images/image-{:06d}.png".format(index)
+            )
+
+        else:
+            frame = table(rng, slafile, doc, index + 1, x, y)
+
+        # NOTE Quick setup of posx, posy, width, height doesn't update
+        # all the corners of the box
+
+        frame.box.set_box(
+            top_lx=x, top_ly=y,
+            width=frame.box.dims["width"].value,
+            height=frame.box.dims["height"].value
+        )
+
+        frame.object_id = str(index + 1)
+        frame.own_page = page.number - 1
+        frame.layer = rng.randint(0, 1) if len(doc.layers) > 1 else 0
+
+        doc.append(frame)
+
+    return slafile
+
+def tostring(slafile):
+    """
+    Serialize a SLA as SLA.save does, without writing a file.
+
+    :type slafile: pyscribus.sla.SLA
+    :rtype: bytes
+    """
+
+    return ET.tostring(
+        slafile.toxml(), encoding="UTF-8",
+        xml_declaration=True, pretty_print=True
+    )
+
+def fromstring(xml_string):
+    """
+    Parse a SLA from bytes, as SLA.parse does with a file.
+
+    :type xml_string: bytes
+    :rtype: pyscribus.sla.SLA
+    """
+
+    slafile = sla.SLA(version=VERSION, templating=True)
+    slafile.fromxml(ET.fromstring(xml_string))
+
+    return slafile
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
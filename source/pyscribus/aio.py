@@ -0,0 +1,340 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Loading, saving and rendering SLA files with asyncio.
+
+Parsing, serialization and rendering are done in a thread or process
+executor, so they don't block the event loop. The number of jobs running
+at the same time is bounded: other jobs wait their turn in the event
+loop, without having been sent to the executor.
+
+Cancelling the task of a job stops it:
+
+- before it starts, for all executors;
+- while it runs, for thread executors: while the file is read or
+  written, and between the elements (pages, page objects…) of the
+  document as it is built from XML or exported to XML. A cancelled
+  saving doesn't leave a truncated file.
+
+A page object is always built or exported to its end, so a job can
+still run for as long as its biggest page object (a long story, a big
+table) takes. Wireframe drawing is not interrupted once it starts.
+
+A job cancelled while it runs in a process executor runs to its end in
+its process, and the result is discarded. In all cases, a job keeps its
+slot until it stops.
+
+Rendering needs Pillow (see :mod:`pyscribus.extra.wireframe`).
+
+:Example:
+
+.. code:: python
+
+   import concurrent.futures
+   import pyscribus.aio as aio
+
+   # Two jobs at most, in two worker processes
+   aio.configure(
+       concurrent.futures.ProcessPoolExecutor(max_workers=2), max_jobs=2
+   )
+
+   async def handle(path):
+       slafile = await aio.load(path)
+
+       await slafile.save_async(path + ".gz")
+
+       return await aio.render(slafile, backend="svg")
+
+"""
+
+# Imports ===============================================================#
+
+import os
+import asyncio
+import threading
+import weakref
+
+import concurrent.futures as futures
+
+import pyscribus.sla as sla
+import pyscribus.exceptions as exceptions
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Jobs running at the same time, if not set
+DEFAULT_MAX_JOBS = min(4, os.cpu_count() or 1)
+
+# JobRunner used by the module functions
+RUNNER = None
+
+# Classes ===============================================================#
+
+class JobRunner:
+    """
+    Runs parsing, saving and rendering jobs in an executor.
+
+    :type executor: concurrent.futures.Executor
+    :param executor: Executor of the jobs. If None, a ThreadPoolExecutor
+        of max_jobs threads, created when the first job runs.
+    :type max_jobs: int
+    :param max_jobs: Count of jobs running at the same time.
+        DEFAULT_MAX_JOBS if None.
+
+    :ivar bool processes: True if the executor runs jobs in other
+        processes. SLA objects are then pickled, and can't be cancelled
+        while they run.
+    """
+
+    def __init__(self, executor=None, max_jobs=None):
+        if max_jobs is None:
+            max_jobs = DEFAULT_MAX_JOBS
+
+        if max_jobs < 1:
+            raise ValueError("max_jobs must be 1 or more.")
+
+        self.executor = executor
+        self.max_jobs = max_jobs
+
+        self.processes = isinstance(executor, futures.ProcessPoolExecutor)
+
+        # Event loop -> asyncio.Semaphore
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = futures.ThreadPoolExecutor(
+                max_workers=self.max_jobs,
+                thread_name_prefix="pyscribus"
+            )
+
+        return self.executor
+
+    def _semaphore(self, loop):
+        if (semaphore := self._semaphores.get(loop)) is None:
+            semaphore = asyncio.Semaphore(self.max_jobs)
+            self._semaphores[loop] = semaphore
+
+        return semaphore
+
+    async def run(self, function, *args):
+        """
+        Run function(*args, cancelled) in the executor.
+
+        cancelled is a threading.Event set when the task is cancelled, or
+        None with a process executor.
+
+        :rtype: object
+        :returns: Returned value of function
+        """
+
+        loop = asyncio.get_running_loop()
+
+        async with self._semaphore(loop):
+            cancelled = None if self.processes else threading.Event()
+
+            job = self._executor().submit(function, *args, cancelled)
+
+            try:
+                return await asyncio.wrap_future(job)
+
+            except asyncio.CancelledError:
+
+                if cancelled is not None:
+                    cancelled.set()
+
+                # The job keeps its slot until it stops
+                if not job.cancel():
+                    try:
+                        await asyncio.wrap_future(job)
+                    except Exception:
+                        pass
+
+                raise
+
+    async def load(self, filepath: str, version: str = "", **kwargs):
+        """
+        Returns a SLA parsed from a file path.
+
+        :type filepath: str
+        :param filepath: SLA file path
+        :type version: str
+        :param version: See pyscribus.sla.SLA
+        :type kwargs: dict
+        :param kwargs: See pyscribus.sla.SLA kwargs table. With a process
+            executor, mapImages is ignored.
+        :rtype: pyscribus.sla.SLA
+        :raises pyscribus.exceptions.Cancelled: If cancelled while parsing
+        """
+
+        if self.processes:
+            kwargs.pop("mapImages", None)
+
+        return await self.run(_load, filepath, version, kwargs)
+
+    async def save(self, slafile, filepath: str, compression="auto",
+                   level=None):
+        """
+        Save a SLA file.
+
+        With a process executor, embedded images data of a memory-mapped
+        SLA file is copied in memory before the SLA is sent to the
+        executor.
+
+        :type slafile: pyscribus.sla.SLA
+        :param slafile: SLA to save
+        :type filepath: str
+        :param filepath: SLA file path
+        :type compression: str, bool
+        :param compression: See pyscribus.sla.SLA.save()
+        :type level: int
+        :param level: See pyscribus.sla.SLA.save()
+        :rtype: boolean
+        :returns: True if successfull
+        :raises pyscribus.exceptions.Cancelled: If cancelled while writing
+        """
+
+        if self.processes:
+            slafile.blobs.detach()
+
+        return await self.run(_save, slafile, filepath, compression, level)
+
+    async def render(self, source, **kwargs):
+        """
+        Draw the wireframe of a SLA.
+
+        :type source: pyscribus.sla.SLA, str
+        :param source: SLA, or SLA file path
+        :type kwargs: dict
+        :param kwargs: Draw options of
+            pyscribus.extra.wireframe.Wireframe.draw()
+        :returns: See pyscribus.extra.wireframe.Wireframe.draw()
+        :raises pyscribus.exceptions.Cancelled: If cancelled while parsing
+        """
+
+        if self.processes and isinstance(source, sla.SLA):
+            source.blobs.detach()
+
+        return await self.run(_render, source, kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Shutdown the executor.
+
+        :type wait: bool
+        :param wait: Wait for the running jobs
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+# Fonctions =============================================================#
+
+def _cancel_point(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise exceptions.Cancelled()
+
+def _load(filepath: str, version: str, kwargs: dict, cancelled=None):
+    if cancelled is not None:
+        kwargs = dict(kwargs, cancelled=cancelled)
+
+    return sla.SLA(filepath, version, **kwargs)
+
+def _save(slafile, filepath: str, compression, level, cancelled=None):
+    _cancel_point(cancelled)
+
+    return slafile.save(filepath, compression, level, cancelled)
+
+def _render(source, kwargs: dict, cancelled=None):
+    import pyscribus.extra.wireframe as wireframe
+
+    if isinstance(source, str):
+        source = _load(source, "", {}, cancelled)
+
+    _cancel_point(cancelled)
+
+    canvas = wireframe.Wireframe()
+    canvas.from_sla(source)
+
+    _cancel_point(cancelled)
+
+    return canvas.draw(**kwargs)
+
+def configure(executor=None, max_jobs=None):
+    """
+    Set the executor and the count of jobs running at the same time of
+    the module functions.
+
+    The previous executor is not shut down.
+
+    :type executor: concurrent.futures.Executor
+    :param executor: See JobRunner
+    :type max_jobs: int
+    :param max_jobs: See JobRunner
+    :rtype: JobRunner
+    """
+
+    global RUNNER
+
+    RUNNER = JobRunner(executor, max_jobs)
+
+    return RUNNER
+
+def runner():
+    """
+    Returns the JobRunner of the module functions.
+
+    :rtype: JobRunner
+    """
+
+    if RUNNER is None:
+        return configure()
+
+    return RUNNER
+
+async def load(filepath: str, version: str = "", **kwargs):
+    """
+    Returns a SLA parsed from a file path.
+
+    .. seealso:: :meth:`JobRunner.load`
+    """
+
+    return await runner().load(filepath, version, **kwargs)
+
+async def save(slafile, filepath: str, compression="auto", level=None):
+    """
+    Save a SLA file.
+
+    .. seealso:: :meth:`JobRunner.save`
+    """
+
+    return await runner().save(slafile, filepath, compression, level)
+
+async def render(source, **kwargs):
+    """
+    Draw the wireframe of a SLA, or of a SLA file.
+
+    .. seealso:: :meth:`JobRunner.render`
+    """
+
+    return await runner().render(source, **kwargs)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,437 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Store of embedded images data (ImageData attributes of image frames).
+
+Scribus embeds images as Qt compressed (qCompress) data, encoded in
+base64. The BlobStore keeps this encoded data once per content, and
+decodes it only when asked.
+"""
+
+# Imports ===============================================================#
+
+import os
+import re
+import mmap
+import zlib
+import base64
+import hashlib
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# ImageData attribute in a SLA file
+imagedata_pattern = re.compile(rb'ImageData="([^"]+)"')
+
+# Placeholder of a blob in a serialized SLA, see BlobWriter
+placeholder_pattern = re.compile(rb"pyscribus-blob:([0-9a-f]{32})")
+
+PLACEHOLDER_LENGTH = len("pyscribus-blob:") + 32
+
+# Size of chunks of blobs data written by BlobWriter
+CHUNK_SIZE = 1048576
+
+# Classes ===============================================================#
+
+class Blob:
+    """
+    Embedded data of a BlobStore.
+
+    Blobs are immutable handles: copies of a page object share the same
+    Blob.
+
+    :type store: BlobStore
+    :param store: Store containing the data
+    :type digest: str
+    :param digest: Hash of the encoded data
+    """
+
+    def __init__(self, store, digest: str):
+        self.store = store
+        self.digest = digest
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        if isinstance(other, Blob):
+            return self.digest == other.digest
+
+        return False
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def view(self):
+        """
+        Returns the encoded (Qt compressed, base64) data.
+
+        Data is not copied if the store is memory-mapped.
+
+        :rtype: memoryview
+        """
+
+        return self.store.view(self.digest)
+
+    def encoded(self):
+        """
+        Returns the encoded (Qt compressed, base64) data, as in
+        ImageData attribute.
+
+        :rtype: str
+        """
+
+        return self.store.encoded(self.digest)
+
+    def decode(self):
+        """
+        Returns the image data (file content).
+
+        :rtype: bytes
+        """
+
+        return self.store.decode(self.digest)
+
+    def placeholder(self):
+        """
+        Returns the placeholder of this blob for BlobWriter.
+
+        :rtype: str
+        """
+
+        return "pyscribus-blob:{}".format(self.digest)
+
+
+class BlobStore:
+    """
+    Store of embedded images data, deduplicated by content hash.
+
+    Data is kept encoded, as in SLA ImageData attributes, either in
+    memory or as offsets into a memory-mapped SLA file (see map()).
+
+    :ivar dict blobs: Digest as keys, encoded data (bytes) or (start, end)
+        offsets in the mapped file as values.
+    :ivar string filepath: Path of the memory-mapped SLA file, if any.
+    :ivar bool streaming: If True, image frames export placeholders
+        instead of ImageData (see writer()).
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.filepath = ""
+        self.streaming = False
+
+        self._file = None
+        self._map = None
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def __contains__(self, digest):
+        return digest in self.blobs
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def add(self, data):
+        """
+        Add encoded (Qt compressed, base64) data to the store.
+
+        If the same data is already in the store, it is not stored
+        twice.
+
+        :type data: str, bytes
+        :param data: ImageData attribute value
+        :rtype: Blob
+        """
+
+        if isinstance(data, str):
+            data = data.encode("ascii")
+
+        digest = BlobStore._digest(data)
+
+        if digest not in self.blobs:
+            self.blobs[digest] = data
+
+        return Blob(self, digest)
+
+    def add_image(self, data: bytes):
+        """
+        Add image data (file content) to the store, encoding it as
+        Scribus does.
+
+        :type data: bytes
+        :param data: Image file content
+        :rtype: Blob
+        """
+
+        compressed = len(data).to_bytes(4, "big") + zlib.compress(data)
+
+        return self.add(base64.b64encode(compressed))
+
+    def add_file(self, filepath: str):
+        """
+        Add an image file to the store.
+
+        :type filepath: str
+        :param filepath: Image file path
+        :rtype: Blob
+        """
+
+        with open(filepath, "rb") as imagef:
+            return self.add_image(imagef.read())
+
+    def view(self, digest: str):
+        """
+        Returns the encoded data of a blob.
+
+        :type digest: str
+        :param digest: Blob digest
+        :rtype: memoryview
+        """
+
+        data = self.blobs[digest]
+
+        if isinstance(data, tuple):
+            return memoryview(self._map)[data[0]:data[1]]
+
+        return memoryview(data)
+
+    def encoded(self, digest: str):
+        """
+        Returns the encoded data of a blob, as in ImageData attribute.
+
+        :type digest: str
+        :param digest: Blob digest
+        :rtype: str
+        """
+
+        with self.view(digest) as data:
+            return str(data, "ascii")
+
+    def decode(self, digest: str):
+        """
+        Returns the image data of a blob.
+
+        :type digest: str
+        :param digest: Blob digest
+        :rtype: bytes
+        """
+
+        with self.view(digest) as data:
+            compressed = base64.b64decode(data)
+
+        # Qt compressed data: 4 bytes of uncompressed length, then zlib
+        # data
+        return zlib.decompress(compressed[4:])
+
+    def extract(self, directory: str, extension: str = ""):
+        """
+        Write the images of the store in a directory, named after their
+        digests.
+
+        :type directory: str
+        :param directory: Directory path
+        :type extension: str
+        :param extension: Extension of the files (ex: "png")
+        :rtype: dict
+        :returns: Digest as keys, file path as values
+        """
+
+        paths = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+        for digest in self.blobs.keys():
+            filename = digest
+
+            if extension:
+                filename += "." + extension.lstrip(".")
+
+            filepath = os.path.join(directory, filename)
+
+            with open(filepath, "wb") as imagef:
+                imagef.write(self.decode(digest))
+
+            paths[digest] = filepath
+
+        return paths
+
+    def writer(self, stream):
+        """
+        Returns a binary stream writing into stream, replacing blobs
+        placeholders by their encoded data.
+
+        :type stream: file object
+        :param stream: Binary stream to write into
+        :rtype: BlobWriter
+        """
+
+        return BlobWriter(self, stream)
+
+    def map(self, filepath: str):
+        """
+        Memory-map a SLA file and index its ImageData attributes.
+
+        Blobs added afterwards with the same data as in the file only
+        keep offsets into the mapped file.
+
+        :type filepath: str
+        :param filepath: SLA file path
+        :rtype: int
+        :returns: Count of blobs indexed
+        """
+
+        self.close()
+
+        self._file = open(filepath, "rb")
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            self._file.close()
+            self._file = None
+            return 0
+
+        self.filepath = os.path.realpath(filepath)
+
+        indexed = 0
+
+        for match in imagedata_pattern.finditer(self._map):
+            start, end = match.start(1), match.end(1)
+
+            with memoryview(self._map)[start:end] as data:
+                digest = BlobStore._digest(data)
+
+            if digest not in self.blobs or isinstance(self.blobs[digest], bytes):
+                self.blobs[digest] = (start, end)
+                indexed += 1
+
+        return indexed
+
+    def detach(self):
+        """
+        Copy all blobs of the mapped file in memory, and close it.
+        """
+
+        if self._map is None:
+            return
+
+        for digest, data in self.blobs.items():
+            if isinstance(data, tuple):
+                self.blobs[digest] = self._map[data[0]:data[1]]
+
+        self.close()
+
+    def close(self):
+        """
+        Close the mapped file, if any.
+
+        Blobs still referring to the mapped file are removed. Use
+        detach() to keep them.
+        """
+
+        if self._map is None:
+            return
+
+        self.blobs = {
+            digest: data
+            for digest, data in self.blobs.items()
+            if not isinstance(data, tuple)
+        }
+
+        self._map.close()
+        self._file.close()
+
+        self._map = None
+        self._file = None
+        self.filepath = ""
+
+
+class BlobWriter:
+    """
+    Binary stream replacing blobs placeholders by their encoded data, as
+    a serialized SLA is written into another stream.
+
+    Encoded data is written by chunks, without being copied in the
+    serialized SLA.
+
+    :type store: BlobStore
+    :param store: Store of the blobs
+    :type stream: file object
+    :param stream: Binary stream to write into
+    """
+
+    def __init__(self, store, stream):
+        self.store = store
+        self.stream = stream
+
+        # Data not written yet, which can end with an incomplete
+        # placeholder
+        self._pending = b""
+
+    def _write_blob(self, digest: str):
+        with self.store.view(digest) as data:
+            for start in range(0, len(data), CHUNK_SIZE):
+                self.stream.write(data[start:start + CHUNK_SIZE])
+
+    def write(self, data: bytes):
+        """
+        :type data: bytes
+        :rtype: int
+        """
+
+        pending = self._pending + data
+        position = 0
+
+        for match in placeholder_pattern.finditer(pending):
+            self.stream.write(pending[position:match.start()])
+            self._write_blob(match.group(1).decode("ascii"))
+            position = match.end()
+
+        # Keeps enough data for a placeholder split between two writes
+
+        keep = max(position, len(pending) - PLACEHOLDER_LENGTH + 1)
+
+        self.stream.write(pending[position:keep])
+        self._pending = pending[keep:]
+
+        return len(data)
+
+    def flush(self):
+        """
+        Write pending data.
+        """
+
+        self.stream.write(self._pending)
+        self._pending = b""
+
+        self.stream.flush()
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
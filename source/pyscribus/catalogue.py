@@ -0,0 +1,512 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Catalogue generation: records flowed into the slots of a page template.
+
+A page of a template SLA holds the page objects of one slot, filled by
+one record, and static page objects repeated on every page. Pages are
+written as soon as they are full by a PageStreamWriter, so the generated
+document never lives in memory.
+
+In the texts of the slot page objects, ``%key%`` placeholders are
+replaced by the values of the records.
+
+:Example:
+
+.. code:: python
+
+   template = sla.SLA("catalogue-template.sla")
+
+   pipeline = catalogue.CataloguePipeline(
+       template,
+       slots=[(0, 0), (0, 280), (0, 560)],
+       bindings={"Cover": "cover_path", "Price": format_price},
+   )
+
+   with catalogue.PageStreamWriter(template, "catalogue.sla") as writer:
+       pipeline.run(products, writer)
+
+"""
+
+# Imports ===============================================================#
+
+import re
+import shutil
+import tempfile
+
+import lxml
+import lxml.etree as ET
+
+import pyscribus.stories as stories
+import pyscribus.pageobjects as pageobjects
+
+import pyscribus.common.compress as compress
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Placeholders of records values in texts, like %Title%
+placeholder_pattern = re.compile(r"%(\w+)%")
+
+# Markers of the insertion points of pages and page objects
+PAGES_MARKER = "pyscribus-pages"
+OBJECTS_MARKER = "pyscribus-pageobjects"
+
+# Classes ===============================================================#
+
+class PageStreamWriter:
+    """
+    Writes a SLA file page by page.
+
+    Pages and page objects are serialized as they are written, into
+    temporary files. The SLA file is assembled by close(), with the
+    settings, styles and master pages of the document of slafile, but
+    without its pages and their page objects.
+
+    :type slafile: pyscribus.sla.SLA
+    :param slafile: SLA of the document settings and master pages
+    :type filepath: str
+    :param filepath: SLA file path
+    :type compression: str, bool
+    :param compression: Compression of the file (see SLA.save)
+    :type level: int
+    :param level: Compression level (see SLA.save)
+
+    :ivar int page_count: Count of pages written
+    """
+
+    def __init__(self, slafile, filepath: str, compression="auto",
+            level=None):
+        self.slafile = slafile
+        self.filepath = filepath
+        self.compression = compression
+        self.level = level
+
+        self.page_count = 0
+
+        self._pages = tempfile.TemporaryFile()
+        self._objects = tempfile.TemporaryFile()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+        return False
+
+    def write_page(self, page, page_objects: list):
+        """
+        Write a page and its page objects.
+
+        :type page: pyscribus.pages.Page
+        :param page: Page. Its number is set by the writer.
+        :type page_objects: list
+        :param page_objects: Page objects of the page
+        """
+
+        page.number = self.page_count + 1
+
+        self._pages.write(ET.tostring(page.toxml(), pretty_print=True))
+
+        for po in page_objects:
+            self._objects.write(ET.tostring(po.toxml(), pretty_print=True))
+
+        self.page_count += 1
+
+    def _shell(self):
+        """
+        Returns the SLA XML without pages and page objects, split at the
+        insertion points of pages and page objects.
+        """
+
+        document = self.slafile.document
+
+        saved = (document.pages, document.page_objects, document.page_number)
+
+        document.pages = []
+        document.page_objects = [
+            po for po in saved[1] if po.on_master_page
+        ]
+        document.page_number = self.page_count
+
+        try:
+            xml = self.slafile.toxml()
+        finally:
+            document.pages, document.page_objects, document.page_number = saved
+
+        document_xml = xml.find("DOCUMENT")
+
+        # Pages after master pages, page objects before patterns
+
+        masters = [
+            index for index, element in enumerate(document_xml)
+            if element.tag == "MASTERPAGE"
+        ]
+
+        patterns = len(document.patterns)
+
+        document_xml.insert(
+            len(document_xml) - patterns, ET.Comment(OBJECTS_MARKER)
+        )
+
+        if masters:
+            document_xml.insert(masters[-1] + 1, ET.Comment(PAGES_MARKER))
+        else:
+            document_xml.insert(
+                len(document_xml) - patterns - 1, ET.Comment(PAGES_MARKER)
+            )
+
+        text = ET.tostring(xml, encoding="UTF-8", pretty_print=True)
+
+        head, rest = text.split("<!--{}-->".format(PAGES_MARKER).encode(), 1)
+        middle, tail = rest.split(
+            "<!--{}-->".format(OBJECTS_MARKER).encode(), 1
+        )
+
+        return head, middle, tail
+
+    def _discard(self):
+        self._pages.close()
+        self._objects.close()
+
+    def close(self):
+        """
+        Write the SLA file.
+
+        :rtype: str
+        :returns: SLA file path
+        """
+
+        head, middle, tail = self._shell()
+
+        with compress.open_file(
+                self.filepath, "wb", self.compression, self.level) as slaf:
+
+            slaf.write(b'<?xml version="1.0" encoding="UTF-8"?>' + b"\n")
+            slaf.write(head)
+
+            self._pages.seek(0)
+            shutil.copyfileobj(self._pages, slaf)
+
+            slaf.write(middle)
+
+            self._objects.seek(0)
+            shutil.copyfileobj(self._objects, slaf)
+
+            slaf.write(tail)
+
+        self._discard()
+
+        return self.filepath
+
+
+class CataloguePipeline:
+    """
+    Flows records into the slots of a page template.
+
+    Page objects of the template page are slot page objects if they have
+    placeholders in their texts, or a binding. Other page objects are
+    static, and copied on each page.
+
+    Slots are copies of the slot page objects, moved by (horizontal,
+    vertical) offsets. A new page is added when the slots of the current
+    page are all filled.
+
+    Bindings set the contents of the slot page objects by their names:
+    text of text frames (in PSM), image file of image frames. Binding
+    values are record keys, or functions returning the value from the
+    record. Placeholders in the text replaced by a binding are ignored.
+
+    :type slafile: pyscribus.sla.SLA
+    :param slafile: SLA of the page template
+    :type page: int
+    :param page: Number of the template page (counted from 1)
+    :type slots: list
+    :param slots: List of (horizontal, vertical) offsets of the slots, in
+        points. One slot, without offset, if None.
+    :type bindings: dict
+    :param bindings: Page objects names as keys, record keys or functions
+        as values
+    :type master_pages: list
+    :param master_pages: Names of the master pages of the generated pages,
+        used in turn (ex: left and right master pages). The master page
+        of the template page if None.
+    :type gap: float
+    :param gap: Vertical gap between pages
+    """
+
+    def __init__(self, slafile, page: int = 1, slots=None, bindings=None,
+            master_pages=None, gap: float = 40):
+
+        self.slafile = slafile
+        self.document = slafile.document
+
+        self.page = self.document.pages[page - 1]
+        self.slots = list(slots) if slots else [(0, 0)]
+        self.bindings = dict(bindings) if bindings else {}
+        self.gap = gap
+
+        if master_pages:
+            self.master_pages = list(master_pages)
+        else:
+            self.master_pages = [self.page.master_name]
+
+        self.converter = stories.PSMConverter()
+
+        # --- Template page objects --------------------------------------
+
+        self.static = []
+        # (page object, placeholders)
+        self.slot_objects = []
+
+        page_index = self.document.pages.index(self.page)
+        page_objects = self.document.query(page=page_index + 1, master=False)
+
+        # Page objects of groups are handled with their group
+        grouped = set()
+
+        for po in page_objects:
+            if isinstance(po, pageobjects.GroupObject):
+                pending = list(po.group_objects)
+
+                while pending:
+                    child = pending.pop()
+                    grouped.add(id(child))
+
+                    if isinstance(child, pageobjects.GroupObject):
+                        pending.extend(child.group_objects)
+
+        for po in page_objects:
+
+            if id(po) in grouped:
+                continue
+
+            placeholders = CataloguePipeline._placeholders(po)
+
+            # The binding replaces the first story of text frames
+            if po.name in self.bindings and \
+                    not isinstance(po, pageobjects.ImageObject):
+                placeholders = [
+                    position for position in placeholders if position[0]
+                ]
+
+            if placeholders or po.name in self.bindings:
+                self.slot_objects.append((po, placeholders))
+            else:
+                self.static.append(po)
+
+        self._page_height = float(self.page.box.dims["height"].value)
+
+    @staticmethod
+    def _placeholders(po):
+        """
+        Returns the fragments of the stories of a page object containing
+        placeholders, as (story index, sequence index) tuples.
+        """
+
+        found = []
+
+        for story_index, story in enumerate(getattr(po, "stories", [])):
+            for index, element in enumerate(story.sequence):
+
+                if not isinstance(element, stories.StoryFragment):
+                    continue
+
+                if element.text and placeholder_pattern.search(element.text):
+                    found.append((story_index, index))
+
+        return found
+
+    @staticmethod
+    def _translate(po, x: float, y: float):
+        pending = [po]
+
+        while pending:
+            child = pending.pop()
+
+            for box in [child.box, child.rotated_box, child.gbox]:
+                box.translate(x, y)
+
+            if isinstance(child, pageobjects.GroupObject):
+                child.group_box.translate(x, y)
+                pending.extend(child.group_objects)
+
+    def _move(self, working: list, page_index: int, shift: float):
+        """
+        Moves working copies of page objects to a page, and gives them new
+        ItemIDs.
+        """
+
+        move = shift - working[0]
+
+        for po in working[1]:
+            pending = [po]
+
+            while pending:
+                child = pending.pop()
+                child.own_page = page_index if page_index else False
+
+                if isinstance(child, pageobjects.GroupObject):
+                    pending.extend(child.group_objects)
+
+            if move:
+                CataloguePipeline._translate(po, 0, move)
+
+        working[0] = shift
+
+        self.document.renew_object_ids(working[1])
+
+    def _fill(self, po, template, placeholders: list, record):
+        """
+        Fill a slot page object with the values of a record.
+        """
+
+        def value(match):
+            key = match.group(1)
+
+            try:
+                return str(record[key])
+            except (KeyError, IndexError, TypeError):
+                return match.group(0)
+
+        for story_index, index in placeholders:
+            fragment = po.stories[story_index].sequence[index]
+            source = template.stories[story_index].sequence[index]
+
+            fragment.text = placeholder_pattern.sub(value, source.text)
+
+        if (binding := self.bindings.get(po.name)) is None:
+            return
+
+        if callable(binding):
+            bound = binding(record)
+        else:
+            bound = record[binding]
+
+        if isinstance(po, pageobjects.ImageObject):
+            po.filepath = str(bound)
+
+        elif getattr(po, "stories", None):
+            story = po.stories[0]
+
+            head = [
+                element for element in story.sequence[:1]
+                if isinstance(element, stories.StoryDefaultStyle)
+            ]
+
+            style = False
+
+            for element in story.sequence:
+                if isinstance(element, stories.StoryParagraphEnding):
+                    style = element.parent
+                    break
+
+            story.sequence = head + self.converter.convert(
+                str(bound), sla_document=self.document
+            ) + [stories.StoryParagraphEnding(parent=style)]
+
+            story.end_contents()
+
+    def run(self, records, writer):
+        """
+        Flow records into pages, written by writer.
+
+        Page objects are copied once per slot, then moved from page to
+        page: the writer must serialize the pages as they are written
+        (as PageStreamWriter does).
+
+        :type records: iterable
+        :param records: Records (dicts, or any object indexable by the
+            keys of placeholders and bindings)
+        :type writer: PageStreamWriter
+        :param writer: Writer of the pages
+        :rtype: int
+        :returns: Count of records
+        """
+
+        memo = {
+            id(self.document): self.document,
+            id(self.slafile): self.slafile,
+        }
+
+        # --- Working copies ---------------------------------------------
+
+        page = self.page.clone(dict(memo))
+        page_shift = 0
+
+        # [current shift, page objects]
+        static = [0, [po.clone(dict(memo)) for po in self.static]]
+        slots = []
+
+        for x, y in self.slots:
+            copies = [po.clone(dict(memo)) for po, _ in self.slot_objects]
+
+            for po in copies:
+                CataloguePipeline._translate(po, x, y)
+
+            slots.append([0, copies])
+
+        # --- Records ----------------------------------------------------
+
+        page_objects = None
+        page_index = writer.page_count
+        shift = 0
+        count = 0
+
+        for record in records:
+            slot = count % len(slots)
+
+            if not slot:
+                if page_objects is not None:
+                    writer.write_page(page, page_objects)
+                    page_index += 1
+
+                shift = page_index * (self._page_height + self.gap)
+
+                page.box.translate(0, shift - page_shift)
+                page_shift = shift
+
+                page.master_name = self.master_pages[
+                    page_index % len(self.master_pages)
+                ]
+
+                self._move(static, page_index, shift)
+                page_objects = list(static[1])
+
+            self._move(slots[slot], page_index, shift)
+
+            for po, (template, placeholders) in zip(
+                    slots[slot][1], self.slot_objects):
+                self._fill(po, template, placeholders, record)
+
+            page_objects.extend(slots[slot][1])
+            count += 1
+
+        if page_objects is not None:
+            writer.write_page(page, page_objects)
+
+        return count
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
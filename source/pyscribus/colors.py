@@ -389,7 +389,7 @@ class Color(xmlc.PyScribusElement):
             # NOTE Self colors and other colors are in the same space, so
             # inks dicts have the same keys. So we get a list of
             # [(R1,R2)…] or [(C1,C2)…]. Having one ink different is enough.
-            inks = zip(self.colors.values(), other.values())
+            inks = zip(self.colors.values(), other.colors.values())
 
             for ink in inks:
                 if ink[0] != ink[1]:
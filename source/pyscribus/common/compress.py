@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compressed files (.sla.gz, .sla.xz, .sla.zst) streaming.
+
+Zstandard needs Python 3.14 (compression.zstd) or the zstandard package.
+"""
+
+# Imports ===============================================================#
+
+import gzip
+import lzma
+
+import pyscribus.exceptions as exceptions
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Compression formats and their file extensions
+extensions = {
+    "gzip": [".gz"],
+    "xz": [".xz", ".lzma"],
+    "zstd": [".zst", ".zstd"],
+}
+
+# Compression formats and the first bytes of their files
+magic_numbers = {
+    "gzip": b"\x1f\x8b",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# Classes ===============================================================#
+
+class CancellableStream:
+    """
+    Binary stream raising Cancelled on reads and writes once a job is
+    cancelled.
+
+    :type stream: file object
+    :param stream: Binary stream to read from or to write into
+    :type cancelled: threading.Event
+    :param cancelled: Event set when the job is cancelled
+    """
+
+    def __init__(self, stream, cancelled):
+        self.stream = stream
+        self.cancelled = cancelled
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise exceptions.Cancelled()
+
+    def read(self, size: int = -1):
+        """
+        :type size: int
+        :rtype: bytes
+        """
+
+        self._check()
+
+        return self.stream.read(size)
+
+    def write(self, data: bytes):
+        """
+        :type data: bytes
+        :rtype: int
+        """
+
+        self._check()
+
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+# Fonctions =============================================================#
+
+def from_path(filepath: str):
+    """
+    Returns the compression format of a file according to its extension.
+
+    :type filepath: str
+    :param filepath: File path
+    :rtype: str, bool
+    :returns: Compression format, or False if none
+    """
+
+    lowered = str(filepath).lower()
+
+    for compression, exts in extensions.items():
+        if lowered.endswith(tuple(exts)):
+            return compression
+
+    return False
+
+def from_content(filepath: str):
+    """
+    Returns the compression format of a file according to its first
+    bytes.
+
+    :type filepath: str
+    :param filepath: File path
+    :rtype: str, bool
+    :returns: Compression format, or False if none
+    """
+
+    with open(filepath, "rb") as testf:
+        head = testf.read(6)
+
+    for compression, magic in magic_numbers.items():
+        if head.startswith(magic):
+            return compression
+
+    return False
+
+def _zstd_open(filepath: str, mode: str, level=None):
+    try:
+        from compression import zstd
+
+        if level is None:
+            return zstd.open(filepath, mode)
+
+        return zstd.open(filepath, mode, level=level)
+
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Zstandard needs Python 3.14 or the zstandard package."
+        )
+
+    if "w" in mode and level is not None:
+        return zstandard.open(
+            filepath, mode, cctx=zstandard.ZstdCompressor(level=level)
+        )
+
+    return zstandard.open(filepath, mode)
+
+def open_file(filepath: str, mode: str = "rb", compression="auto", level=None):
+    """
+    Open a file as a binary stream, compressed or not.
+
+    Data is (de)compressed as it is read or written.
+
+    :type filepath: str
+    :param filepath: File path
+    :type mode: str
+    :param mode: "rb" or "wb"
+    :type compression: str, bool
+    :param compression: "gzip", "xz", "zstd", False for no compression,
+        "auto" to guess it from the file extension (and file content
+        when reading).
+    :type level: int
+    :param level: Compression level (gzip: 0-9, xz: 0-9, zstd: 1-22).
+        Default level of the format if None.
+    :rtype: file object
+    :raises ValueError: If compression is unknown
+    """
+
+    if "r" in mode:
+        level = None
+
+    if compression == "auto":
+        compression = from_path(filepath)
+
+        if not compression and "r" in mode:
+            compression = from_content(filepath)
+
+    if not compression:
+        return open(filepath, mode)
+
+    if compression == "gzip":
+        if level is None:
+            return gzip.open(filepath, mode)
+
+        return gzip.open(filepath, mode, compresslevel=level)
+
+    if compression == "xz":
+        if level is None:
+            return lzma.open(filepath, mode)
+
+        return lzma.open(filepath, mode, preset=level)
+
+    if compression == "zstd":
+        return _zstd_open(filepath, mode, level)
+
+    raise ValueError(
+        "Unknown compression {}. Use {}.".format(
+            compression, ", ".join(extensions.keys())
+        )
+    )
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -25,12 +25,16 @@ Most of them are annoyingly simple, but necessary.
 
 # Imports ===============================================================#
 
+import gc
 import copy
-import pprint
+import contextlib
+import contextvars
 
 import lxml
 import lxml.etree as ET
 
+import pyscribus.exceptions as exceptions
+
 # Variables globales ====================================================#
 
 __author__ = "Etienne Nadji <etnadji@eml.cc>"
@@ -57,6 +61,30 @@ alignment = {
     "justify": "4"
 }
 
+# Active UndocumentedCollector of the current thread or task, see
+# undocumented_collector()
+UNDOCUMENTED_COLLECTOR = contextvars.ContextVar(
+    "UNDOCUMENTED_COLLECTOR", default=None
+)
+
+# Cancellation event of the job of the current thread or task, see
+# cancellable()
+CANCEL_EVENT = contextvars.ContextVar("CANCEL_EVENT", default=None)
+
+# Types of values shared, not copied, by clone()
+CLONE_IMMUTABLES = frozenset(
+    [str, int, float, complex, bool, bytes, frozenset, type(None)]
+)
+
+# Class -> function copying its instances, see clone()
+CLONE_METHODS = {}
+
+# Reversed *_xml tables, see reverse_xml()
+REVERSED_TABLES = {}
+
+# Caches of XML strings, see FormatCache and clear_format_caches()
+FORMAT_CACHES = []
+
 # Classes ===============================================================#
 
 class PyScribusElement:
@@ -178,13 +206,33 @@ class PyScribusElement:
         :param kwargs: Quick setting (same as __init__)
         """
 
-        duplicate = copy.deepcopy(self)
+        with gc_paused():
+            duplicate = self.clone()
 
         if kwargs:
             duplicate._quick_setup(kwargs)
 
         return duplicate
 
+    def clone(self, memo: dict = None):
+        """
+        Returns a structural copy of the instance.
+
+        Parents instances (attributes ending with ``_parent``) and
+        immutable data are shared with the copy, everything else is
+        copied.
+
+        .. seealso:: pyscribus.common.xml.clone()
+
+        :type memo: dict
+        :param memo: Instances already copied, as in copy.deepcopy
+        """
+
+        if memo is None:
+            memo = {}
+
+        return clone_instance(self, memo)
+
 
 class OrphanElement(PyScribusElement):
     """
@@ -234,8 +282,159 @@ class OrphanElement(PyScribusElement):
     def __str__(self):
         return "<{}/>".format(self.tag)
 
+class UndocumentedCollector:
+    """
+    Counts undocumented XML attributes names by kind of element, for a
+    whole export.
+
+    Filled by all_undocumented_to_xml() while active, see
+    undocumented_collector().
+
+    :ivar dict counts: Kind of element as keys, dictionnary of attribute
+        name: count as values.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, kind: str, attributes: list):
+        """
+        Count undocumented attributes of an element.
+
+        :type kind: str
+        :param kind: Kind of the element (page object type, XML tag…)
+        :type attributes: list
+        :param attributes: Undocumented attributes names
+        """
+
+        kind_counts = self.counts.setdefault(kind, {})
+
+        for att_name in attributes:
+            kind_counts[att_name] = kind_counts.get(att_name, 0) + 1
+
+    def report(self):
+        """
+        Returns the counts of undocumented attributes.
+
+        :rtype: dict
+        :returns: ``{kind: {attribute name: count}}``
+        """
+
+        return {kind: dict(counts) for kind, counts in self.counts.items()}
+
+    def format(self):
+        """
+        Returns the counts of undocumented attributes as text.
+
+        :rtype: str
+        """
+
+        lines = []
+
+        for kind in sorted(self.counts.keys()):
+            counts = self.counts[kind]
+
+            lines.append(
+                "{}: {}".format(
+                    kind,
+                    ", ".join(
+                        "{} ({})".format(att_name, counts[att_name])
+                        for att_name in sorted(counts.keys())
+                    )
+                )
+            )
+
+        return "\n".join(lines)
+
+    def log(self, logger=False):
+        """
+        Report the undocumented attributes in one message, if any.
+
+        :type logger: logging.Logger, bool
+        :param logger: Logger object to use. If False, report is printed
+            in STDOUT.
+        :rtype: bool
+        :returns: True if there was something to report
+        """
+
+        if not self.counts:
+            return False
+
+        undocstr = "Undoc. XML attributes:\n" + self.format()
+
+        if logger:
+            logger.debug(undocstr)
+        else:
+            print(undocstr)
+
+        return True
+
+class FormatCache:
+    """
+    Bounded cache of the XML strings of immutable values (or of other
+    values computed from them, like interned mappings).
+
+    Keys must include everything the string depends on, including the
+    type of numbers (``hash(1) == hash(1.0)`` but ``"1" != "1.0"``).
+    When the cache is full, it is emptied.
+
+    :type size: int
+    :param size: Maximum count of cached strings
+
+    :ivar dict strings: Keys as keys, XML strings as values
+
+    :Example:
+
+    .. code:: python
+
+       shades = FormatCache()
+
+       def shade_string(shade):
+           return shades.get(
+               (shade.__class__, shade), float_or_int_string, shade
+           )
+
+    """
+
+    def __init__(self, size: int = 65536):
+        self.size = size
+        self.strings = {}
+
+        FORMAT_CACHES.append(self)
+
+    def get(self, key, function, *args):
+        """
+        Returns the cached string of key, or the string returned by
+        function(\*args), cached.
+
+        :param key: Hashable key
+        :type function: function
+        :param function: Function returning the XML string
+        :rtype: str
+        """
+
+        if (string := self.strings.get(key)) is None:
+
+            if len(self.strings) >= self.size:
+                self.strings.clear()
+
+            # The first string cached wins if several threads compute it
+            string = self.strings.setdefault(key, function(*args))
+
+        return string
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+
+        self.strings.clear()
+
 # Fonctions =============================================================#
 
+# XML strings of numbers, see float_or_int_string()
+NUMBER_STRINGS = FormatCache()
+
 # NOTE
 # We need a better typology of functions here :
 #
@@ -258,13 +457,22 @@ class OrphanElement(PyScribusElement):
 
 # From PyScribus to XML ========================================#
 
-def float_or_int_string(f):
+def _float_or_int_string(f):
 
     if float(f) == int(f):
         return str(int(f))
     else:
         return str(f)
 
+def float_or_int_string(f):
+    """
+    Returns f as string, without decimals if they are 0.
+
+    :rtype: str
+    """
+
+    return NUMBER_STRINGS.get((f.__class__, f), _float_or_int_string, f)
+
 def str_or_nonestr(v: str):
     """
     Returns v if v is a non-empty string, else returns 'None'.
@@ -327,6 +535,266 @@ def num_to_bool(n: str):
     else:
         return False
 
+# Enumerations and caches ======================================#
+
+def reverse_xml(table: dict):
+    """
+    Returns a *_xml table (human value: XML value) as a XML value: human
+    value dictionnary, for parsing.
+
+    Tables are reversed once. XML values are turned into strings, as
+    attributes values. If several human values share a XML value, the
+    first one is used.
+
+    :type table: dict
+    :param table: Table of human values and XML values
+    :rtype: dict
+
+    :Example:
+
+    .. code:: python
+
+       codes = reverse_xml(PageObject.line_type_xml)
+
+       if (line_type := codes.get(xml.get("PLINEART"))) is not None:
+           self.outline["type"] = line_type
+
+    .. seealso:: clear_format_caches()
+    """
+
+    if (cached := REVERSED_TABLES.get(id(table))) is not None:
+        return cached[1]
+
+    reversed_table = {}
+
+    for human, code in table.items():
+        reversed_table.setdefault(str(code), human)
+
+    # The table is kept so that its id is not reused
+    REVERSED_TABLES[id(table)] = (table, reversed_table)
+
+    return reversed_table
+
+def clear_format_caches():
+    """
+    Forget reversed *_xml tables, cached XML strings and interned
+    mappings of story fragments.
+
+    Needed only if you modify a *_xml table after parsing.
+    """
+
+    REVERSED_TABLES.clear()
+
+    for cache in FORMAT_CACHES:
+        cache.clear()
+
+# Cancellation =================================================#
+
+@contextlib.contextmanager
+def cancellable(cancelled):
+    """
+    Context manager making cancel_point() raise Cancelled once cancelled
+    is set, in the current thread (or asyncio task).
+
+    :type cancelled: threading.Event
+    :param cancelled: Event set when the job is cancelled. If None,
+        nothing is done.
+
+    :Example:
+
+    .. code:: python
+
+       with cancellable(cancelled):
+           xml = document.toxml()
+
+    """
+
+    if cancelled is None:
+        yield
+        return
+
+    token = CANCEL_EVENT.set(cancelled)
+
+    try:
+        yield
+    finally:
+        CANCEL_EVENT.reset(token)
+
+def cancel_point():
+    """
+    Raise Cancelled if the job of the current thread (or asyncio task) is
+    cancelled.
+
+    Called between the elements of long parsings and exports, see
+    cancellable().
+
+    :raises pyscribus.exceptions.Cancelled: If the job is cancelled
+    """
+
+    if (cancelled := CANCEL_EVENT.get()) is not None and cancelled.is_set():
+        raise exceptions.Cancelled()
+
+# Copy =========================================================#
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Context manager disabling the garbage collector, if enabled.
+
+    Copying a document creates as many objects as it has, which triggers
+    full collections of the whole heap: they take most of the time of
+    copies, while all these new objects are alive.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def clone(value, memo: dict = None):
+    """
+    Returns a structural copy of value, faster than copy.deepcopy for
+    PyScribus objects.
+
+    - Immutable values (strings, numbers…) are shared, as well as the
+      instances of classes with a true ``clone_immutable`` attribute.
+    - Dicts, lists and tuples are copied.
+    - PyScribus objects are copied by their clone() method.
+    - Other instances are copied attribute by attribute. Their parents
+      (attributes ending with ``_parent``) and the attributes listed in
+      their ``clone_shared`` class attribute are shared, or replaced by
+      their copy if it is in memo. Instances of classes with a true
+      ``clone_flat`` attribute only have immutable attributes, which are
+      shared without being checked. They are not recorded in memo, so an
+      instance referenced twice is copied twice.
+    - Objects without attributes, with a __deepcopy__ method or with
+      their own __new__ (subclasses of dict, list…, like OrderedDict)
+      are copied by copy.deepcopy.
+
+    :type memo: dict
+    :param memo: Instances already copied, as in copy.deepcopy
+    """
+
+    if memo is None:
+        memo = {}
+
+    if (method := CLONE_METHODS.get(value.__class__)) is None:
+        method = _clone_method(value.__class__)
+
+    return method(value, memo)
+
+def _clone_method(cls):
+    """
+    Returns the function copying instances of cls, see clone().
+    """
+
+    if cls in CLONE_IMMUTABLES or getattr(cls, "clone_immutable", False):
+        method = _clone_shared
+    elif cls is dict:
+        method = _clone_dict
+    elif cls is list:
+        method = _clone_list
+    elif cls is tuple:
+        method = _clone_tuple
+    elif issubclass(cls, PyScribusElement):
+        method = _clone_element
+    elif hasattr(cls, "__deepcopy__") or cls.__new__ is not object.__new__ \
+            or not cls.__dictoffset__:
+        method = _clone_deepcopy
+    elif getattr(cls, "clone_flat", False):
+        method = _clone_flat
+    else:
+        method = _clone_instance
+
+    CLONE_METHODS[cls] = method
+
+    return method
+
+def _clone_shared(value, memo: dict):
+    return value
+
+def _clone_dict(value, memo: dict):
+    methods = CLONE_METHODS
+
+    return {
+        key: (
+            item if item.__class__ in CLONE_IMMUTABLES
+            else (
+                methods.get(item.__class__) or _clone_method(item.__class__)
+            )(item, memo)
+        )
+        for key, item in value.items()
+    }
+
+def _clone_list(value, memo: dict):
+    methods = CLONE_METHODS
+
+    return [
+        item if item.__class__ in CLONE_IMMUTABLES
+        else (
+            methods.get(item.__class__) or _clone_method(item.__class__)
+        )(item, memo)
+        for item in value
+    ]
+
+def _clone_tuple(value, memo: dict):
+    return tuple(_clone_list(value, memo))
+
+def _clone_element(value, memo: dict):
+    if (duplicate := memo.get(id(value))) is not None:
+        return duplicate
+
+    return value.clone(memo)
+
+def _clone_deepcopy(value, memo: dict):
+    return copy.deepcopy(value, memo)
+
+def _clone_flat(value, memo: dict):
+    # Not memoized: many small instances would bloat memo
+    duplicate = object.__new__(value.__class__)
+    duplicate.__dict__.update(value.__dict__)
+
+    return duplicate
+
+def _clone_instance(value, memo: dict):
+    if (duplicate := memo.get(id(value))) is not None:
+        return duplicate
+
+    return clone_instance(value, memo)
+
+def clone_instance(value, memo: dict):
+    """
+    Copy an instance attribute by attribute, see clone().
+
+    :type memo: dict
+    :param memo: Instances already copied, as in copy.deepcopy
+    """
+
+    duplicate = object.__new__(value.__class__)
+    memo[id(value)] = duplicate
+
+    shared = getattr(value, "clone_shared", [])
+    attributes = duplicate.__dict__
+    methods = CLONE_METHODS
+
+    for name, attribute in value.__dict__.items():
+        cls = attribute.__class__
+
+        if cls in CLONE_IMMUTABLES:
+            attributes[name] = attribute
+        elif name.endswith("_parent") or name in shared:
+            attributes[name] = memo.get(id(attribute), attribute)
+        else:
+            attributes[name] = (
+                methods.get(cls) or _clone_method(cls)
+            )(attribute, memo)
+
+    return duplicate
+
 # Undocumented attributes ======================================#
 
 def undocumented_to_python(xml: ET._Element, attributes: list):
@@ -430,7 +898,7 @@ def all_undocumented_to_python(xml: ET._Element):
 
 def all_undocumented_to_xml(
         xml: ET._Element, undocumented: dict,
-        report: bool = True, msg: str = "", passattr: list = [], logger=False):
+        report: bool = True, msg: str = "", passattr: list = []):
     """
     Function to manage the export of undocumented
     XML/SLA attributes.
@@ -444,15 +912,13 @@ def all_undocumented_to_xml(
     :param undocumented: Dictionnary of XML attributes.
         Return of all_undocumented_to_python()
     :type report: bool
-    :param report: Print all undocumented attributes found in xml element.
+    :param report: Count undocumented attributes found in xml element in
+        the active UndocumentedCollector, if any.
     :type msg: str
-    :param msg: Human readable name for the xml element when report parameter 
-        is True.
+    :param msg: Kind of the xml element (page object type, style type…)
+        in the report. XML tag if empty.
     :type passattr: list
     :param passattr: List of SLA attributes names to not report. For debug.
-    :type logger: logging.Logger, bool
-    :param logger: Logger object to use if report. If False, report is printed 
-        in STDOUT.
     :returns: List containing LXML element and undocumented attributes
         names list.
     :rtype: list
@@ -460,7 +926,7 @@ def all_undocumented_to_xml(
     Only adds undocumented attributes to xml element if
     xml element doesn't already have this attribute.
 
-    .. seealso:: all_undocumented_to_python()
+    .. seealso:: all_undocumented_to_python(), undocumented_collector()
     """
 
     undoc_attribs = []
@@ -473,21 +939,52 @@ def all_undocumented_to_xml(
             if not passattr or att_name not in passattr:
                 undoc_attribs.append(att_name)
 
-    if report and undoc_attribs:
-
-        msg = msg.strip()
+    if report and undoc_attribs and \
+            (collector := UNDOCUMENTED_COLLECTOR.get()) is not None:
 
-        undocstr = "Undoc. XML attributes: {}: ".format(msg)
-
-        if logger:
-            logger.debug(
-                undocstr + pprint.pformat(undoc_attribs, compact=True)
-            )
+        if msg:
+            kind = msg.strip()
         else:
-            print(undocstr)
-            pprint.pprint(undoc_attribs, width=80, compact=True)
+            kind = xml.tag
 
+        collector.add(kind, undoc_attribs)
 
     return [xml, undoc_attribs]
 
+@contextlib.contextmanager
+def undocumented_collector():
+    """
+    Context manager counting undocumented attributes exported by
+    all_undocumented_to_xml(), and returning the UndocumentedCollector.
+
+    If a collector is already active, it is used instead of a new one.
+    The active collector is local to the current thread (or asyncio
+    task), so that exports running at the same time have their own
+    collector.
+
+    :rtype: UndocumentedCollector
+
+    :Example:
+
+    .. code:: python
+
+       with undocumented_collector() as collector:
+           xml = document.toxml()
+
+       print(collector.report())
+
+    """
+
+    if (collector := UNDOCUMENTED_COLLECTOR.get()) is not None:
+        yield collector
+
+    else:
+        collector = UndocumentedCollector()
+        token = UNDOCUMENTED_COLLECTOR.set(collector)
+
+        try:
+            yield collector
+        finally:
+            UNDOCUMENTED_COLLECTOR.reset(token)
+
 # vim:set shiftwidth=4 softtabstop=4 spl=en:
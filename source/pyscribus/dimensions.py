@@ -21,12 +21,10 @@
 PyScribus classes for measures and geometrical manipulations.
 """
 
-import copy
 import math
 
 from pyscribus.common.math import PICA_TO_MM,INCH_TO_MM
 
-import pyscribus.logs as logs
 import pyscribus.exceptions as exceptions
 
 import pyscribus.papers.ansi as ansipaper
@@ -38,6 +36,12 @@ from pyscribus.common.xml import *
 
 __author__ = "Etienne Nadji <etnadji@eml.cc>"
 
+# Rotation angle (degrees) -> (cosinus, sinus), see rotation_matrix()
+ROTATIONS = {}
+
+# Corners of boxes, in clockwise order
+CORNERS = ["top-left", "top-right", "bottom-right", "bottom-left"]
+
 # Classes ===============================================================#
 
 class Dim:
@@ -92,6 +96,19 @@ class Dim:
         "sec": ["s", "sec"]
     }
 
+    # unit argument -> unit, for set_unit()
+    UNIT_CODES = {
+        argument: code
+        for code, arguments in UNIT_ARGS.items()
+        for argument in arguments
+    }
+
+    # XML strings of (unit, value type, value, no useless decimals)
+    xml_strings = FormatCache()
+
+    # Only immutable attributes, see pyscribus.common.xml.clone()
+    clone_flat = True
+
     def __init__(
             self, value, unit: str = "pica", is_int: bool = False,
             original_unit: bool = False):
@@ -218,15 +235,11 @@ class Dim:
         +-------------------------+---------------+
         """
 
-        tmp_unit = unit.lower()
         valid_unit = False
 
-        for code,args in Dim.UNIT_ARGS.items():
-
-            if tmp_unit in args:
-                self.unit = code
-                valid_unit = True
-                break
+        if (code := Dim.UNIT_CODES.get(unit.lower())) is not None:
+            self.unit = code
+            valid_unit = True
 
         if self.unit == "sec":
             self.is_int = True
@@ -247,13 +260,20 @@ class Dim:
         :return: str
         """
 
+        return Dim.xml_strings.get(
+            (self.unit, self.value.__class__, self.value, no_useless_decimals),
+            self._toxmlstr, no_useless_decimals
+        )
+
+    def _toxmlstr(self, no_useless_decimals: bool):
+
         def decimals(n):
             if float(n) == int(n):
                 return int(n)
             else:
                 return n
 
-        if self.unit not in ["perc", "pcdecim", "cdeg", "deg", "lpi", "dpi"]:
+        if self.unit not in ["perc", "pcdecim", "cdeg", "deg", "lpi", "dpi", "sec"]:
             if no_useless_decimals:
                 pica = self.topica()
                 return str(decimals(pica))
@@ -565,7 +585,8 @@ class DimBox:
     :ivar Dim rotation: Rotation angle of the box as Dim object
         (unit : degree)
     :ivar dict rotated_coords: Coordinates of the box when rotated by
-        rotation degree
+        rotation degree, around its top-left corner, clockwise, as in
+        Scribus. Updated by set_box, resize_side and rotate.
 
     +-------------------------+------------+
     | Box point coordinate    | kwargs key |
@@ -586,6 +607,8 @@ class DimBox:
     +-------------------------+------------+
     | Box height              | height     |
     +-------------------------+------------+
+    | Rotation (degrees)      | rotation   |
+    +-------------------------+------------+
     """
 
     def __init__(self,**kwargs):
@@ -612,6 +635,9 @@ class DimBox:
             "bottom-right": [Dim(0), Dim(0)],
         }
 
+        # (top-left x, top-left y, rotation) and matrix, see transform()
+        self._transform = (None, None)
+
         # -----------------------------------------------------------
 
         self.set_box(kwargs=kwargs)
@@ -734,7 +760,7 @@ class DimBox:
 
             # Translating the box by amountx, amounty
 
-            if refpoint == "topleft":
+            if refpoint == "top-left":
                 npx = self.coords["top-left"][0].value + amountx
                 npy = self.coords["top-left"][1].value + amounty
 
@@ -931,9 +957,10 @@ class DimBox:
                 if case == "set_from_tr":
                     self = from_tr(self, kwargs)
 
-                if rotation_deg:
-                    self.rotated_coords = copy.deepcopy(self.coords)
+                if rotation_deg is not False:
                     self.rotate(rotation_deg)
+                else:
+                    self._rotate_coords()
 
                 return True
             else:
@@ -980,54 +1007,126 @@ class DimBox:
                 self.sety("bottom-left", nby)
                 self.sety("bottom-right", nby)
 
+            self._rotate_coords()
+
             return True
         else:
             return False
 
     def rotate(self, degree: float):
         """
-        Rotate the box by degree.
+        Rotate the box by degree, around its top-left corner, clockwise,
+        as Scribus does.
 
-        .. warning:: NOT IMPLEMENTED YET & DON'T KNOW HOW TO
+        The angle is absolute: rotating a box by 30 then by 45 degrees
+        gives a box rotated by 45 degrees.
 
         :type degree: float
         :param degree: Degree of rotation
 
         This method **don't** modify DimBox.coords but update
-        DimBox.rotated_coords.
+        DimBox.rotated_coords, as in SLA XML, only original box coords
+        and rotation angle value are saved.
         """
 
-        # FIXME TODO USE OF MATHEMATICAL BLACK MAGIC REQUIRED HERE
-        #
-        # Rotate all the points of self.rotated_coords by degree.
-        #
-        # In case you need to use radians (?) to implement that, please
-        # keep in mind that Scribus use degrees as anyone sane and
-        # practical do.
-        #
-        # NOTE It is crucial you don't modify Dim.coords, as in SLA
-        # XML, only original box coords and rotation angle value
-        # are saved.
-
-        # FIXME Remove that after implementation -------
-
-        logger=logs.getLogger()
-
-        if logger:
-            logger.debug("Box rotation not implemented.")
-            # logger.debug("Rotation degree : {}".format(degree))
+        self.rotation.value = degree
+        self._rotate_coords()
+
+        return True
+
+    def _rotate_coords(self):
+        if self.rotation.value:
+            points = self.rotated_points()
         else:
-            print("PyScribus - Box rotation not implemented.")
-            # print("Rotation degree :", degree)
+            points = [
+                (self.coords[corner][0].value, self.coords[corner][1].value)
+                for corner in CORNERS
+            ]
 
-        # ----------------------------------------------
+        for corner, (x, y) in zip(CORNERS, points):
+            self.rotated_coords[corner][0].value = x
+            self.rotated_coords[corner][1].value = y
 
-        valid = True
+    #--- Rotated geometry ------------------------------------------------
 
-        if valid:
-            self.rotation.value = degree
+    def transform(self, rotation: float = None):
+        """
+        Returns the affine transformation matrix of the rotation of the box
+        around its top-left corner.
 
-        return True
+        The matrix is cached until the box moves or rotates.
+
+        :type rotation: float
+        :param rotation: Rotation angle in degrees. If None, the rotation
+            of the box.
+        :rtype: tuple
+        :returns: (a, b, c, d, e, f) matrix, as in SVG: a point (x, y) is
+            transformed into (a*x + c*y + e, b*x + d*y + f).
+        """
+
+        if rotation is None:
+            rotation = self.rotation.value
+
+        origin = self.coords["top-left"]
+        key = (float(origin[0].value), float(origin[1].value), rotation)
+
+        if self._transform[0] == key:
+            return self._transform[1]
+
+        x, y = key[0], key[1]
+        cos, sin = rotation_matrix(rotation)
+
+        matrix = (
+            cos, sin, -sin, cos,
+            x - x * cos + y * sin,
+            y - x * sin - y * cos
+        )
+
+        self._transform = (key, matrix)
+
+        return matrix
+
+    def rotated_points(self, rotation: float = None):
+        """
+        Returns the corners of the box rotated around its top-left corner.
+
+        :type rotation: float
+        :param rotation: Rotation angle in degrees. If None, the rotation
+            of the box.
+        :rtype: list
+        :returns: (x, y) tuples of top-left, top-right, bottom-right and
+            bottom-left corners.
+        """
+
+        a, b, c, d, e, f = self.transform(rotation)
+
+        points = []
+
+        for corner in CORNERS:
+            x = float(self.coords[corner][0].value)
+            y = float(self.coords[corner][1].value)
+
+            points.append((a * x + c * y + e, b * x + d * y + f))
+
+        return points
+
+    def bounds(self, rotation: float = None):
+        """
+        Returns the axis-aligned bounding box of the rotated box.
+
+        :type rotation: float
+        :param rotation: Rotation angle in degrees. If None, the rotation
+            of the box.
+        :rtype: tuple
+        :returns: (x min, y min, x max, y max)
+
+        .. seealso:: rotated_bounds()
+        """
+
+        if rotation is None:
+            rotation = self.rotation.value
+
+        return rotated_bounds([self], [rotation])[0]
 
     #--- Python __ methods -----------------------------------------------
 
@@ -1088,4 +1187,104 @@ class LocalDimBox(DimBox):
         DimBox.__init__(self)
         self.visible = True
 
+# Fonctions =============================================================#
+
+def rotation_matrix(degree: float):
+    """
+    Returns the cosinus and sinus of a rotation angle. Quarter turns are
+    exact, so that rotated boxes keep integer coordinates.
+
+    :type degree: float
+    :param degree: Rotation angle in degrees
+    :rtype: tuple
+    :returns: (cosinus, sinus)
+    """
+
+    if (matrix := ROTATIONS.get(degree)) is not None:
+        return matrix
+
+    quarter, rest = divmod(float(degree), 90)
+
+    if rest:
+        radians = math.radians(degree)
+        matrix = (math.cos(radians), math.sin(radians))
+    else:
+        matrix = [(1, 0), (0, 1), (-1, 0), (0, -1)][int(quarter) % 4]
+
+    ROTATIONS[degree] = matrix
+
+    return matrix
+
+def rotated_bounds(boxes: list, rotations: list = None):
+    """
+    Returns the axis-aligned bounding boxes of many rotated boxes.
+
+    Faster than calling DimBox.bounds() for each box: coordinates are
+    read once and rotation matrices are shared between boxes with the
+    same rotation.
+
+    :type boxes: list
+    :param boxes: DimBox instances
+    :type rotations: list
+    :param rotations: Rotation angle in degrees of each box. If None, the
+        rotation of each box.
+    :rtype: list
+    :returns: (x min, y min, x max, y max) tuple for each box
+
+    :Example:
+
+    .. code:: python
+
+       frames = document.query(page=1)
+
+       bounds = dimensions.rotated_bounds(
+           [frame.box for frame in frames],
+           [frame.rotated_box.rotation.value for frame in frames]
+       )
+
+    """
+
+    if rotations is None:
+        rotations = [box.rotation.value for box in boxes]
+
+    found = []
+
+    for box, rotation in zip(boxes, rotations):
+        top_left = box.coords["top-left"]
+        bottom_right = box.coords["bottom-right"]
+
+        x, y = float(top_left[0].value), float(top_left[1].value)
+        width = float(bottom_right[0].value) - x
+        height = float(bottom_right[1].value) - y
+
+        if not rotation:
+            found.append(
+                (
+                    min(x, x + width), min(y, y + height),
+                    max(x, x + width), max(y, y + height)
+                )
+            )
+            continue
+
+        if (matrix := ROTATIONS.get(rotation)) is None:
+            matrix = rotation_matrix(rotation)
+
+        cos, sin = matrix
+
+        # Corners relative to the top-left corner, which doesn't move, are
+        # sums of a rotated width (or 0) and a rotated height (or 0)
+        wx, wy = width * cos, width * sin
+        hx, hy = -height * sin, height * cos
+
+        found.append(
+            (
+                x + (wx if wx < 0 else 0) + (hx if hx < 0 else 0),
+                y + (wy if wy < 0 else 0) + (hy if hy < 0 else 0),
+                x + (wx if wx > 0 else 0) + (hx if hx > 0 else 0),
+                y + (wy if wy > 0 else 0) + (hy if hy > 0 else 0)
+            )
+        )
+
+    return found
+
 # vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -38,7 +38,9 @@ import pyscribus.pages as pages
 import pyscribus.styles as styles
 import pyscribus.itemattribute as itemattribute
 import pyscribus.patterns as patterns
+import pyscribus.symbols as symbols
 import pyscribus.pageobjects as pageobjects
+import pyscribus.stories as stories
 import pyscribus.notes as notes
 import pyscribus.printing as printing
 
@@ -46,6 +48,20 @@ import pyscribus.printing as printing
 
 __author__ = "Etienne Nadji <etnadji@eml.cc>"
 
+# Kinds of resources in ResourceReferences
+resource_kinds = [
+    "color", "gradient", "paragraph", "character", "table", "cell", "note",
+    "pattern", "layer", "mark"
+]
+
+# Kinds of resources removed by Document.purge()
+purgeable_kinds = [
+    "color", "gradient", "paragraph", "character", "table", "cell", "pattern"
+]
+
+# Resources kept by purges, even if unused
+purge_kept = {"color": ["Black", "White"], "note": ["Default"]}
+
 # Classes ===============================================================#
 
 class Document(PyScribusElement):
@@ -110,6 +126,21 @@ class Document(PyScribusElement):
 
         self.page_number = 0
 
+        # Index of the page set used, in page_sets (BOOK)
+        self.page_set = 0
+
+        # Index of page objects, see index()
+        self._index = None
+
+        # Last ItemID given by new_object_id()
+        self._last_object_id = None
+
+        # Patterns registry, see symbols()
+        self._symbols = None
+
+        # Resources references graph, see references()
+        self._references = None
+
         # Page dimensions, borders, bleeds
 
         self.dims = {
@@ -204,9 +235,6 @@ class Document(PyScribusElement):
         PAGESIZE="A4"
         # (optional) First page number in the Doc
         FIRSTNUM="1"
-        # (optional) Which PageSet to use
-        BOOK="0"
-
         # Number of Columns in automatic Textframes
         AUTOSPALTEN="1"
         # Distance between Columns in automatic Textframes
@@ -692,6 +720,11 @@ class Document(PyScribusElement):
             if (att_value := xml.get(att)) is not None:
                 self.bleed[human] = float(att_value)
 
+        # Page set
+
+        if (book := xml.get("BOOK")) is not None:
+            self.page_set = int(book)
+
         # UI show
 
         for att_name, ui_name in Document.ui_show_xml.items():
@@ -737,6 +770,7 @@ class Document(PyScribusElement):
         # --- DOCUMENT childs --------------------------------------------
 
         for child in xml:
+            cancel_point()
 
             if child.tag == "CheckProfile":
                 p = Profile()
@@ -927,10 +961,14 @@ class Document(PyScribusElement):
 
         # Bleed settings
 
+        # NOTE Bleeds are Dim instances in default documents,
+        # and floats in parsed ones.
+
         for att,human in Document.bleed_xml.items():
-            xml.attrib[att] = str(self.bleed[human])
+            xml.attrib[att] = float_or_int_string(float(self.bleed[human]))
 
         xml.attrib["ANZPAGES"] = str(self.page_number)
+        xml.attrib["BOOK"] = str(self.page_set)
 
         # Dimensions
 
@@ -1146,15 +1184,23 @@ class Document(PyScribusElement):
         # Pages -------------------------------------------
 
         for page in self.pages:
+            cancel_point()
             p = page.toxml()
             xml.append(p)
 
         # Pages objects -----------------------------------
 
         for po in self.page_objects:
+            cancel_point()
             px = po.toxml()
             xml.append(px)
 
+        # Patterns ----------------------------------------
+
+        for pattern in self.patterns:
+            px = pattern.toxml()
+            xml.append(px)
+
         # ----------------------------------------------------------------
 
         return xml
@@ -1266,6 +1312,570 @@ class Document(PyScribusElement):
 
         return stories
 
+    #--- Page objects by ItemID and text chains -----------------------------
+
+    def index(self):
+        """
+        Returns the index of the page objects of the document, including
+        page objects in groups and master pages objects.
+
+        The index is built on first use and kept up to date by append()
+        and remove(). If you modify page_objects directly, call
+        clear_index(). If you modify the ItemID, type, OwnPage or layer of
+        an indexed page object, call ``index().update(page_object)``.
+
+        :rtype: PageObjectsIndex
+        """
+
+        if self._index is None:
+            self._index = PageObjectsIndex(self.page_objects)
+
+        return self._index
+
+    def items_index(self):
+        """
+        Returns the index of the page objects of the document by ItemID.
+
+        :rtype: dict
+        :returns: ItemID as keys, page object as values
+
+        .. seealso:: index()
+        """
+
+        return self.index().items
+
+    def clear_index(self):
+        """
+        Clear the index of page objects, the patterns registry and the
+        resources references graph. They will be built again on next use.
+        """
+
+        self._index = None
+        self._symbols = None
+        self._references = None
+
+    def query(self, ptype=None, page=None, layer=None, master=None,
+            master_page=None):
+        """
+        Returns page objects matching all the given criteria, in the
+        order of the document. Page objects in groups are included.
+
+        Results are cached until the index changes.
+
+        :type ptype: str
+        :param ptype: Page object type (see pageobjects.po_type_xml)
+        :type page: int
+        :param page: Page, counted from 1 (OwnPage + 1)
+        :type layer: int
+        :param layer: Layer level
+        :type master: bool
+        :param master: On a master page or not
+        :type master_page: str
+        :param master_page: Name of the master page. Implies master=True.
+        :rtype: list
+
+        :Example:
+
+        .. code:: python
+
+           images = document.query(ptype="image", page=12, layer=2)
+           frames = document.query(ptype="text", master_page="Normal")
+
+        """
+
+        criteria = {}
+
+        if ptype is not None:
+            criteria["ptype"] = ptype
+
+        if page is not None:
+            criteria["page"] = page - 1
+
+        if layer is not None:
+            criteria["layer"] = layer
+
+        if master_page is not None:
+            master = True
+            criteria["page"] = -1
+
+            for index, mp in enumerate(self.master_pages):
+                if mp.name == master_page:
+                    criteria["page"] = index
+                    break
+
+        if master is not None:
+            criteria["master"] = bool(master)
+
+        return self.index().query(**criteria)
+
+    def bounds(self, page=None, layer=None, master=None):
+        """
+        Returns the axis-aligned bounding boxes of page objects, rotation
+        included, for layout checks and overlap detection.
+
+        Page objects are selected as in query(). Page objects in groups are
+        included, with their coordinates as stored in the SLA.
+
+        :type page: int
+        :param page: Page, counted from 1 (OwnPage + 1)
+        :type layer: int
+        :param layer: Layer level
+        :type master: bool
+        :param master: On a master page or not
+        :rtype: list
+        :returns: (page object, (x min, y min, x max, y max)) tuples
+
+        :Example:
+
+        .. code:: python
+
+           for frame, (x1, y1, x2, y2) in document.bounds(page=3):
+               if x2 > page_width:
+                   print(frame.name, "goes out of the page")
+
+        """
+
+        page_objects = self.query(page=page, layer=layer, master=master)
+
+        found = dimensions.rotated_bounds(
+            [po.box for po in page_objects],
+            [po.rotated_box.rotation.value for po in page_objects]
+        )
+
+        return list(zip(page_objects, found))
+
+    def remove(self, sla_object):
+        """
+        Remove a page object of the document.
+
+        :type sla_object: pyscribus.pageobjects.PageObject
+        :param sla_object: Page object to remove
+        :rtype: boolean
+        :returns: True if the page object was in the document
+        """
+
+        if isinstance(sla_object, pageobjects.PageObject):
+
+            for index, po in enumerate(self.page_objects):
+                if po is sla_object:
+                    del self.page_objects[index]
+
+                    if self._index is not None:
+                        self._index.remove(sla_object)
+
+                    if self._references is not None:
+                        self._references.remove(sla_object)
+
+                    return True
+
+        return False
+
+    #--- Resources references ------------------------------------------------
+
+    def references(self):
+        """
+        Returns the graph of the references of page objects, stories,
+        styles, gradients, patterns and notes to the named resources of
+        the document (colors, styles, patterns, layers…).
+
+        The graph is built on first use and kept up to date by append()
+        and remove(). If you modify the references of an object, call
+        ``references().update(sla_object)``. If you modify page_objects
+        directly, call clear_index().
+
+        :rtype: ResourceReferences
+
+        :Example:
+
+        .. code:: python
+
+           users = document.references().users("color", "Blue")
+           document.references().rename("paragraph", "Body", "Text")
+
+        """
+
+        if self._references is None:
+            self._references = ResourceReferences(self)
+
+        return self._references
+
+    def purge(self, kinds=None):
+        """
+        Remove the resources not used by the page objects of the document,
+        directly or through other used resources.
+
+        Default styles, registration colors and the resources of
+        purge_kept are kept.
+
+        :type kinds: list
+        :param kinds: Kinds of resources to remove (see resource_kinds).
+            If None, purgeable_kinds.
+        :rtype: dict
+        :returns: Kinds as keys, list of removed resources names as values
+        """
+
+        removed = self.references().purge(kinds)
+
+        if removed.get("pattern"):
+            self._symbols = None
+
+        return removed
+
+    def symbols(self):
+        """
+        Returns the registry of the patterns of the document, which
+        expands symbols into their pattern items.
+
+        Patterns appended with append() are registered. If you modify a
+        pattern, call ``symbols().register(pattern)``.
+
+        :rtype: pyscribus.symbols.SymbolRegistry
+        """
+
+        if self._symbols is None:
+            self._symbols = symbols.SymbolRegistry(self)
+
+        return self._symbols
+
+    def new_object_id(self):
+        """
+        Returns an ItemID not used by the page objects of the document.
+
+        :rtype: str
+        """
+
+        index = self.items_index()
+
+        if self._last_object_id is None:
+            self._last_object_id = max(
+                [int(i) for i in index if str(i).isdigit()], default=0
+            )
+
+        candidate = self._last_object_id + 1
+
+        while str(candidate) in index:
+            candidate += 1
+
+        self._last_object_id = candidate
+
+        return str(candidate)
+
+    def renew_object_ids(self, page_objects: list):
+        """
+        Give new ItemIDs to page objects (and to the page objects of
+        groups).
+
+        Text frames links between these page objects are kept, links to
+        other page objects are removed.
+
+        :type page_objects: list
+        :param page_objects: List of page objects
+        :rtype: dict
+        :returns: Old ItemIDs as keys, new ItemIDs as values
+        """
+
+        ids = {}
+        renewed = []
+
+        pending = list(page_objects)
+
+        while pending:
+            po = pending.pop()
+
+            old_id = po.object_id
+            po.object_id = self.new_object_id()
+
+            if old_id is not False:
+                ids[str(old_id)] = po.object_id
+
+            renewed.append(po)
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+        for po in renewed:
+            for direction in ["next", "previous"]:
+
+                if (linked := po.linked[direction]) is not None:
+                    po.linked[direction] = ids.get(str(linked))
+
+        return ids
+
+    def replicate_page(self, page, times: int = 1, callback=None,
+            gap: float = 40):
+        """
+        Append copies of a page and of its page objects to the document.
+
+        Copies are placed below the last page of the document, and
+        their page objects get new ItemIDs.
+
+        :type page: pyscribus.pages.Page,int
+        :param page: Page to copy, or its number (counted from 1)
+        :type times: int
+        :param times: Number of copies
+        :type callback: function
+        :param callback: Function called after each copy with the copy
+            index (from 0), the new page and the list of its new page
+            objects as arguments.
+        :type gap: float
+        :param gap: Vertical gap between pages
+        :rtype: list
+        :returns: New pages
+
+        :Example:
+
+        .. code:: python
+
+           def fill(index, page, page_objects):
+               for po in page_objects:
+                   if po.name == "Price":
+                       po.stories[0].sequence[0].text = prices[index]
+
+           document.replicate_page(1, len(prices), fill)
+
+        """
+
+        if isinstance(page, int):
+            page = self.pages[page - 1]
+
+        page_index = self.pages.index(page)
+
+        page_objects = []
+
+        for po in self.page_objects:
+            if po.on_master_page:
+                continue
+
+            if (po.own_page or 0) == page_index:
+                page_objects.append(po)
+
+        new_pages = []
+
+        bottom = max(float(p.box.gety("bottom-left")) for p in self.pages)
+
+        for copy_index in range(times):
+            memo = {id(self): self, id(self.sla_parent): self.sla_parent}
+
+            with gc_paused():
+                new_page = page.clone(memo)
+                new_objects = [po.clone(memo) for po in page_objects]
+
+            new_page.number = len(self.pages) + 1
+
+            shift = bottom + gap - float(page.box.gety("top-left"))
+            new_page.box.translate(0, shift)
+
+            bottom = float(new_page.box.gety("bottom-left"))
+
+            new_index = len(self.pages)
+            self.pages.append(new_page)
+
+            self.renew_object_ids(new_objects)
+
+            for po in new_objects:
+                po.own_page = new_index if new_index else False
+
+                pending = [po]
+
+                while pending:
+                    child = pending.pop()
+
+                    for box in [child.box, child.rotated_box, child.gbox]:
+                        box.translate(0, shift)
+
+                    if isinstance(child, pageobjects.GroupObject):
+                        child.group_box.translate(0, shift)
+                        pending.extend(child.group_objects)
+
+                self.append(po)
+
+            if callback is not None:
+                callback(copy_index, new_page, new_objects)
+
+            new_pages.append(new_page)
+
+        self.page_number = len(self.pages)
+
+        return new_pages
+
+    def item(self, object_id):
+        """
+        Returns the page object with this ItemID.
+
+        :type object_id: str
+        :param object_id: ItemID of the page object
+        :rtype: pyscribus.pageobjects.PageObject, None
+        :returns: Page object, or None if there is no page object with this
+            ItemID.
+        """
+
+        index = self.index()
+
+        if (po := index.items.get(str(object_id))) is not None:
+
+            # The ItemID of the page object changed since indexing
+            if po.object_id != str(object_id):
+                index.update(po)
+                return index.items.get(str(object_id))
+
+        return po
+
+    def text_chain(self, frame):
+        """
+        Returns the chain of linked frames (NEXTITEM, BACKITEM) containing
+        frame, from the first frame to the last one.
+
+        :type frame: pyscribus.pageobjects.PageObject, str
+        :param frame: Page object or its ItemID
+        :rtype: list
+        :returns: Linked frames. Dangling links end the chain, as circular
+            links do.
+        """
+
+        if not isinstance(frame, pageobjects.PageObject):
+            if (frame := self.item(frame)) is None:
+                return []
+
+        index = self.items_index()
+
+        # --- Back to the first frame --------------------------------
+
+        seen = {id(frame)}
+        first = frame
+
+        while (previous := first.linked["previous"]) is not None:
+            previous = index.get(previous)
+
+            if previous is None or id(previous) in seen:
+                break
+
+            seen.add(id(previous))
+            first = previous
+
+        # --- Then to the last one -----------------------------------
+
+        chain = [first]
+        seen = {id(first)}
+
+        while (following := chain[-1].linked["next"]) is not None:
+            following = index.get(following)
+
+            if following is None or id(following) in seen:
+                break
+
+            seen.add(id(following))
+            chain.append(following)
+
+        return chain
+
+    def text_chains(self):
+        """
+        Returns all chains of linked frames of the document.
+
+        :rtype: list
+        :returns: List of chains (lists of page objects, from the first frame
+            to the last one). Frames not linked are not listed.
+        """
+
+        chains = []
+        chained = set()
+
+        for po in self.items_index().values():
+
+            if id(po) in chained:
+                continue
+
+            if po.linked["next"] is None and po.linked["previous"] is None:
+                continue
+
+            chain = self.text_chain(po)
+            chained.update(id(frame) for frame in chain)
+            chains.append(chain)
+
+        return chains
+
+    def check_links(self):
+        """
+        Check the links between frames (NEXTITEM, BACKITEM).
+
+        :rtype: list
+        :returns: List of problems, as (problem, ItemID, linked ItemID)
+            tuples. Problem is "dangling-next" or "dangling-previous" if
+            the linked page object doesn't exist, "asymmetric" if the next
+            frame doesn't link back to the page object, "circular" if the
+            chain loops.
+        """
+
+        problems = []
+        index = self.items_index()
+
+        # First frames of chains
+        heads = set()
+
+        for object_id, po in index.items():
+
+            for direction in ["next", "previous"]:
+
+                if (linked_id := po.linked[direction]) is None:
+                    continue
+
+                if linked_id not in index:
+                    problems.append(
+                        ("dangling-" + direction, object_id, linked_id)
+                    )
+
+            if (next_id := po.linked["next"]) is not None:
+
+                if (following := index.get(next_id)) is not None:
+
+                    if following.linked["previous"] != object_id:
+                        problems.append(("asymmetric", object_id, next_id))
+
+            if po.linked["next"] is not None and (
+                    po.linked["previous"] is None
+                    or po.linked["previous"] not in index):
+                heads.add(object_id)
+
+        # Each frame is visited once: chains are followed from their
+        # first frame, then remaining frames are in loops.
+
+        visited = set()
+
+        def follow(object_id):
+            path = set()
+
+            while object_id is not None and object_id in index:
+
+                if object_id in path:
+                    return object_id
+
+                if object_id in visited:
+                    return None
+
+                path.add(object_id)
+                visited.add(object_id)
+
+                object_id = index[object_id].linked["next"]
+
+            return None
+
+        starts = list(heads) + [
+            object_id for object_id, po in index.items()
+            if po.linked["next"] is not None
+        ]
+
+        for object_id in starts:
+
+            if object_id in visited:
+                continue
+
+            if (loop_id := follow(object_id)) is not None:
+                problems.append(
+                    ("circular", loop_id, index[loop_id].linked["next"])
+                )
+
+        return problems
+
     #========================================================================
 
     def page_number(self):
@@ -1358,6 +1968,12 @@ class Document(PyScribusElement):
 
                 self.page_objects.append(sla_object)
 
+                if self._index is not None:
+                    self._index.add(sla_object)
+
+                if self._references is not None:
+                    self._references.add(sla_object)
+
                 return True
             else:
                 return False
@@ -1466,10 +2082,28 @@ class Document(PyScribusElement):
 
                 return True
 
+        if isinstance(sla_object, patterns.Pattern):
+            sla_object.doc_parent = self
+            sla_object.sla_parent = self.sla_parent
+
+            self.patterns.append(sla_object)
+
+            if self._symbols is not None:
+                self._symbols.register(sla_object)
+
+            if self._references is not None:
+                self._references.add(sla_object)
+
+            return True
+
         if isinstance(sla_object, styles.StyleAbstract):
 
             if isinstance(sla_object, styles.NoteStyle):
                 self.styles["note"].append(sla_object)
+
+                if self._references is not None:
+                    self._references.add(sla_object)
+
                 return True
 
             else:
@@ -1481,10 +2115,18 @@ class Document(PyScribusElement):
 
                 if isinstance(sla_object, styles.ParagraphStyle):
                     self.styles["paragraph"].append(sla_object)
+
+                    if self._references is not None:
+                        self._references.add(sla_object)
+
                     return True
 
                 if isinstance(sla_object, styles.CharacterStyle):
                     self.styles["character"].append(sla_object)
+
+                    if self._references is not None:
+                        self._references.add(sla_object)
+
                     return True
 
                 # TODO NOTE Then we should call a "hook" to all styles that
@@ -1501,6 +2143,730 @@ class Document(PyScribusElement):
     #========================================================================
 
 
+class PageObjectsIndex:
+    """
+    Index of page objects by ItemID, and by type, OwnPage, layer and
+    master page status for queries.
+
+    Page objects in groups are indexed too.
+
+    :type page_objects: list
+    :param page_objects: Page objects to index
+
+    :ivar dict items: ItemID as keys, page object as values
+    """
+
+    keys = ["ptype", "page", "layer", "master"]
+
+    def __init__(self, page_objects: list = []):
+        self.items = {}
+
+        # (key, value) -> {id(page object): page object}
+        self.buckets = {}
+
+        # id(page object) -> [(key, value)…] of the page object when
+        # indexed, and its rank in the index
+        self.indexed = {}
+        self.ranks = {}
+
+        self._next_rank = 0
+        self._cache = {}
+
+        for po in page_objects:
+            self.add(po)
+
+    @staticmethod
+    def _keys(po):
+        own_page = po.own_page
+
+        if own_page is False:
+            own_page = 0
+
+        return [
+            ("ptype", po.ptype),
+            ("page", own_page),
+            ("layer", po.layer),
+            ("master", bool(po.on_master_page)),
+        ]
+
+    def add(self, po):
+        """
+        Index a page object, and the page objects of a group.
+
+        :type po: pyscribus.pageobjects.PageObject
+        """
+
+        self._cache = {}
+
+        pending = [po]
+
+        while pending:
+            po = pending.pop(0)
+            keys = PageObjectsIndex._keys(po)
+
+            self.items[po.object_id] = po
+            self.indexed[id(po)] = keys
+
+            if id(po) not in self.ranks:
+                self.ranks[id(po)] = self._next_rank
+                self._next_rank += 1
+
+            for key in keys:
+                self.buckets.setdefault(key, {})[id(po)] = po
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+    def remove(self, po):
+        """
+        Remove a page object, and the page objects of a group, from the
+        index.
+
+        :type po: pyscribus.pageobjects.PageObject
+        """
+
+        self._cache = {}
+
+        pending = [po]
+
+        while pending:
+            po = pending.pop()
+
+            if (keys := self.indexed.pop(id(po), None)) is None:
+                continue
+
+            del self.ranks[id(po)]
+
+            for key in keys:
+                self.buckets[key].pop(id(po), None)
+
+            self._forget(po)
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+    def update(self, po):
+        """
+        Index a page object again, after a change of its ItemID, type,
+        OwnPage or layer.
+
+        :type po: pyscribus.pageobjects.PageObject
+        """
+
+        self._cache = {}
+
+        if (keys := self.indexed.get(id(po))) is not None:
+            for key in keys:
+                self.buckets[key].pop(id(po), None)
+
+        self._forget(po)
+
+        keys = PageObjectsIndex._keys(po)
+
+        self.items[po.object_id] = po
+        self.indexed[id(po)] = keys
+
+        if id(po) not in self.ranks:
+            self.ranks[id(po)] = self._next_rank
+            self._next_rank += 1
+
+        for key in keys:
+            self.buckets.setdefault(key, {})[id(po)] = po
+
+    def _forget(self, po):
+        if self.items.get(po.object_id) is po:
+            del self.items[po.object_id]
+            return
+
+        # ItemID changed since indexing
+        for object_id, item in list(self.items.items()):
+            if item is po:
+                del self.items[object_id]
+                break
+
+    def query(self, **criteria):
+        """
+        Returns page objects matching all criteria, by intersection of
+        the index buckets, in indexing order.
+
+        :param criteria: Values of ptype, page (OwnPage), layer, master
+        :rtype: list
+        """
+
+        for key in criteria:
+            if key not in PageObjectsIndex.keys:
+                raise ValueError(
+                    "Unknown criterion {}. Use {}.".format(
+                        key, ", ".join(PageObjectsIndex.keys)
+                    )
+                )
+
+        cache_key = tuple(sorted(criteria.items()))
+
+        if (cached := self._cache.get(cache_key)) is not None:
+            return list(cached)
+
+        if not criteria:
+            buckets = [
+                {id(po): po for po in self._all()}
+            ]
+        else:
+            buckets = sorted(
+                [self.buckets.get(key, {}) for key in criteria.items()],
+                key=len
+            )
+
+        smallest, others = buckets[0], buckets[1:]
+
+        found = [
+            po for key, po in smallest.items()
+            if all(key in bucket for bucket in others)
+        ]
+
+        found.sort(key=lambda po: self.ranks[id(po)])
+
+        self._cache[cache_key] = tuple(found)
+
+        return found
+
+    def _all(self):
+        for po_id in self.indexed:
+            for key in self.indexed[po_id][:1]:
+                yield self.buckets[key][po_id]
+
+
+class ResourceReferences:
+    """
+    Graph of the references of page objects, stories, styles, gradients,
+    patterns, notes and document settings to the named resources of a
+    document.
+
+    References are bucketed by (kind, name) of the referenced resource,
+    so users() is a dictionnary lookup. Each reference remembers the
+    dict or object holding the name, so rename() rewrites references
+    without scanning the document.
+
+    Page objects in groups and pattern items are registered too.
+
+    :type document: Document
+    :param document: Document
+
+    :ivar dict references: (kind, name) as keys, dicts of references as
+        values. References are (referrer, holder, attribute or key)
+        tuples.
+    """
+
+    def __init__(self, document):
+        self.document = document
+
+        self.references = {}
+
+        # id(referrer) -> [[kind, name, reference key]…]
+        self.holders = {}
+        # id(referrer) -> referrer
+        self.referrers = {}
+        # id(referrer) -> resource owning the referrer (style, gradient,
+        # pattern), or None for page objects, notes and notes frames
+        self.origins = {}
+
+        for kind in ["paragraph", "character", "table", "cell", "note"]:
+            for style in document.styles[kind]:
+                self.add(style)
+
+        for resource in document.gradients + document.patterns:
+            self.add(resource)
+
+        for referrer in [document] + document.page_objects \
+                + document.notes_frames + document.notes:
+            self.add(referrer)
+
+    # --- Scanning -------------------------------------------------------
+
+    @staticmethod
+    def _kind(resource):
+        """
+        Returns the kind of a resource owning references.
+        """
+
+        if isinstance(resource, styles.NoteStyle):
+            return "note"
+
+        if isinstance(resource, pscolors.Gradient):
+            return "gradient"
+
+        if isinstance(resource, patterns.Pattern):
+            return "pattern"
+
+        return resource.style_type
+
+    @staticmethod
+    def _scan_style(holder):
+        """
+        Yields (kind, holder, key) of the colors of a style, a table or a
+        table cell.
+        """
+
+        if (font := getattr(holder, "font", None)):
+            yield ("color", font, "color")
+
+        if (fill := getattr(holder, "fill", None)):
+            yield ("color", fill, "color")
+
+        borders = getattr(holder, "borders", [])
+
+        if isinstance(borders, dict):
+            borders = borders.values()
+
+        for border in borders:
+            for line in getattr(border, "lines", []):
+                yield ("color", line, "color")
+
+    @staticmethod
+    def _scan_story(story):
+        if story is None:
+            return
+
+        for element in story.sequence:
+
+            if isinstance(
+                    element,
+                    (stories.StoryParagraphEnding, stories.StoryEnding)):
+                yield ("paragraph", element, "parent")
+
+            elif isinstance(element, stories.StoryFragment):
+                # Font details are immutable, see _set()
+                yield ("color", element, ("font", "color"))
+
+            elif isinstance(element, marks.StoryMarkAbstract):
+                yield ("mark", element, "label")
+
+    @staticmethod
+    def _scan(referrer):
+        """
+        Yields (kind, holder, key) of the references of a referrer, page
+        objects of groups and pattern items excepted.
+        """
+
+        if isinstance(referrer, pageobjects.PageObject):
+            yield ("color", referrer.outline, "fill")
+            yield ("color", referrer.outline, "stroke")
+            yield ("layer", referrer, "layer")
+
+            yield ("gradient", referrer.undocumented, "GRNAME")
+            yield ("gradient", referrer.undocumented, "GRNAMES")
+
+            if isinstance(referrer, pageobjects.SymbolObject):
+                yield ("pattern", referrer, "pattern")
+            else:
+                yield ("pattern", referrer.undocumented, "pattern")
+
+            yield ("pattern", referrer.undocumented, "patternS")
+
+            for story in getattr(referrer, "stories", []):
+                yield from ResourceReferences._scan_story(story)
+
+            if isinstance(referrer, pageobjects.TableObject):
+                yield ("table", referrer, "style")
+                yield from ResourceReferences._scan_style(referrer)
+
+                for cell in referrer.cells:
+                    yield ("cell", cell, "style")
+                    yield from ResourceReferences._scan_style(cell)
+                    yield from ResourceReferences._scan_story(cell.story)
+
+            return
+
+        if isinstance(referrer, styles.NoteStyle):
+            yield ("character", referrer.styles, "mark")
+            yield ("paragraph", referrer.styles, "note")
+            return
+
+        if isinstance(referrer, styles.StyleAbstract):
+            yield (referrer.style_type, referrer, "parent")
+
+            if referrer.style_type == "paragraph":
+                yield ("character", referrer, "character_parent")
+
+            yield from ResourceReferences._scan_style(referrer)
+
+            # Stroke and background colors
+            undocumented = getattr(referrer, "undocumented", {})
+
+            for key in ["SCOLOR", "BCOLOR"]:
+                yield ("color", undocumented, key)
+
+            return
+
+        if isinstance(referrer, Document):
+            yield ("color", referrer.calligraphicpen, "line_color")
+            yield ("color", referrer.calligraphicpen, "fill_color")
+            return
+
+        if isinstance(referrer, pscolors.Gradient):
+            for stop in referrer.stops:
+                yield ("color", stop, "color")
+            return
+
+        if isinstance(referrer, notes.NoteFrame):
+            yield ("note", referrer, "note_style")
+            return
+
+        if isinstance(referrer, notes.Note):
+            yield ("note", referrer, "style")
+
+    @staticmethod
+    def _get(holder, key):
+        if isinstance(key, tuple):
+            return getattr(holder, key[0])[key[1]]
+
+        if isinstance(holder, dict):
+            return holder.get(key)
+
+        return getattr(holder, key, None)
+
+    @staticmethod
+    def _set(holder, key, value):
+        if isinstance(key, tuple):
+            # (attribute, key) of an immutable mapping (FontSpec…),
+            # replaced by a modified copy
+            mapping = getattr(holder, key[0])
+            setattr(
+                holder, key[0], mapping.__class__(mapping, **{key[1]: value})
+            )
+        elif isinstance(holder, dict):
+            holder[key] = value
+        else:
+            setattr(holder, key, value)
+
+    @staticmethod
+    def _walk(referrer):
+        """
+        Yields (referrer, owning resource) of a referrer, page objects of
+        its groups and its pattern items.
+        """
+
+        if isinstance(referrer, patterns.Pattern):
+            origin = referrer
+            pending = list(referrer.items)
+
+            yield (referrer, referrer)
+
+        elif isinstance(
+                referrer,
+                (styles.StyleAbstract, styles.NoteStyle, pscolors.Gradient)):
+            yield (referrer, referrer)
+            return
+
+        else:
+            origin = None
+            pending = [referrer]
+
+        while pending:
+            po = pending.pop()
+
+            yield (po, origin)
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+    # --- Updating -------------------------------------------------------
+
+    def add(self, referrer):
+        """
+        Register the references of a referrer (page object, style,
+        gradient, pattern, note, note frame).
+        """
+
+        for referrer, origin in ResourceReferences._walk(referrer):
+
+            if id(referrer) in self.referrers:
+                self._forget(referrer)
+
+            holders = []
+
+            for kind, holder, key in ResourceReferences._scan(referrer):
+                name = ResourceReferences._get(holder, key)
+
+                if name is None or name is False or name == "":
+                    continue
+
+                if kind == "color" and name == "None":
+                    continue
+
+                reference_key = (id(holder), key)
+
+                self.references.setdefault((kind, name), {})[
+                    reference_key
+                ] = (referrer, holder, key)
+
+                holders.append([kind, name, reference_key])
+
+            self.holders[id(referrer)] = holders
+            self.referrers[id(referrer)] = referrer
+            self.origins[id(referrer)] = origin
+
+    def remove(self, referrer):
+        """
+        Unregister the references of a referrer.
+        """
+
+        for referrer, _ in ResourceReferences._walk(referrer):
+            self._forget(referrer)
+
+    def update(self, referrer):
+        """
+        Register the references of a modified referrer again.
+        """
+
+        self.remove(referrer)
+        self.add(referrer)
+
+    def _forget(self, referrer):
+        for kind, name, reference_key in self.holders.pop(id(referrer), []):
+            if (bucket := self.references.get((kind, name))) is not None:
+                bucket.pop(reference_key, None)
+
+                if not bucket:
+                    del self.references[(kind, name)]
+
+        self.referrers.pop(id(referrer), None)
+        self.origins.pop(id(referrer), None)
+
+    # --- Resources ------------------------------------------------------
+
+    def resources(self, kind: str):
+        """
+        Returns the resources of a kind of the document.
+
+        :type kind: str
+        :param kind: Kind of resource (see resource_kinds)
+        :rtype: list
+        """
+
+        if kind not in resource_kinds:
+            raise ValueError(
+                "Unknown resource kind {}. Use {}.".format(
+                    kind, ", ".join(resource_kinds)
+                )
+            )
+
+        if kind == "color":
+            return self.document.colors
+
+        if kind == "gradient":
+            return self.document.gradients
+
+        if kind == "pattern":
+            return self.document.patterns
+
+        if kind == "layer":
+            return self.document.layers
+
+        if kind == "mark":
+            return self.document.marks
+
+        return self.document.styles[kind]
+
+    @staticmethod
+    def _key(kind: str, resource):
+        if kind == "layer":
+            return resource.level
+
+        if kind == "mark":
+            return resource.label
+
+        return resource.name
+
+    @staticmethod
+    def _set_key(kind: str, resource, name):
+        if kind == "layer":
+            resource.level = name
+        elif kind == "mark":
+            if resource.name == resource.label:
+                resource.name = name
+
+            resource.label = name
+        else:
+            resource.name = name
+
+    # --- Queries --------------------------------------------------------
+
+    def users(self, kind: str, name):
+        """
+        Returns the page objects, styles, gradients, patterns items and
+        notes using a resource.
+
+        :type kind: str
+        :param kind: Kind of resource (see resource_kinds)
+        :param name: Name of the resource (level for layers, label for
+            marks)
+        :rtype: list
+        """
+
+        return list({
+            id(referrer): referrer
+            for referrer, _, _ in self.references.get((kind, name), {}).values()
+        }.values())
+
+    def count(self, kind: str, name):
+        """
+        Returns the count of references to a resource.
+
+        :rtype: int
+        """
+
+        return len(self.references.get((kind, name), {}))
+
+    def rename(self, kind: str, old, new):
+        """
+        Rename a resource, and all its references.
+
+        :type kind: str
+        :param kind: Kind of resource (see resource_kinds)
+        :param old: Current name of the resource
+        :param new: New name of the resource
+        :rtype: int
+        :returns: Count of renamed references
+        :raises ValueError: If a resource of that kind is already named
+            new
+        """
+
+        if old == new:
+            return 0
+
+        resources = self.resources(kind)
+
+        for resource in resources:
+            if ResourceReferences._key(kind, resource) == new:
+                raise ValueError(
+                    "A {} resource is already named {}".format(kind, new)
+                )
+
+        for resource in resources:
+            if ResourceReferences._key(kind, resource) == old:
+                ResourceReferences._set_key(kind, resource, new)
+
+        bucket = self.references.pop((kind, old), {})
+
+        for reference_key, (referrer, holder, key) in bucket.items():
+            ResourceReferences._set(holder, key, new)
+
+            for holding in self.holders[id(referrer)]:
+                if holding[0] == kind and holding[2] == reference_key:
+                    holding[1] = new
+
+        if bucket:
+            self.references.setdefault((kind, new), {}).update(bucket)
+
+        return len(bucket)
+
+    def unused(self, kinds=None):
+        """
+        Returns the resources not used by page objects, notes and notes
+        frames, directly or through used resources.
+
+        Default styles, registration colors and the resources of
+        purge_kept are always used.
+
+        :type kinds: list
+        :param kinds: Kinds of resources (see resource_kinds). If None,
+            purgeable_kinds.
+        :rtype: dict
+        :returns: Kinds as keys, list of unused resources as values
+        """
+
+        if kinds is None:
+            kinds = purgeable_kinds
+
+        # Referrers owned by each resource
+        owned = {}
+        pending = []
+
+        for referrer_id, origin in self.origins.items():
+            if origin is None:
+                pending.append(referrer_id)
+            else:
+                kind = ResourceReferences._kind(origin)
+
+                owned.setdefault(
+                    (kind, ResourceReferences._key(kind, origin)), []
+                ).append(referrer_id)
+
+        # --- Always used resources --------------------------------------
+
+        used = set()
+
+        for kind in resource_kinds:
+            for resource in self.resources(kind):
+                key = (kind, ResourceReferences._key(kind, resource))
+
+                if getattr(resource, "is_default", False) \
+                        or (kind == "color" and resource.register) \
+                        or key[1] in purge_kept.get(kind, []):
+                    used.add(key)
+                    pending.extend(owned.get(key, []))
+
+        # --- Used resources, by their users -----------------------------
+
+        while pending:
+            referrer_id = pending.pop()
+
+            for kind, name, _ in self.holders.get(referrer_id, []):
+                if (kind, name) in used:
+                    continue
+
+                used.add((kind, name))
+                pending.extend(owned.get((kind, name), []))
+
+        return {
+            kind: [
+                resource for resource in self.resources(kind)
+                if (kind, ResourceReferences._key(kind, resource)) not in used
+            ]
+            for kind in kinds
+        }
+
+    def purge(self, kinds=None):
+        """
+        Remove the unused resources of the document.
+
+        :type kinds: list
+        :param kinds: Kinds of resources (see resource_kinds). If None,
+            purgeable_kinds.
+        :rtype: dict
+        :returns: Kinds as keys, list of removed resources names as values
+
+        .. seealso:: unused()
+        """
+
+        unused = self.unused(kinds)
+        removed = {}
+
+        for kind, resources in unused.items():
+            ids = {id(resource) for resource in resources}
+
+            kept = [
+                resource for resource in self.resources(kind)
+                if id(resource) not in ids
+            ]
+
+            self.resources(kind)[:] = kept
+
+            for resource in resources:
+                if isinstance(
+                        resource,
+                        (styles.StyleAbstract, styles.NoteStyle,
+                         pscolors.Gradient, patterns.Pattern)):
+                    self.remove(resource)
+
+            removed[kind] = [
+                ResourceReferences._key(kind, resource)
+                for resource in resources
+            ]
+
+        return removed
+
+
 class Profile(PyScribusElement):
     """
     """
@@ -1860,11 +3226,10 @@ class Layer(PyScribusElement):
 
             if blend is not None:
 
-                for code,human in Layer.blendmodes_to_xml.items():
+                codes = reverse_xml(Layer.blendmodes_to_xml)
 
-                    if code == blend:
-                        self.blend = human
-                        break
+                if (human := codes.get(blend)) is not None:
+                    self.blend = human
 
             return True
 
@@ -129,4 +129,13 @@ class IncompatibleDim(Exception):
     """
     pass
 
+# --- Jobs -----------------------------------------------------
+
+class Cancelled(Exception):
+    """
+    Exception raised when a parsing, saving or rendering job is cancelled
+    while it runs.
+    """
+    pass
+
 # vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,597 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Palettes of colors packed in NumPy arrays: colors spaces conversions,
+nearest color matching and remapping of colors names in documents.
+
+CMYK and RGB conversions are uncalibrated device conversions, as done by
+Scribus when color management is off. Lab values are CIE L*a*b* (D65) of
+the sRGB values of the colors, and color differences are CIE76 ΔE.
+
+Nearest colors are found with a KD-tree if SciPy is installed, and by
+comparing all colors otherwise.
+
+:Example:
+
+.. code:: python
+
+   brand = palette.Palette(sla.SLA("brand.sla").document.colors)
+   document = sla.SLA("flyer.sla").document
+
+   # Replace colors close to brand colors by the brand colors
+   mapping = palette.conform(document, brand, tolerance=3)
+
+"""
+
+# Imports ===============================================================#
+
+import numpy
+
+import pyscribus.colors as colors
+import pyscribus.stories as stories
+import pyscribus.pageobjects as pageobjects
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# sRGB (D65) to CIE XYZ
+RGB_TO_XYZ = numpy.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+XYZ_TO_RGB = numpy.linalg.inv(RGB_TO_XYZ)
+
+# D65 reference white
+WHITE = numpy.array([0.95047, 1.0, 1.08883])
+
+# Colors differences computed at once without KD-tree
+CHUNK_SIZE = 1 << 20
+
+# Color spaces and their values count
+spaces = {"cmyk": 4, "rgb": 3, "lab": 3}
+
+# Classes ===============================================================#
+
+class Palette:
+    """
+    Colors packed in NumPy arrays, in CMYK, RGB and Lab.
+
+    The palette is a snapshot: if colors are modified, make a new
+    palette.
+
+    :type colors: list
+    :param colors: List of pyscribus.colors.Color, like the colors of a
+        document (Document.colors)
+
+    :ivar list colors: Colors of the palette
+    :ivar list names: Names of the colors
+    :ivar numpy.ndarray cmyk: CMYK values (0-100) of the colors
+    :ivar numpy.ndarray rgb: RGB values (0-255) of the colors
+    :ivar numpy.ndarray lab: Lab values of the colors
+    :ivar numpy.ndarray is_cmyk: True for colors defined in CMYK
+    """
+
+    def __init__(self, colors: list):
+        self.colors = list(colors)
+        self.names = [color.name for color in self.colors]
+
+        self._indexes = {}
+
+        for index, name in enumerate(self.names):
+            self._indexes.setdefault(name, index)
+
+        self.is_cmyk = numpy.array(
+            [bool(color.is_cmyk) for color in self.colors], dtype=bool
+        )
+
+        # --- Defined inks -----------------------------------------------
+
+        self.cmyk = numpy.zeros((len(self.colors), 4))
+        self.rgb = numpy.zeros((len(self.colors), 3))
+
+        for index, color in enumerate(self.colors):
+            if color.is_cmyk:
+                self.cmyk[index] = [color.colors[ink] for ink in "CMYK"]
+            else:
+                self.rgb[index] = [color.colors[ink] for ink in "RGB"]
+
+        # --- Conversions ------------------------------------------------
+
+        self.rgb[self.is_cmyk] = cmyk_to_rgb(self.cmyk[self.is_cmyk])
+        self.cmyk[~self.is_cmyk] = rgb_to_cmyk(self.rgb[~self.is_cmyk])
+
+        self.lab = rgb_to_lab(self.rgb)
+
+        self._tree = None
+
+    def __len__(self):
+        return len(self.colors)
+
+    def index(self, name: str):
+        """
+        Returns the index of a color in the palette arrays.
+
+        :type name: str
+        :param name: Color name
+        :rtype: int
+        :raises KeyError: If the palette has no color of that name
+        """
+
+        return self._indexes[name]
+
+    def values(self, space: str = "lab"):
+        """
+        Returns the values of the colors in a color space.
+
+        :type space: str
+        :param space: "cmyk", "rgb" or "lab"
+        :rtype: numpy.ndarray
+        """
+
+        if space not in spaces:
+            raise ValueError("Unknown color space {}".format(space))
+
+        return getattr(self, space)
+
+    def tocolors(self, space: str):
+        """
+        Returns the colors of the palette converted to a color space.
+
+        :type space: str
+        :param space: "cmyk" or "rgb"
+        :rtype: list
+        :returns: List of new pyscribus.colors.Color
+        """
+
+        if space not in ["cmyk", "rgb"]:
+            raise ValueError("Colors can only be CMYK or RGB")
+
+        return [
+            colors.Color(
+                color.name, space, [float(ink) for ink in inks],
+                color.register
+            )
+            for color, inks in zip(self.colors, self.values(space))
+        ]
+
+    # --- Nearest colors -------------------------------------------------
+
+    def _kdtree(self):
+        if self._tree is None:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                self._tree = False
+            else:
+                self._tree = cKDTree(self.lab)
+
+        return self._tree
+
+    def nearest(self, lab, count: int = 1):
+        """
+        Returns the nearest colors of the palette of Lab values.
+
+        :type lab: numpy.ndarray
+        :param lab: Lab values, as a (n, 3) array
+        :type count: int
+        :param count: Number of nearest colors by Lab value
+        :rtype: tuple
+        :returns: (ΔE, indexes) arrays of shape (n, count)
+        """
+
+        lab = numpy.asarray(lab, dtype=float).reshape(-1, 3)
+        count = min(count, len(self))
+
+        if not count or not len(lab):
+            return (
+                numpy.zeros((len(lab), count)),
+                numpy.zeros((len(lab), count), dtype=int)
+            )
+
+        if (tree := self._kdtree()):
+            distances, indexes = tree.query(lab, k=count)
+
+            return (
+                distances.reshape(len(lab), count),
+                indexes.reshape(len(lab), count)
+            )
+
+        # --- Without SciPy ----------------------------------------------
+
+        distances = numpy.empty((len(lab), count))
+        indexes = numpy.empty((len(lab), count), dtype=int)
+
+        rows = max(1, CHUNK_SIZE // len(self))
+
+        for start in range(0, len(lab), rows):
+            chunk = lab[start:start + rows]
+
+            matrix = delta_e(chunk[:, numpy.newaxis, :], self.lab)
+
+            if count < len(self):
+                found = numpy.argpartition(matrix, count - 1, axis=1)
+                found = found[:, :count]
+            else:
+                found = numpy.broadcast_to(
+                    numpy.arange(len(self)), matrix.shape
+                )
+
+            found_distances = numpy.take_along_axis(matrix, found, axis=1)
+            order = numpy.argsort(found_distances, axis=1, kind="stable")
+
+            end = start + len(chunk)
+            indexes[start:end] = numpy.take_along_axis(found, order, axis=1)
+            distances[start:end] = numpy.take_along_axis(
+                found_distances, order, axis=1
+            )
+
+        return distances, indexes
+
+    def match(self, other, tolerance=None):
+        """
+        Returns the nearest colors of this palette of the colors of
+        another palette.
+
+        :type other: Palette
+        :param other: Palette of the colors to match
+        :type tolerance: float
+        :param tolerance: Maximal ΔE of matched colors. If None, all
+            colors are matched.
+        :rtype: dict
+        :returns: Names of the colors of other as keys, (name of the
+            nearest color, ΔE) as values
+        """
+
+        distances, indexes = self.nearest(other.lab)
+
+        matched = {}
+
+        for name, distance, index in zip(
+                other.names, distances[:, 0], indexes[:, 0]):
+
+            if tolerance is not None and distance > tolerance:
+                continue
+
+            matched.setdefault(name, (self.names[index], float(distance)))
+
+        return matched
+
+# Fonctions =============================================================#
+
+def _linear(rgb):
+    rgb = numpy.asarray(rgb, dtype=float) / 255
+
+    return numpy.where(
+        rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4
+    )
+
+def _gamma(linear):
+    linear = numpy.clip(linear, 0, 1)
+
+    rgb = numpy.where(
+        linear <= 0.0031308,
+        linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055
+    )
+
+    return numpy.clip(rgb * 255, 0, 255)
+
+def cmyk_to_rgb(cmyk):
+    """
+    Converts CMYK values (0-100) to RGB values (0-255).
+
+    :type cmyk: numpy.ndarray
+    :param cmyk: (n, 4) array
+    :rtype: numpy.ndarray
+    """
+
+    cmyk = numpy.asarray(cmyk, dtype=float).reshape(-1, 4)
+
+    return numpy.clip(
+        255 - (cmyk[:, :3] + cmyk[:, 3:]) * 2.55, 0, 255
+    )
+
+def rgb_to_cmyk(rgb):
+    """
+    Converts RGB values (0-255) to CMYK values (0-100), with full
+    under color removal.
+
+    :type rgb: numpy.ndarray
+    :param rgb: (n, 3) array
+    :rtype: numpy.ndarray
+    """
+
+    cmy = 255 - numpy.asarray(rgb, dtype=float).reshape(-1, 3)
+    black = cmy.min(axis=1, keepdims=True)
+
+    return numpy.hstack([cmy - black, black]) / 2.55
+
+def rgb_to_lab(rgb):
+    """
+    Converts RGB values (0-255) to Lab values.
+
+    :type rgb: numpy.ndarray
+    :param rgb: (n, 3) array
+    :rtype: numpy.ndarray
+    """
+
+    xyz = _linear(numpy.asarray(rgb).reshape(-1, 3)) @ RGB_TO_XYZ.T
+    xyz = xyz / WHITE
+
+    delta = 6 / 29
+    f = numpy.where(
+        xyz > delta ** 3, numpy.cbrt(xyz), xyz / (3 * delta ** 2) + 4 / 29
+    )
+
+    return numpy.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+def lab_to_rgb(lab):
+    """
+    Converts Lab values to RGB values (0-255). Colors out of the sRGB
+    gamut are clipped.
+
+    :type lab: numpy.ndarray
+    :param lab: (n, 3) array
+    :rtype: numpy.ndarray
+    """
+
+    lab = numpy.asarray(lab, dtype=float).reshape(-1, 3)
+
+    fy = (lab[:, 0] + 16) / 116
+    f = numpy.stack([fy + lab[:, 1] / 500, fy, fy - lab[:, 2] / 200], axis=1)
+
+    delta = 6 / 29
+    xyz = numpy.where(f > delta, f ** 3, 3 * delta ** 2 * (f - 4 / 29))
+
+    return _gamma((xyz * WHITE) @ XYZ_TO_RGB.T)
+
+def cmyk_to_lab(cmyk):
+    """
+    Converts CMYK values (0-100) to Lab values.
+
+    :rtype: numpy.ndarray
+    """
+
+    return rgb_to_lab(cmyk_to_rgb(cmyk))
+
+def lab_to_cmyk(lab):
+    """
+    Converts Lab values to CMYK values (0-100).
+
+    :rtype: numpy.ndarray
+    """
+
+    return rgb_to_cmyk(lab_to_rgb(lab))
+
+def convert(values, source: str, target: str):
+    """
+    Converts colors values from a color space to another.
+
+    :type values: numpy.ndarray
+    :param values: (n, 4) array for CMYK, (n, 3) array for RGB and Lab
+    :type source: str
+    :param source: "cmyk", "rgb" or "lab"
+    :type target: str
+    :param target: "cmyk", "rgb" or "lab"
+    :rtype: numpy.ndarray
+    """
+
+    for space in [source, target]:
+        if space not in spaces:
+            raise ValueError("Unknown color space {}".format(space))
+
+    if source == target:
+        return numpy.asarray(values, dtype=float).reshape(-1, spaces[source])
+
+    conversions = {
+        ("cmyk", "rgb"): cmyk_to_rgb,
+        ("cmyk", "lab"): cmyk_to_lab,
+        ("rgb", "cmyk"): rgb_to_cmyk,
+        ("rgb", "lab"): rgb_to_lab,
+        ("lab", "rgb"): lab_to_rgb,
+        ("lab", "cmyk"): lab_to_cmyk,
+    }
+
+    return conversions[(source, target)](values)
+
+def delta_e(lab_a, lab_b):
+    """
+    Returns the CIE76 color differences (ΔE) between Lab values.
+
+    Arrays are broadcasted: compare (n, 1, 3) and (m, 3) arrays to get
+    a (n, m) matrix of differences.
+
+    :rtype: numpy.ndarray
+    """
+
+    difference = numpy.asarray(lab_a, dtype=float) - lab_b
+
+    return numpy.sqrt((difference ** 2).sum(axis=-1))
+
+def _style_colors(style, rename):
+    if (font := getattr(style, "font", None)):
+        if font.get("color"):
+            font["color"] = rename(font["color"])
+
+    if (fill := getattr(style, "fill", None)):
+        if fill.get("color"):
+            fill["color"] = rename(fill["color"])
+
+    borders = getattr(style, "borders", [])
+
+    if isinstance(borders, dict):
+        borders = borders.values()
+
+    for border in borders:
+        for line in getattr(border, "lines", []):
+            if line.color:
+                line.color = rename(line.color)
+
+def _story_colors(story, rename):
+    if story is None:
+        return
+
+    for element in story.sequence:
+        if isinstance(element, stories.StoryFragment):
+            if element.font["color"]:
+                element.set_font(color=rename(element.font["color"]))
+
+def remap(document, mapping: dict, drop: bool = False):
+    """
+    Renames colors references in the page objects, stories, styles,
+    gradients and patterns of a document.
+
+    :type document: pyscribus.document.Document
+    :param document: Document
+    :type mapping: dict
+    :param mapping: Old colors names as keys, new colors names as values
+    :type drop: bool
+    :param drop: Remove the remapped colors from the document colors
+    :rtype: int
+    :returns: Count of renamed references
+    """
+
+    mapping = {
+        old: new for old, new in mapping.items() if old and old != new
+    }
+
+    if not mapping:
+        return 0
+
+    renamed = [0]
+
+    def rename(name):
+        if (new := mapping.get(name)) is None:
+            return name
+
+        renamed[0] += 1
+
+        return new
+
+    # --- Styles, gradients ----------------------------------------------
+
+    for styles in document.styles.values():
+        for style in styles:
+            _style_colors(style, rename)
+
+    for gradient in document.gradients:
+        for stop in gradient.stops:
+            stop.color = rename(stop.color)
+
+    # --- Page objects ---------------------------------------------------
+
+    pending = list(document.page_objects)
+
+    for pattern in document.patterns:
+        pending.extend(pattern.items)
+
+    while pending:
+        po = pending.pop()
+
+        po.outline["fill"] = rename(po.outline["fill"])
+        po.outline["stroke"] = rename(po.outline["stroke"])
+
+        for story in getattr(po, "stories", []):
+            _story_colors(story, rename)
+
+        if isinstance(po, pageobjects.TableObject):
+            _style_colors(po, rename)
+
+            for cell in po.cells:
+                _style_colors(cell, rename)
+                _story_colors(cell.story, rename)
+
+        if isinstance(po, pageobjects.GroupObject):
+            pending.extend(po.group_objects)
+
+    # --- Colors ---------------------------------------------------------
+
+    if drop:
+        targets = set(mapping.values())
+
+        document.colors = [
+            color for color in document.colors
+            if color.name not in mapping or color.name in targets
+        ]
+
+    return renamed[0]
+
+def conform(document, reference, tolerance=None,
+        registration: bool = False):
+    """
+    Replaces the colors of a document by their nearest colors in a
+    reference palette (ex: colors of a brand).
+
+    Matched colors are removed from the document, and the matching
+    colors of the reference palette are added to it if missing.
+
+    :type document: pyscribus.document.Document
+    :param document: Document
+    :type reference: Palette
+    :param reference: Palette of the allowed colors
+    :type tolerance: float
+    :param tolerance: Maximal ΔE of replaced colors. If None, all colors
+        are replaced.
+    :type registration: bool
+    :param registration: Replace registration colors too
+    :rtype: dict
+    :returns: Replaced colors names as keys, (new color name, ΔE) as
+        values
+    """
+
+    candidates = [
+        color for color in document.colors if registration or not color.register
+    ]
+
+    matched = reference.match(Palette(candidates), tolerance)
+
+    # --- Reference colors -----------------------------------------------
+
+    existing = {color.name for color in document.colors}
+
+    for name in {new for new, _ in matched.values()}:
+        if name in existing:
+            continue
+
+        color = reference.colors[reference.index(name)]
+
+        document.colors.append(
+            colors.Color(
+                color.name,
+                "cmyk" if color.is_cmyk else "rgb",
+                list(color.colors.values()), color.register
+            )
+        )
+
+        existing.add(name)
+
+    remap(
+        document, {old: new for old, (new, _) in matched.items()}, drop=True
+    )
+
+    return matched
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
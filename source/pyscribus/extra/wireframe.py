@@ -19,13 +19,16 @@
 
 """
 Reads SLA file and use Pillow to draw a schematic picture of all page
-and page objects.
+and page objects, or write it as a SVG file.
 """
 
 # Imports ===============================================================#
 
+import io
 import math
 
+from xml.sax.saxutils import quoteattr
+
 from PIL import Image, ImageDraw
 
 import pyscribus.dimensions as dimensions
@@ -55,6 +58,16 @@ class WireframeObject:
         self.type = "undefined"
         self.group_objects = []
 
+        # Page number for pages, page number of the object's own page for
+        # page objects (False if the object is outside of any page)
+        self.number = False
+
+        # Unrotated box, rotation and @path of page objects, used by the
+        # SVG backend to draw the real shape of the object
+        self.origin_box = False
+        self.rotation = 0
+        self.path = False
+
         # Pages have layer -1, as 0 is the lower layer available
         self.layer = -1
 
@@ -72,6 +85,7 @@ class WireframeObject:
         if isinstance(sla_object, pages.Page):
             self.is_page = True
             self.type = "page"
+            self.number = sla_object.number
         else:
             self.is_page = False
             type_ok = False
@@ -106,16 +120,32 @@ class WireframeObject:
 
             self.layer = sla_object.layer
 
+            self.origin_box = sla_object.box
+            self.rotation = sla_object.rotated_box.rotation.value
+
+            if sla_object.path is not None and sla_object.path.raw:
+                self.path = sla_object.path.raw
+
+            # NOTE @OwnPage is the page index, starting at 0, which
+            # PageObject stores as False. -1 means no page at all.
+
+            if sla_object.own_page is False:
+                self.number = 1
+            elif sla_object.own_page < 0:
+                self.number = False
+            else:
+                self.number = sla_object.own_page + 1
+
         else:
             self.box = sla_object.box
 
     def draw_on_canvas(self, canvas, bleed=False):
 
         if bleed and self.bleed:
-            tx = self.box.coords["top-left"][0].value - self.bleed["left"]
-            ty = self.box.coords["top-left"][1].value - self.bleed["top"]
-            bx = self.box.coords["bottom-right"][0].value + self.bleed["right"]
-            by = self.box.coords["bottom-right"][1].value + self.bleed["bottom"]
+            tx = self.box.coords["top-left"][0].value - float(self.bleed["left"])
+            ty = self.box.coords["top-left"][1].value - float(self.bleed["top"])
+            bx = self.box.coords["bottom-right"][0].value + float(self.bleed["right"])
+            by = self.box.coords["bottom-right"][1].value + float(self.bleed["bottom"])
 
             bleed_rect = ((tx, ty), (bx, by))
             canvas.rectangle(bleed_rect, outline="red")
@@ -155,13 +185,122 @@ class WireframeObject:
 
         return canvas
 
+    def _svg_style(self):
+        """
+        Returns SVG fill and stroke attributes according to draw settings.
+
+        :rtype: str
+        """
+
+        fill, outline = "none", "none"
+
+        if self.draw_settings["fill"]:
+            fill = self.draw_settings["fill"]
+
+        if self.draw_settings["outline"]:
+            outline = self.draw_settings["outline"]
+
+        return "fill={} stroke={}".format(quoteattr(fill), quoteattr(outline))
+
+    def draw_on_svg(self, stream, bleed=False):
+        """
+        Write the object as SVG elements in stream.
+
+        Page objects having a known @path are drawn with that path,
+        translated and rotated like in Scribus. Other objects are drawn
+        as rectangles.
+
+        :type stream: file object
+        :param stream: Writable text stream
+        :type bleed: boolean
+        :param bleed: Draw the bleed of pages
+        :rtype: file object
+        :returns: stream
+        """
+
+        if self.box is False:
+            return stream
+
+        if bleed and self.bleed:
+            tx = self.box.coords["top-left"][0].value - float(self.bleed["left"])
+            ty = self.box.coords["top-left"][1].value - float(self.bleed["top"])
+            bx = self.box.coords["bottom-right"][0].value + float(self.bleed["right"])
+            by = self.box.coords["bottom-right"][1].value + float(self.bleed["bottom"])
+
+            stream.write(
+                '<rect class="bleed" x="{}" y="{}" width="{}" height="{}" '
+                'fill="none" stroke={}/>\n'.format(
+                    tx, ty, bx - tx, by - ty,
+                    quoteattr(self.draw_settings["bleed"])
+                )
+            )
+
+        style = self._svg_style()
+        type_class = quoteattr(self.type)
+
+        if self.origin_box:
+            # --- Page object -----------------------------------------
+
+            x = self.origin_box.coords["top-left"][0].value
+            y = self.origin_box.coords["top-left"][1].value
+
+            transform = "translate({} {})".format(x, y)
+
+            if self.rotation:
+                transform += " rotate({})".format(self.rotation)
+
+            if self.path:
+                stream.write(
+                    '<path class={} transform="{}" d={} {}/>\n'.format(
+                        type_class, transform, quoteattr(self.path), style
+                    )
+                )
+            else:
+                stream.write(
+                    '<rect class={} transform="{}" width="{}" height="{}" '
+                    '{}/>\n'.format(
+                        type_class, transform,
+                        self.origin_box.dims["width"].value,
+                        self.origin_box.dims["height"].value,
+                        style
+                    )
+                )
+
+        else:
+            # --- Page ------------------------------------------------
+
+            x = self.box.coords["top-left"][0].value
+            y = self.box.coords["top-left"][1].value
+
+            stream.write(
+                '<rect class={} x="{}" y="{}" width="{}" height="{}" '
+                '{}/>\n'.format(
+                    type_class, x, y,
+                    self.box.coords["bottom-right"][0].value - x,
+                    self.box.coords["bottom-right"][1].value - y,
+                    style
+                )
+            )
+
+        if self.type == "group":
+            stream.write('<g class="group">\n')
+
+            for subpo in self.group_objects:
+                s = WireframeObject(subpo)
+                s.draw_settings = self.draw_settings
+                s.draw_on_svg(stream, bleed)
+
+            stream.write("</g>\n")
+
+        return stream
+
 
 class Wireframe:
     """
     Wireframe canvas.
 
     Reads SLA file and use Pillow to draw a schematic picture of all page
-    and page objects.
+    and page objects, or write it as SVG.
 
     :ivar list pages: List of pages as WireframeObject
     :ivar list page_objects: List of page objects as WireframeObject
@@ -219,11 +358,16 @@ class Wireframe:
         else:
             self = add(self, WireframeObject(sla_object))
 
-    def _image_size(self, margins=[0,0]):
+    def _image_size(self, margins=[0,0], with_pages=False):
         max_x = float()
         max_y = float()
 
-        for po in self.page_objects:
+        if with_pages:
+            objects = self.pages + self.page_objects
+        else:
+            objects = self.page_objects
+
+        for po in objects:
             trx = po.box.coords["top-right"][0].value
             bry = po.box.coords["bottom-right"][1].value
 
@@ -244,39 +388,54 @@ class Wireframe:
         """
         Returns Pillow Image instance or bool if [output] option is set.
 
+        With the SVG backend, returns the SVG document as a string, or
+        True if [output] option is set.
+
         :type kwargs: dict
         :param kwargs: Draw options
 
         **Draw options :**
 
-        +------------------+---------------------------------------+---------------------------+---------+
-        | kwargs key       | Use                                   | Type                      | Default |
-        +==================+=======================================+===========================+=========+
-        | default_outline  | Outline color used if an object has   | boolean or Pillow color   | "black" |
-        |                  | no fill and no outline color          |                           |         |
-        |                  | defined.                              |                           |         |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | pages            | Draw all page or only pages in a      | "all" or                  | "all"   |
-        |                  | list of page numbers.                 | list of integers [1,...]  |         |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | layers           | Draw all layers or only layers in     | "all" or                  | "all"   |
-        |                  | a list of layer numbers.              | list of integers [1,...]  |         |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | background_color | Background color of the image         | Pillow color              | "grey"  |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | output           | File path of the output file          | str                       | False   |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | stylesheet       | Fill and outline setting according to | boolean or dict           | False   |
-        |                  | the type of object to draw.           |                           |         |
-        |                  |                                       | (as Wireframe.stylesheet) |         |
-        |                  | True for default stylesheet.          |                           |         |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | landmark         | Draw landmark lines at 0,0.           | boolean                   | True    |
-        +------------------+---------------------------------------+---------------------------+---------+
-        | bleed            | Draw page bleeds                      | boolean                   | True    |
-        +------------------+---------------------------------------+---------------------------+---------+
+        +------------------+---------------------------------------+---------------------------+----------+
+        | kwargs key       | Use                                   | Type                      | Default  |
+        +==================+=======================================+===========================+==========+
+        | backend          | Drawing backend. "pillow" for a       | "pillow" or "svg"         | "pillow" |
+        |                  | raster image, "svg" for a vector      |                           |          |
+        |                  | image, written as it is drawn.        |                           |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | default_outline  | Outline color used if an object has   | boolean or Pillow color   | "black"  |
+        |                  | no fill and no outline color          |                           |          |
+        |                  | defined.                              |                           |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | pages            | Draw all page or only pages in a      | "all" or                  | "all"    |
+        |                  | list of page numbers.                 | list of integers [1,...]  |          |
+        |                  |                                       |                           |          |
+        |                  | With the SVG backend, page objects of |                           |          |
+        |                  | pages not in the list are not drawn.  |                           |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | layers           | Draw all layers or only layers in     | "all" or                  | "all"    |
+        |                  | a list of layer numbers.              | list of integers [1,...]  |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | background_color | Background color of the image         | Pillow color              | "grey"   |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | output           | File path of the output file.         | str or file object        | False    |
+        |                  |                                       |                           |          |
+        |                  | With the SVG backend, can be a        |                           |          |
+        |                  | writable text stream.                 |                           |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | stylesheet       | Fill and outline setting according to | boolean or dict           | False    |
+        |                  | the type of object to draw.           |                           |          |
+        |                  |                                       | (as Wireframe.stylesheet) |          |
+        |                  | True for default stylesheet.          |                           |          |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | landmark         | Draw landmark lines at 0,0.           | boolean                   | True     |
+        +------------------+---------------------------------------+---------------------------+----------+
+        | bleed            | Draw page bleeds                      | boolean                   | True     |
+        +------------------+---------------------------------------+---------------------------+----------+
         """
 
+        backend = "pillow"
+
         draw_pages = "all"
         draw_layers = "all"
         draw_landmark = True
@@ -296,6 +455,14 @@ class Wireframe:
 
         for opt_name,opt_value in kwargs.items():
 
+            if opt_name == "backend":
+                if opt_value.lower() in ["pillow", "svg"]:
+                    backend = opt_value.lower()
+                else:
+                    raise ValueError(
+                        "Unknown wireframe backend '{}'".format(opt_value)
+                    )
+
             if opt_name == "layers":
                 draw_layers = opt_value
 
@@ -342,19 +509,6 @@ class Wireframe:
             if opt_name == "output":
                 out_file = opt_value
 
-        # --- Image creation ----------------------------------------
-
-        image_size = self._image_size(canvas_margins)
-
-        image = Image.new("RGB", image_size, color=background_color)
-        canvas = ImageDraw.Draw(image)
-
-        # --- Drawing landmark --------------------------------------
-
-        if draw_landmark:
-            canvas.line(((-5,0),(5,0)), fill="red")
-            canvas.line(((0,-5),(0,-5)), fill="red")
-
         # --- Using default_outline or stylesheet -------------------
 
         if use_stylesheet:
@@ -390,6 +544,25 @@ class Wireframe:
 
             # -------------------------------------------------------
 
+        if backend == "svg":
+            return self._draw_svg(
+                draw_pages, draw_layers, draw_landmark, draw_bleed,
+                canvas_margins, background_color, out_file
+            )
+
+        # --- Image creation ----------------------------------------
+
+        image_size = self._image_size(canvas_margins)
+
+        image = Image.new("RGB", image_size, color=background_color)
+        canvas = ImageDraw.Draw(image)
+
+        # --- Drawing landmark --------------------------------------
+
+        if draw_landmark:
+            canvas.line(((-5,0),(5,0)), fill="red")
+            canvas.line(((0,-5),(0,-5)), fill="red")
+
         # --- Drawing page and page objects -------------------------
 
         if draw_pages != "none":
@@ -429,4 +602,129 @@ class Wireframe:
         else:
             return image
 
+    def _draw_svg(self, draw_pages, draw_layers, draw_landmark, draw_bleed,
+            canvas_margins, background_color, out_file):
+        """
+        SVG backend of Wireframe.draw.
+
+        Writes one group per page, containing the page and one group per
+        layer of its page objects. Page objects outside of any page are
+        written in a last "pasteboard" group.
+
+        Elements are written in the output as soon as they are drawn.
+
+        :rtype: str, boolean
+        :returns: SVG document as string, or True if out_file is set
+        """
+
+        # --- Output stream -----------------------------------------
+
+        close_stream = False
+
+        if not out_file:
+            stream = io.StringIO()
+        elif isinstance(out_file, str):
+            stream = open(out_file, "w", encoding="utf8")
+            close_stream = True
+        else:
+            stream = out_file
+
+        # --- Page objects by page number, then by layer ------------
+        # Only references are stored here, not SVG strings
+
+        by_page = {}
+
+        for pago in self.page_objects:
+
+            if draw_layers != "all":
+                if pago.layer not in draw_layers:
+                    continue
+
+            page_layers = by_page.setdefault(pago.number, {})
+            page_layers.setdefault(pago.layer, []).append(pago)
+
+        def write_layers(page_layers):
+            for layer in sorted(page_layers.keys()):
+                stream.write(
+                    '<g class="layer" data-layer={}>\n'.format(
+                        quoteattr(str(layer))
+                    )
+                )
+
+                for pago in page_layers[layer]:
+                    pago.draw_on_svg(stream)
+
+                stream.write("</g>\n")
+
+        try:
+            width, height = self._image_size(canvas_margins, True)
+
+            stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            stream.write(
+                '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+                'width="{0}" height="{1}" viewBox="0 0 {0} {1}">\n'.format(
+                    width, height
+                )
+            )
+
+            if background_color:
+                stream.write(
+                    '<rect class="background" width="100%" height="100%" '
+                    'fill={}/>\n'.format(quoteattr(background_color))
+                )
+
+            # --- Drawing landmark ----------------------------------
+
+            if draw_landmark:
+                stream.write(
+                    '<path class="landmark" d="M-5 0 L5 0 M0 -5 L0 5" '
+                    'stroke="red"/>\n'
+                )
+
+            # --- Drawing pages and their page objects --------------
+
+            for page in self.pages:
+
+                if draw_pages not in ["all", "none"]:
+                    if page.number not in draw_pages:
+                        continue
+
+                stream.write(
+                    '<g class="page" id={}>\n'.format(
+                        quoteattr("page-{}".format(page.number))
+                    )
+                )
+
+                if draw_pages != "none":
+                    page.draw_on_svg(stream, draw_bleed)
+
+                write_layers(by_page.pop(page.number, {}))
+
+                stream.write("</g>\n")
+
+            # --- Drawing objects outside of drawn pages ------------
+
+            if draw_pages in ["all", "none"]:
+                pasteboard = {}
+
+                for page_layers in by_page.values():
+                    for layer, pagos in page_layers.items():
+                        pasteboard.setdefault(layer, []).extend(pagos)
+
+                if pasteboard:
+                    stream.write('<g class="pasteboard">\n')
+                    write_layers(pasteboard)
+                    stream.write("</g>\n")
+
+            stream.write("</svg>\n")
+
+        finally:
+            if close_stream:
+                stream.close()
+
+        if out_file:
+            return True
+        else:
+            return stream.getvalue()
+
 # vim:set shiftwidth=4 softtabstop=4 spl=en:
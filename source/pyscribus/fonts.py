@@ -0,0 +1,643 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Font metrics read from local TrueType / OpenType files.
+
+Only what is needed to estimate text widths is read: font names (name
+table), glyph advance widths (cmap, hmtx) and vertical metrics (head,
+hhea).
+
+Fonts are found by their Scribus name (family and style, like
+"Arial Regular") in font directories. Metrics are cached on disk, so
+font files are only parsed once.
+
+The font directories are, in order of priority:
+
+- the ``directories`` argument of FontLibrary,
+- the directories of the ``PYSCRIBUS_FONT_PATH`` environment variable,
+- the usual font directories of the system.
+"""
+
+# Imports ===============================================================#
+
+import os
+import sys
+import json
+import struct
+import hashlib
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+font_extensions = (".ttf", ".otf", ".ttc", ".otc")
+
+# Version of the cache files format
+CACHE_VERSION = 1
+
+# cmap subtables, by order of preference (platform ID, encoding ID)
+cmap_preferences = [
+    (3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0), (3, 0)
+]
+
+# Classes ===============================================================#
+
+class FontMetrics:
+    """
+    Horizontal metrics of a font face.
+
+    Widths are in font units, see units_per_em.
+
+    :type names: list
+    :param names: Scribus names of the font face
+    :type units_per_em: int
+    :param units_per_em: Font units per em
+    :type ascent: int
+    :param ascent: Ascent
+    :type descent: int
+    :param descent: Descent (negative)
+    :type line_gap: int
+    :param line_gap: Line gap
+    :type advances: dict
+    :param advances: Unicode code points as keys, advance widths as
+        values
+    :type default_advance: int
+    :param default_advance: Advance width of missing glyphs
+
+    :ivar list names: Scribus names of the font face
+    """
+
+    def __init__(
+            self, names: list, units_per_em: int,
+            ascent: int, descent: int, line_gap: int,
+            advances: dict, default_advance: int):
+
+        self.names = names
+        self.units_per_em = units_per_em
+        self.ascent = ascent
+        self.descent = descent
+        self.line_gap = line_gap
+        self.advances = advances
+        self.default_advance = default_advance
+
+        # Word -> advance width
+        self._words = {}
+
+    def word_width(self, word: str):
+        """
+        Returns the advance width of a word, in font units.
+
+        :type word: str
+        :rtype: int
+        """
+
+        if (width := self._words.get(word)) is not None:
+            return width
+
+        advances = self.advances
+        default = self.default_advance
+
+        width = sum([advances.get(ord(char), default) for char in word])
+
+        self._words[word] = width
+
+        return width
+
+    def width(self, text: str, size: float):
+        """
+        Returns the width of a text, in points.
+
+        :type text: str
+        :type size: float
+        :param size: Font size in points
+        :rtype: float
+        """
+
+        return self.word_width(text) * size / self.units_per_em
+
+    def line_height(self, size: float):
+        """
+        Returns the default line height of the font, in points.
+
+        :type size: float
+        :param size: Font size in points
+        :rtype: float
+        """
+
+        height = self.ascent - self.descent + self.line_gap
+
+        return height * size / self.units_per_em
+
+    def todict(self):
+        """
+        :rtype: dict
+        """
+
+        return {
+            "names": self.names,
+            "units_per_em": self.units_per_em,
+            "ascent": self.ascent,
+            "descent": self.descent,
+            "line_gap": self.line_gap,
+            "default_advance": self.default_advance,
+            "codepoints": list(self.advances.keys()),
+            "advances": list(self.advances.values()),
+        }
+
+    @staticmethod
+    def fromdict(data: dict):
+        """
+        :type data: dict
+        :param data: Return of FontMetrics.todict()
+        :rtype: FontMetrics
+        """
+
+        return FontMetrics(
+            data["names"], data["units_per_em"],
+            data["ascent"], data["descent"], data["line_gap"],
+            dict(zip(data["codepoints"], data["advances"])),
+            data["default_advance"],
+        )
+
+
+class FontLibrary:
+    """
+    Fonts of font directories, by Scribus font name.
+
+    :type directories: list
+    :param directories: Font directories. If None, directories of the
+        PYSCRIBUS_FONT_PATH environment variable, then system font
+        directories.
+    :type cache_directory: str, bool
+    :param cache_directory: Directory of the metrics cache. If None,
+        default_cache_directory(). If False, metrics are not cached on
+        disk.
+
+    :ivar dict fonts: Lowercased Scribus font names as keys, (font file
+        path, face index in the file) as values.
+
+    :Example:
+
+    .. code:: python
+
+       library = fonts.FontLibrary(["/home/user/fonts"])
+       metrics = library.metrics("Liberation Serif Regular")
+       width = metrics.width("Lorem ipsum", 12)
+
+    """
+
+    def __init__(self, directories=None, cache_directory=None):
+
+        if directories is None:
+            directories = default_font_directories()
+
+        if cache_directory is None:
+            cache_directory = default_cache_directory()
+
+        self.directories = list(directories)
+        self.cache_directory = cache_directory
+
+        self.fonts = {}
+
+        # (path, face index) -> FontMetrics
+        self._metrics = {}
+
+        self.scan()
+
+    def __contains__(self, name):
+        return str(name).lower() in self.fonts
+
+    # --- Disk cache -----------------------------------------------------
+
+    def _cache_path(self, filename: str):
+        return os.path.join(self.cache_directory, filename)
+
+    def _read_cache(self, filename: str):
+        if not self.cache_directory:
+            return None
+
+        try:
+            with open(self._cache_path(filename), "r", encoding="utf8") as cachef:
+                data = json.load(cachef)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != CACHE_VERSION:
+            return None
+
+        return data
+
+    def _write_cache(self, filename: str, data: dict):
+        if not self.cache_directory:
+            return False
+
+        data["version"] = CACHE_VERSION
+
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+
+            temp_path = self._cache_path(filename + ".tmp")
+
+            with open(temp_path, "w", encoding="utf8") as cachef:
+                json.dump(data, cachef)
+
+            os.replace(temp_path, self._cache_path(filename))
+
+        except OSError:
+            return False
+
+        return True
+
+    @staticmethod
+    def _file_key(path: str, face: int = None):
+        key = path if face is None else "{}:{}".format(path, face)
+
+        return hashlib.blake2b(key.encode("utf8"), digest_size=16).hexdigest()
+
+    # --- Font files -----------------------------------------------------
+
+    def scan(self):
+        """
+        Find the fonts of the font directories.
+
+        Names of the fonts of unmodified files are read from the cache.
+
+        :rtype: int
+        :returns: Count of fonts found
+        """
+
+        index = self._read_cache("index.json") or {}
+        files = index.get("files", {})
+
+        seen = {}
+        changed = False
+
+        self.fonts = {}
+
+        for directory in self.directories:
+
+            for root, _, filenames in os.walk(directory):
+
+                for filename in sorted(filenames):
+
+                    if not filename.lower().endswith(font_extensions):
+                        continue
+
+                    path = os.path.realpath(os.path.join(root, filename))
+
+                    if path in seen:
+                        continue
+
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+
+                    signature = [stat.st_mtime, stat.st_size]
+
+                    if (known := files.get(path)) is not None:
+                        if known["signature"] == signature:
+                            seen[path] = known
+                            continue
+
+                    try:
+                        faces = self._parse(path)
+                    except (OSError, struct.error, KeyError, ValueError):
+                        faces = []
+
+                    seen[path] = {
+                        "signature": signature,
+                        "faces": [metrics.names for metrics in faces],
+                    }
+
+                    changed = True
+
+        if changed or len(seen) != len(files):
+            self._write_cache("index.json", {"files": seen})
+
+        for path, known in seen.items():
+            for face, names in enumerate(known["faces"]):
+                for name in names:
+                    self.fonts.setdefault(name.lower(), (path, face))
+
+        return len(self.fonts)
+
+    def _parse(self, path: str):
+        """
+        Read a font file, and cache the metrics of its faces.
+
+        :rtype: list
+        :returns: FontMetrics of each face of the font file
+        """
+
+        with open(path, "rb") as fontf:
+            data = fontf.read()
+
+        faces = []
+
+        for face, offset in enumerate(_faces_offsets(data)):
+            metrics = read_metrics(data, offset)
+            faces.append(metrics)
+
+            self._metrics[(path, face)] = metrics
+            self._write_cache(
+                FontLibrary._file_key(path, face) + ".json",
+                metrics.todict()
+            )
+
+        return faces
+
+    def metrics(self, name: str):
+        """
+        Returns the metrics of a font.
+
+        :type name: str
+        :param name: Scribus font name (ex: "Arial Regular")
+        :rtype: FontMetrics, None
+        :returns: Font metrics, or None if the font was not found
+        """
+
+        if (font := self.fonts.get(str(name).lower())) is None:
+            return None
+
+        if (metrics := self._metrics.get(font)) is not None:
+            return metrics
+
+        path, face = font
+
+        data = self._read_cache(FontLibrary._file_key(path, face) + ".json")
+
+        if data is not None:
+            metrics = FontMetrics.fromdict(data)
+            self._metrics[font] = metrics
+            return metrics
+
+        try:
+            return self._parse(path)[face]
+        except (OSError, struct.error, KeyError, ValueError, IndexError):
+            return None
+
+# Fonctions =============================================================#
+
+def default_font_directories():
+    """
+    Returns the font directories used if none are given to FontLibrary.
+
+    :rtype: list
+    """
+
+    directories = []
+
+    if (env_path := os.environ.get("PYSCRIBUS_FONT_PATH")):
+        directories.extend(env_path.split(os.pathsep))
+
+    home = os.path.expanduser("~")
+
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", "C:\\Windows")
+        directories.append(os.path.join(windir, "Fonts"))
+        directories.append(
+            os.path.join(
+                os.environ.get("LOCALAPPDATA", home),
+                "Microsoft", "Windows", "Fonts"
+            )
+        )
+
+    elif sys.platform == "darwin":
+        directories.extend([
+            os.path.join(home, "Library", "Fonts"),
+            "/Library/Fonts",
+            "/System/Library/Fonts",
+        ])
+
+    else:
+        directories.extend([
+            os.path.join(home, ".fonts"),
+            os.path.join(home, ".local", "share", "fonts"),
+            "/usr/local/share/fonts",
+            "/usr/share/fonts",
+        ])
+
+    return [
+        directory for directory in directories
+        if directory and os.path.isdir(directory)
+    ]
+
+def default_cache_directory():
+    """
+    Returns the default directory of the font metrics cache.
+
+    :rtype: str
+    """
+
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get(
+            "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+        )
+
+    return os.path.join(base, "pyscribus", "fonts")
+
+def _faces_offsets(data: bytes):
+    # Font collections have a header with the offset of each face
+    if data[:4] == b"ttcf":
+        count = struct.unpack_from(">L", data, 8)[0]
+        return list(struct.unpack_from(">{}L".format(count), data, 12))
+
+    return [0]
+
+def _tables(data: bytes, offset: int):
+    count = struct.unpack_from(">H", data, offset + 4)[0]
+    tables = {}
+
+    for index in range(count):
+        tag, _, table_offset, _ = struct.unpack_from(
+            ">4sLLL", data, offset + 12 + index * 16
+        )
+        tables[tag.decode("latin-1")] = table_offset
+
+    return tables
+
+def _names(data: bytes, offset: int):
+    # Family and style names, english Windows names first
+    _, count, strings = struct.unpack_from(">HHH", data, offset)
+
+    names = {}
+
+    for index in range(count):
+        platform, encoding, language, name_id, length, string = \
+            struct.unpack_from(">HHHHHH", data, offset + 6 + index * 12)
+
+        if name_id not in [1, 2, 16, 17]:
+            continue
+
+        start = offset + strings + string
+        raw = data[start:start + length]
+
+        if platform in [0, 3]:
+            text = raw.decode("utf-16-be", errors="replace")
+            rank = 0 if (platform, language) == (3, 0x409) else 1
+        elif platform == 1 and encoding == 0:
+            text = raw.decode("mac-roman", errors="replace")
+            rank = 2
+        else:
+            continue
+
+        if name_id not in names or rank < names[name_id][0]:
+            names[name_id] = (rank, text.strip())
+
+    return {name_id: name[1] for name_id, name in names.items()}
+
+def _cmap(data: bytes, offset: int):
+    _, count = struct.unpack_from(">HH", data, offset)
+
+    subtables = {}
+
+    for index in range(count):
+        platform, encoding, subtable = struct.unpack_from(
+            ">HHL", data, offset + 4 + index * 8
+        )
+        subtables.setdefault((platform, encoding), offset + subtable)
+
+    for key in cmap_preferences:
+
+        if (subtable := subtables.get(key)) is None:
+            continue
+
+        subtable_format = struct.unpack_from(">H", data, subtable)[0]
+
+        if subtable_format == 4:
+            return _cmap_format4(data, subtable)
+
+        if subtable_format == 12:
+            return _cmap_format12(data, subtable)
+
+    return {}
+
+def _cmap_format4(data: bytes, offset: int):
+    segments = struct.unpack_from(">H", data, offset + 6)[0] // 2
+    array = ">{}H".format(segments)
+
+    ends = struct.unpack_from(array, data, offset + 14)
+    starts = struct.unpack_from(array, data, offset + 16 + segments * 2)
+    deltas = struct.unpack_from(
+        ">{}h".format(segments), data, offset + 16 + segments * 4
+    )
+    range_position = offset + 16 + segments * 6
+    ranges = struct.unpack_from(array, data, range_position)
+
+    mapping = {}
+
+    for index in range(segments):
+        start, end = starts[index], ends[index]
+        delta, range_offset = deltas[index], ranges[index]
+
+        if start == 0xFFFF:
+            continue
+
+        if not range_offset:
+            for char in range(start, end + 1):
+                mapping[char] = (char + delta) & 0xFFFF
+            continue
+
+        position = range_position + index * 2 + range_offset
+
+        glyphs = struct.unpack_from(
+            ">{}H".format(end - start + 1), data, position
+        )
+
+        for char, glyph in zip(range(start, end + 1), glyphs):
+            if glyph:
+                mapping[char] = (glyph + delta) & 0xFFFF
+
+    return mapping
+
+def _cmap_format12(data: bytes, offset: int):
+    count = struct.unpack_from(">L", data, offset + 12)[0]
+
+    mapping = {}
+
+    for index in range(count):
+        start, end, glyph = struct.unpack_from(
+            ">LLL", data, offset + 16 + index * 12
+        )
+
+        for char in range(start, end + 1):
+            mapping[char] = glyph + char - start
+
+    return mapping
+
+def read_metrics(data: bytes, offset: int = 0):
+    """
+    Read the metrics of a font face.
+
+    :type data: bytes
+    :param data: Content of a font file
+    :type offset: int
+    :param offset: Offset of the face in a font collection
+    :rtype: FontMetrics
+    """
+
+    tables = _tables(data, offset)
+
+    # --- Names ----------------------------------------------------------
+
+    names = _names(data, tables["name"])
+
+    scribus_names = []
+
+    for family, style in [(16, 17), (1, 2)]:
+        if family in names:
+            name = "{} {}".format(names[family], names.get(style, "Regular"))
+
+            if name not in scribus_names:
+                scribus_names.append(name)
+
+    # --- Vertical metrics -----------------------------------------------
+
+    units_per_em = struct.unpack_from(">H", data, tables["head"] + 18)[0]
+
+    ascent, descent, line_gap = struct.unpack_from(
+        ">hhh", data, tables["hhea"] + 4
+    )
+
+    hmetrics_count = struct.unpack_from(">H", data, tables["hhea"] + 34)[0]
+
+    # --- Advance widths -------------------------------------------------
+
+    advances = struct.unpack_from(
+        ">" + "Hh" * hmetrics_count, data, tables["hmtx"]
+    )[::2]
+
+    last = len(advances) - 1
+
+    codepoints = {
+        char: advances[min(glyph, last)]
+        for char, glyph in _cmap(data, tables["cmap"]).items()
+    }
+
+    return FontMetrics(
+        scribus_names, units_per_em or 1000,
+        ascent, descent, line_gap,
+        codepoints, advances[0],
+    )
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
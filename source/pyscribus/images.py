@@ -0,0 +1,410 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Images metadata and resolution preflight.
+
+Pixel sizes of images are read from the headers of the files (PNG,
+JPEG, TIFF, GIF, BMP), without decoding them, and cached by path, file
+size and modification time.
+
+:Example:
+
+.. code:: python
+
+   for result in images.preflight(document):
+       if result["status"] != "ok":
+           print(result["frame"].name, result["status"], result["dpi"])
+
+"""
+
+# Imports ===============================================================#
+
+import io
+import os
+import zlib
+import base64
+import struct
+import threading
+import concurrent.futures
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# JPEG Start Of Frame markers, holding the image size
+jpeg_sof_markers = [
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+]
+
+# Bytes of embedded image data decoded to read its header
+EMBEDDED_HEADER_SIZE = 65536
+
+# Shared ImageHeaders instance, see preflight()
+HEADERS = None
+
+# Classes ===============================================================#
+
+class ImageHeaders:
+    """
+    Pixel sizes of image files, read from their headers.
+
+    Results are cached by file path, and read again if the size or the
+    modification time of the file changes.
+
+    :type workers: int
+    :param workers: Threads reading files in sizes(). If None, default of
+        concurrent.futures.ThreadPoolExecutor.
+
+    :ivar dict cache: File paths as keys, (file size, modification time,
+        pixel size) as values
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.cache = {}
+
+        self._lock = threading.Lock()
+
+    def size(self, filepath: str):
+        """
+        Returns the pixel size of an image file.
+
+        :type filepath: str
+        :param filepath: Image file path
+        :rtype: tuple, None
+        :returns: (width, height), or None if the format is unknown
+        :raises FileNotFoundError: If the file doesn't exist
+        """
+
+        stat = os.stat(filepath)
+
+        with self._lock:
+            cached = self.cache.get(filepath)
+
+        if cached is not None:
+            if cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+                return cached[2]
+
+        with open(filepath, "rb") as imagef:
+            pixels = read_size(imagef)
+
+        with self._lock:
+            self.cache[filepath] = (stat.st_size, stat.st_mtime, pixels)
+
+        return pixels
+
+    def _safe_size(self, filepath: str):
+        try:
+            return self.size(filepath)
+        except FileNotFoundError:
+            return False
+        except (OSError, struct.error):
+            return None
+
+    def sizes(self, filepaths: list):
+        """
+        Returns the pixel sizes of image files, read concurrently.
+
+        :type filepaths: list
+        :param filepaths: Image files paths
+        :rtype: dict
+        :returns: File paths as keys, (width, height) as values. Values
+            are None if the format is unknown, and False if the file is
+            missing.
+        """
+
+        filepaths = list(dict.fromkeys(filepaths))
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            return dict(zip(filepaths, pool.map(self._safe_size, filepaths)))
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+
+        with self._lock:
+            self.cache = {}
+
+# Fonctions =============================================================#
+
+def _jpeg_size(stream):
+    stream.seek(2)
+
+    while True:
+        byte = stream.read(1)
+
+        while byte and byte != b"\xff":
+            byte = stream.read(1)
+
+        while byte == b"\xff":
+            byte = stream.read(1)
+
+        if not byte:
+            return None
+
+        marker = byte[0]
+
+        # Markers without segment
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue
+
+        # End of image, start of scan
+        if marker in [0xD9, 0xDA]:
+            return None
+
+        length = struct.unpack(">H", stream.read(2))[0]
+
+        if marker in jpeg_sof_markers:
+            _, height, width = struct.unpack(">BHH", stream.read(5))
+            return (width, height)
+
+        stream.seek(length - 2, 1)
+
+def _tiff_size(stream, head: bytes):
+    order = "<" if head[:2] == b"II" else ">"
+
+    offset = struct.unpack(order + "L", head[4:8])[0]
+
+    stream.seek(offset)
+    count = struct.unpack(order + "H", stream.read(2))[0]
+    entries = stream.read(count * 12)
+
+    size = {}
+
+    for index in range(count):
+        tag, value_type, _, value = struct.unpack_from(
+            order + "HHL4s", entries, index * 12
+        )
+
+        if tag not in [256, 257]:
+            continue
+
+        if value_type == 3:
+            size[tag] = struct.unpack(order + "H", value[:2])[0]
+        else:
+            size[tag] = struct.unpack(order + "L", value)[0]
+
+    if 256 in size and 257 in size:
+        return (size[256], size[257])
+
+    return None
+
+def read_size(stream):
+    """
+    Returns the pixel size of an image, from its header.
+
+    :type stream: file object
+    :param stream: Seekable binary stream of the image file
+    :rtype: tuple, None
+    :returns: (width, height), or None if the format is unknown
+    """
+
+    head = stream.read(32)
+
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return struct.unpack(">LL", head[16:24])
+
+    if head[:2] == b"\xff\xd8":
+        return _jpeg_size(stream)
+
+    if head[:4] in [b"II*\x00", b"MM\x00*"]:
+        return _tiff_size(stream, head)
+
+    if head[:6] in [b"GIF87a", b"GIF89a"]:
+        return struct.unpack("<HH", head[6:10])
+
+    if head[:2] == b"BM":
+        width, height = struct.unpack("<ii", head[18:26])
+        return (abs(width), abs(height))
+
+    return None
+
+def embedded_size(blob):
+    """
+    Returns the pixel size of an embedded image, decoding only the
+    beginning of its data.
+
+    :type blob: pyscribus.blobs.Blob
+    :param blob: Embedded image data
+    :rtype: tuple, None
+    """
+
+    with blob.view() as data:
+        # 4 base64 characters for 3 bytes
+        encoded = bytes(data[:EMBEDDED_HEADER_SIZE // 3 * 4])
+
+    try:
+        compressed = base64.b64decode(encoded)
+        head = zlib.decompressobj().decompress(
+            compressed[4:], EMBEDDED_HEADER_SIZE
+        )
+        return read_size(io.BytesIO(head))
+    except (ValueError, zlib.error, struct.error):
+        return None
+
+def effective_resolution(frame, pixels: tuple):
+    """
+    Returns the effective resolution of the image of an image frame.
+
+    :type frame: pyscribus.pageobjects.ImageObject
+    :param frame: Image frame
+    :type pixels: tuple
+    :param pixels: Pixel size of the image (width, height)
+    :rtype: tuple
+    :returns: (horizontal DPI, vertical DPI)
+    """
+
+    width, height = pixels
+
+    if frame.image_scale["type"] == "frame":
+        # Image scaled to the frame size
+        scale_x = float(frame.box.dims["width"].value) / width if width else 0
+        scale_y = float(frame.box.dims["height"].value) / height if height else 0
+
+        if frame.image_scale["ratio"]:
+            scale_x = scale_y = min(scale_x, scale_y)
+
+    else:
+        # Points per pixel
+        scale_x = float(frame.image_scale["horizontal"].value)
+        scale_y = float(frame.image_scale["vertical"].value)
+
+    return tuple(
+        72 / scale if scale else 0 for scale in [scale_x, scale_y]
+    )
+
+def preflight(document, profile=None, headers=None, workers=None):
+    """
+    Check the effective resolution of the images of a document against
+    the resolution limits of a preflight profile.
+
+    Relative image paths are resolved from the directory of the SLA file.
+
+    :type document: pyscribus.document.Document
+    :param document: Document
+    :type profile: pyscribus.document.Profile, str
+    :param profile: Profile, or name of a profile of the document. If
+        None, first profile of the document.
+    :type headers: ImageHeaders
+    :param headers: Image headers cache. If None, a cache shared by all
+        calls.
+    :type workers: int
+    :param workers: Threads reading image files
+    :rtype: list
+    :returns: List of dicts (see table), one per image frame
+
+    +--------+-----------------------------------------------------------+
+    | Key    | Value                                                     |
+    +========+===========================================================+
+    | frame  | Image frame                                               |
+    +--------+-----------------------------------------------------------+
+    | path   | Image file path, or "" for embedded images                |
+    +--------+-----------------------------------------------------------+
+    | pixels | (width, height), or None                                  |
+    +--------+-----------------------------------------------------------+
+    | dpi    | (horizontal DPI, vertical DPI), or None                   |
+    +--------+-----------------------------------------------------------+
+    | status | "ok", "low", "high", "missing" (file not found), "unknown"|
+    |        | (unknown format) or "empty" (no image)                    |
+    +--------+-----------------------------------------------------------+
+    """
+
+    global HEADERS
+
+    if headers is None:
+        if HEADERS is None:
+            HEADERS = ImageHeaders()
+
+        headers = HEADERS
+
+    # --- Resolution limits ----------------------------------------------
+
+    if isinstance(profile, str):
+        profile = {p.name: p for p in document.profiles}.get(profile)
+    elif profile is None and document.profiles:
+        profile = document.profiles[0]
+
+    limits = {"min": 0, "max": 0}
+
+    if profile is not None:
+        for limit in limits:
+            limits[limit] = float(profile.resolution[limit].value)
+
+    # --- Images files ---------------------------------------------------
+
+    base = ""
+
+    if document.sla_parent and getattr(document.sla_parent, "filepath", ""):
+        base = os.path.dirname(document.sla_parent.filepath)
+
+    frames = document.query(ptype="image")
+    paths = {}
+
+    for frame in frames:
+        if frame.blob is None and frame.filepath:
+            paths[id(frame)] = os.path.join(base, frame.filepath)
+
+    sizes = headers.sizes(list(paths.values()))
+
+    # --- Results --------------------------------------------------------
+
+    results = []
+
+    for frame in frames:
+        result = {
+            "frame": frame, "path": "",
+            "pixels": None, "dpi": None, "status": "empty",
+        }
+
+        if frame.blob is not None:
+            result["pixels"] = embedded_size(frame.blob)
+        elif (path := paths.get(id(frame))) is not None:
+            result["path"] = path
+            result["pixels"] = sizes[path]
+        else:
+            results.append(result)
+            continue
+
+        if result["pixels"] is False:
+            result["pixels"] = None
+            result["status"] = "missing"
+
+        elif result["pixels"] is None:
+            result["status"] = "unknown"
+
+        else:
+            result["dpi"] = effective_resolution(frame, result["pixels"])
+
+            lowest, highest = min(result["dpi"]), max(result["dpi"])
+
+            if limits["min"] and lowest < limits["min"]:
+                result["status"] = "low"
+            elif limits["max"] and highest > limits["max"]:
+                result["status"] = "high"
+            else:
+                result["status"] = "ok"
+
+        results.append(result)
+
+    return results
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
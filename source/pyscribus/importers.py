@@ -0,0 +1,520 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Streaming importers of XML sources (TEI, Métopes) into stories.
+
+XML sources are read with lxml.etree.iterparse: paragraphs are converted
+into story sequence elements as soon as they are parsed, then removed
+from the XML tree, so that book-size files are imported in bounded
+memory.
+
+:Example:
+
+.. code:: python
+
+   importer = importers.tei_importer(sla_document=slafile.document)
+
+   story = importer.story("chapter.xml")
+
+   # Or paragraph by paragraph
+   for element in importer.iterate("book.xml"):
+       print(element)
+
+"""
+
+# Imports ===============================================================#
+
+import re
+
+import lxml
+import lxml.etree as ET
+
+import pyscribus.stories as stories
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Mapping of TEI (and Métopes editorial units) elements, see XMLImporter
+tei_mapping = {
+    "paragraphs": {"p": False, "head": False, "item": False, "l": False},
+    "inline": {
+        "emph": {"font": "italic"},
+        "foreign": {"font": "italic"},
+        "title": {"font": "italic"},
+        "ref": {"underline": True},
+    },
+    "rend": {
+        "italic": {"font": "italic"},
+        "bold": {"font": "bold"},
+        "small-caps": {"smallcaps": True},
+        "uppercase": {"allcaps": True},
+        "capitale": {"allcaps": True},
+        "sup": {"superscript": True},
+        "superscript": {"superscript": True},
+        "sub": {"subscript": True},
+        "subscript": {"subscript": True},
+        "underline": {"underline": True},
+        "line-through": {"strike": True},
+        "strikethrough": {"strike": True},
+    },
+    "breaks": ["lb"],
+    "notes": ["note"],
+    "skip": ["teiHeader", "figure", "graphic", "pb", "fw"],
+    "within": ["text"],
+    "style_attribute": "style",
+    "rend_attribute": "rend",
+}
+
+whitespaces = re.compile(r"\s+")
+
+# Classes ===============================================================#
+
+class XMLImporter:
+    """
+    Streaming importer of XML documents into story sequences.
+
+    The mapping dict describes how elements are imported. Elements are
+    matched by their local name, without namespace. Elements not in the
+    mapping are imported as their text content, with the formatting of
+    their parent.
+
+    +-----------------+--------------------------------------------------+
+    | Mapping key     | Value                                            |
+    +=================+==================================================+
+    | paragraphs      | Dict with paragraph elements as keys and names   |
+    |                 | of paragraph styles (or False) as values         |
+    +-----------------+--------------------------------------------------+
+    | inline          | Dict with inline elements as keys and formatting |
+    |                 | dicts as values                                  |
+    +-----------------+--------------------------------------------------+
+    | rend            | Dict with tokens of the rend attribute as keys   |
+    |                 | and formatting dicts as values                   |
+    +-----------------+--------------------------------------------------+
+    | breaks          | List of line break elements                      |
+    +-----------------+--------------------------------------------------+
+    | notes           | List of note elements                            |
+    +-----------------+--------------------------------------------------+
+    | skip            | List of elements ignored with their contents     |
+    +-----------------+--------------------------------------------------+
+    | within          | List of elements containing the imported         |
+    |                 | paragraphs. Whole document if empty.             |
+    +-----------------+--------------------------------------------------+
+    | style_attribute | Attribute of paragraph elements overriding their |
+    |                 | paragraph style, or None                         |
+    +-----------------+--------------------------------------------------+
+    | rend_attribute  | Attribute holding rend tokens, or None           |
+    +-----------------+--------------------------------------------------+
+
+    Formatting dicts have a "font" key, whose value is "italic" or
+    "bold", and/or StoryFragment features keys (smallcaps, allcaps,
+    superscript, subscript, underline, strike...) with True as value.
+    Nested formattings are combined: italic in bold becomes bold-italic.
+
+    Notes are replaced in the story by a note mark (see
+    stories.note_mark), and their contents are stored in the notes
+    attribute.
+
+    :type mapping: dict
+    :param mapping: Elements mapping (see table). Missing keys are empty.
+    :type font: dict
+    :param font: Fonts used for text emphasis (see
+        Story.append_paragraph)
+    :type sla_document: pyscribus.document.Document
+    :param sla_document: Document where notes and marks will be stored
+    :type normalize_space: bool
+    :param normalize_space: Replace whitespaces by a single space, and
+        remove those at the beginning and the end of paragraphs.
+    :type note_style: str
+    :param note_style: Paragraph style of the paragraphs of notes
+
+    :ivar dict notes: Note labels as keys, story sequences of the notes
+        contents as values
+    """
+
+    def __init__(self, mapping: dict, font=None, sla_document=False,
+            normalize_space: bool = True, note_style=False):
+
+        if font is None:
+            font = {
+                "bold": "Arial Bold",
+                "italic": "Arial Italic",
+                "bold-italic": "Arial Bold Italic"
+            }
+
+        self.mapping = {
+            "paragraphs": dict(mapping.get("paragraphs", {})),
+            "inline": dict(mapping.get("inline", {})),
+            "rend": dict(mapping.get("rend", {})),
+            "breaks": set(mapping.get("breaks", [])),
+            "notes": set(mapping.get("notes", [])),
+            "skip": set(mapping.get("skip", [])),
+            "within": set(mapping.get("within", [])),
+            "style_attribute": mapping.get("style_attribute"),
+            "rend_attribute": mapping.get("rend_attribute"),
+        }
+
+        self.font = font
+        self.sla_document = sla_document
+        self.normalize_space = normalize_space
+        self.note_style = note_style
+
+        self.notes = {}
+
+        # Qualified tag -> local name
+        self._names = {}
+        # (emphasis, features) -> (FontSpec, FeatureSet)
+        self._formats = {}
+
+        self._font = stories.FontSpec()
+        self._features = stories.FeatureSet()
+
+    # --- Formatting -----------------------------------------------------
+
+    def _name(self, tag):
+        if (name := self._names.get(tag)) is None:
+            name = tag.rpartition("}")[2]
+            self._names[tag] = name
+
+        return name
+
+    def _formatting(self, formatting: tuple, element, name: str):
+        """
+        Returns the formatting of an inline element, as (emphasis,
+        features) frozensets, combined with the formatting of its parent.
+        """
+
+        changes = []
+
+        if (inline := self.mapping["inline"].get(name)) is not None:
+            changes.append(inline)
+
+        if (attribute := self.mapping["rend_attribute"]) is not None:
+            if (rend := element.get(attribute)) is not None:
+                for token in rend.split():
+                    if (change := self.mapping["rend"].get(token)) is not None:
+                        changes.append(change)
+
+        if not changes:
+            return formatting
+
+        emphasis, features = set(formatting[0]), set(formatting[1])
+
+        for change in changes:
+            for key, value in change.items():
+                if key == "font":
+                    emphasis.add(value)
+                elif value:
+                    features.add(key)
+
+        return (frozenset(emphasis), frozenset(features))
+
+    def _fragment(self, text: str, formatting: tuple):
+        if (mappings := self._formats.get(formatting)) is None:
+            emphasis, features = formatting
+
+            font = self._font
+
+            if "bold" in emphasis and "italic" in emphasis:
+                font = font.replace(name=self.font["bold-italic"])
+            elif "bold" in emphasis:
+                font = font.replace(name=self.font["bold"])
+            elif "italic" in emphasis:
+                font = font.replace(name=self.font["italic"])
+
+            mappings = (
+                font,
+                stories.FeatureSet(dict.fromkeys(features, True))
+            )
+
+            self._formats[formatting] = mappings
+
+        if self.normalize_space:
+            text = whitespaces.sub(" ", text)
+
+        return stories.StoryFragment.fromtemplate(text, *mappings)
+
+    # --- Paragraphs -----------------------------------------------------
+
+    def _style(self, element, name: str):
+        if (attribute := self.mapping["style_attribute"]) is not None:
+            if (style := element.get(attribute)) is not None:
+                return style
+
+        return self.mapping["paragraphs"].get(name, False)
+
+    def _end_paragraph(self, sequence: list, start: int, style):
+        """
+        Ends the paragraph beginning at start in sequence.
+        """
+
+        if self.normalize_space:
+            fragments = [
+                element for element in sequence[start:]
+                if isinstance(element, stories.StoryFragment)
+            ]
+
+            if fragments:
+                fragments[0].text = fragments[0].text.lstrip()
+                fragments[-1].text = fragments[-1].text.rstrip()
+
+            sequence[start:] = [
+                element for element in sequence[start:]
+                if not isinstance(element, stories.StoryFragment)
+                or element.text
+            ]
+
+        sequence.append(stories.StoryParagraphEnding(parent=style))
+
+        return len(sequence)
+
+    def _walk(self, element, formatting: tuple, style, sequence: list,
+            start: int, note: bool = False):
+        """
+        Appends the contents of element to sequence. Returns the start of
+        the current paragraph in sequence.
+
+        Nested paragraphs of notes (note is True) use the note style.
+        """
+
+        if element.text:
+            sequence.append(self._fragment(element.text, formatting))
+
+        for child in element:
+
+            # Comments and processing instructions
+            if not isinstance(child.tag, str):
+                if child.tail:
+                    sequence.append(self._fragment(child.tail, formatting))
+                continue
+
+            name = self._name(child.tag)
+
+            if name in self.mapping["skip"]:
+                pass
+
+            elif name in self.mapping["breaks"]:
+                sequence.append(stories.StoryLineBreak())
+
+            elif name in self.mapping["notes"]:
+                sequence.append(self._note(child))
+
+            elif name in self.mapping["paragraphs"]:
+                # Nested paragraph (item of a list in an item, etc.)
+
+                if len(sequence) > start:
+                    start = self._end_paragraph(sequence, start, style)
+
+                if note:
+                    child_style = self.note_style
+                else:
+                    child_style = self._style(child, name)
+
+                start = self._walk(
+                    child,
+                    self._formatting((frozenset(), frozenset()), child, name),
+                    child_style, sequence, start, note
+                )
+
+                if len(sequence) > start:
+                    start = self._end_paragraph(sequence, start, child_style)
+
+            else:
+                start = self._walk(
+                    child, self._formatting(formatting, child, name),
+                    style, sequence, start, note
+                )
+
+            if child.tail:
+                sequence.append(self._fragment(child.tail, formatting))
+
+        return start
+
+    def _paragraph(self, element, name: str):
+        """
+        Returns the story sequence of a paragraph element.
+        """
+
+        sequence = []
+        style = self._style(element, name)
+
+        start = self._walk(
+            element,
+            self._formatting((frozenset(), frozenset()), element, name),
+            style, sequence, 0
+        )
+
+        if len(sequence) > start or not sequence:
+            self._end_paragraph(sequence, start, style)
+
+        return sequence
+
+    def _note(self, element):
+        """
+        Returns the mark of a note element, and stores its contents.
+        """
+
+        label = element.get("n")
+
+        if label is None:
+            label = element.get("{http://www.w3.org/XML/1998/namespace}id")
+
+        if label is None:
+            label = str(len(self.notes) + 1)
+
+        sequence = []
+
+        start = self._walk(
+            element, (frozenset(), frozenset()), self.note_style, sequence,
+            0, True
+        )
+
+        if len(sequence) > start:
+            self._end_paragraph(sequence, start, self.note_style)
+
+        self.notes[label] = sequence
+
+        return stories.note_mark(label, self.sla_document)
+
+    # --- Import ---------------------------------------------------------
+
+    def iterate(self, source):
+        """
+        Yields the story sequence elements of a XML source, paragraph by
+        paragraph. Parsed elements are removed from the XML tree.
+
+        :type source: str, file object
+        :param source: XML file path or binary file object
+        :rtype: generator
+        :returns: Story sequence elements (StoryFragment,
+            StoryParagraphEnding, StoryLineBreak, StoryNoteMark)
+        """
+
+        paragraphs = self.mapping["paragraphs"]
+        skip = self.mapping["skip"]
+        within = self.mapping["within"]
+
+        skip_depth = 0
+        within_depth = 0
+        paragraph_depth = 0
+
+        for event, element in ET.iterparse(
+                source, events=("start", "end"), remove_comments=True,
+                remove_pis=True):
+
+            name = self._name(element.tag)
+
+            if event == "start":
+                if name in skip:
+                    skip_depth += 1
+                elif name in within:
+                    within_depth += 1
+                elif name in paragraphs and not skip_depth:
+                    if within_depth or not within:
+                        paragraph_depth += 1
+
+                continue
+
+            # --- End of element -----------------------------------------
+
+            if name in skip:
+                skip_depth -= 1
+
+            elif name in within:
+                within_depth -= 1
+
+            elif name in paragraphs and not skip_depth:
+                if within_depth or not within:
+                    paragraph_depth -= 1
+
+                    if not paragraph_depth:
+                        yield from self._paragraph(element, name)
+
+            if paragraph_depth:
+                continue
+
+            # Parsed elements are no longer needed
+
+            element.clear()
+
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def story(self, source, story=None):
+        """
+        Imports a XML source into a story.
+
+        :type source: str, file object
+        :param source: XML file path or binary file object
+        :type story: pyscribus.stories.Story
+        :param story: Story to append the contents to. If None, a new
+            story.
+        :rtype: pyscribus.stories.Story
+        """
+
+        if story is None:
+            story = stories.Story(doc_parent=self.sla_document)
+            story.init_contents()
+
+        sequence = story.sequence
+
+        if sequence and isinstance(sequence[-1], stories.StoryEnding):
+            ending = sequence.pop()
+        else:
+            ending = stories.StoryEnding()
+
+        sequence.extend(self.iterate(source))
+        sequence.append(ending)
+
+        return story
+
+# Fonctions =============================================================#
+
+def tei_importer(font=None, sla_document=False, note_style=False, **mapping):
+    """
+    Returns an importer of TEI documents (and Métopes editorial units).
+
+    :type font: dict
+    :param font: Fonts used for text emphasis
+    :type sla_document: pyscribus.document.Document
+    :param sla_document: Document where notes and marks will be stored
+    :type note_style: str
+    :param note_style: Paragraph style of the paragraphs of notes
+    :type mapping: dict
+    :param mapping: Mapping keys replacing those of tei_mapping (see
+        XMLImporter)
+    :rtype: XMLImporter
+
+    :Example:
+
+    .. code:: python
+
+       importer = importers.tei_importer(
+           paragraphs={"p": "Normal", "head": "Title1", "item": "List"}
+       )
+
+    """
+
+    return XMLImporter(
+        dict(tei_mapping, **mapping),
+        font=font, sla_document=sla_document, note_style=note_style
+    )
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
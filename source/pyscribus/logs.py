@@ -18,13 +18,19 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
-Logging for PyScribus
+Logging for PyScribus, and opt-in profiling of XML parsing and export.
 """
 
 # Imports ===============================================================#
 
 import os
+import sys
+import time
 import logging
+import threading
+import contextlib
+
+import lxml.etree as ET
 
 # Variables globales ====================================================#
 
@@ -32,8 +38,355 @@ __author__ = "Etienne Nadji <etnadji@eml.cc>"
 
 USE_LOG = False
 
+# Active XMLProfiler instance, if any
+PROFILER = None
+
+# Classes ===============================================================#
+
+class XMLProfiler:
+    """
+    Profiler of all fromxml() and toxml() methods of PyScribus elements.
+
+    While enabled, fromxml() and toxml() methods of all
+    :class:`pyscribus.common.xml.PyScribusElement` subclasses are
+    wrapped to record, per XML element type:
+
+    - the count of calls ;
+    - the cumulative and maximum wall time of calls, in seconds,
+      including nested elements ;
+    - the cumulative wall time of calls, excluding nested elements ;
+    - the size of the XML elements, in bytes (if measure_bytes).
+
+    PAGEOBJECT and similar elements are recorded by page object type, as
+    ``PAGEOBJECT:text``, ``PAGEOBJECT:table``, etc.
+
+    Calls to the functions handling undocumented XML attributes
+    (:func:`pyscribus.common.xml.all_undocumented_to_python` and
+    :func:`pyscribus.common.xml.all_undocumented_to_xml`) are recorded
+    too, in the "undocumented" statistics. Their time is not counted in
+    the self time of the elements calling them.
+
+    When disabled, original methods are restored, so profiling costs
+    nothing.
+
+    Use :func:`profiling` rather than this class directly.
+
+    :type measure_bytes: boolean
+    :param measure_bytes: Record the serialized size of elements. Each
+        element is serialized again, so this is slow.
+
+    :ivar dict stats: Statistics, as returned by report()
+    """
+
+    methods = ["fromxml", "toxml"]
+
+    functions = ["all_undocumented_to_python", "all_undocumented_to_xml"]
+
+    def __init__(self, measure_bytes: bool = False):
+        self.measure_bytes = measure_bytes
+        self.stats = {
+            method: {} for method in XMLProfiler.methods + ["undocumented"]
+        }
+
+        # Original methods and functions, as (class or module, name,
+        # function)
+        self._originals = []
+
+        # Per thread stack of calls being profiled
+        self._local = threading.local()
+
+    def _classes(self):
+        """
+        Returns all PyScribusElement subclasses.
+
+        :rtype: list
+        """
+
+        # NOTE Imported here, as pyscribus modules import this module.
+        # pyscribus.sla imports all modules defining PyScribusElement
+        # subclasses.
+        import pyscribus.sla
+        import pyscribus.common.xml as xmlc
+
+        classes = []
+        pending = [xmlc.PyScribusElement]
+
+        while pending:
+            cls = pending.pop()
+
+            if cls not in classes:
+                classes.append(cls)
+                pending.extend(cls.__subclasses__())
+
+        return classes
+
+    def _key(self, instance, element):
+        """
+        Returns the statistics key of an XML element.
+
+        :rtype: str
+        """
+
+        if isinstance(element, (list, tuple)) and element:
+            element = element[0]
+
+        if isinstance(element, ET._Element):
+            key = element.tag
+        else:
+            key = type(instance).__name__
+
+        if (ptype := getattr(instance, "ptype", None)):
+            key = "{}:{}".format(key, ptype)
+
+        return key
+
+    def _record(self, method, key, elapsed, nested, element):
+        stats = self.stats[method].setdefault(
+            key, {"count": 0, "time": 0.0, "max": 0.0, "self": 0.0, "bytes": 0}
+        )
+
+        stats["count"] += 1
+        stats["time"] += elapsed
+        stats["self"] += elapsed - nested
+
+        if elapsed > stats["max"]:
+            stats["max"] = elapsed
+
+        if self.measure_bytes:
+
+            if isinstance(element, (list, tuple)) and element:
+                element = element[0]
+
+            if isinstance(element, ET._Element):
+                stats["bytes"] += len(ET.tostring(element, with_tail=False))
+
+    def _wrap(self, method, function):
+        profiler = self
+
+        def wrapper(instance, *args, **kwargs):
+            stack = getattr(profiler._local, "stack", None)
+
+            if stack is None:
+                stack = profiler._local.stack = []
+
+            # Calls of the parent class method on the same instance
+            # (PageObject.fromxml in TextObject.fromxml) are not
+            # recorded twice
+
+            if stack and stack[-1][0] is instance and stack[-1][1] == method:
+                return function(instance, *args, **kwargs)
+
+            # [instance, method, time spent in nested elements]
+            frame = [instance, method, 0.0]
+            stack.append(frame)
+
+            start = time.perf_counter()
+
+            try:
+                result = function(instance, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+
+                if stack:
+                    stack[-1][2] += elapsed
+
+            if method == "fromxml" and args:
+                element = args[0]
+            else:
+                element = result
+
+            profiler._record(
+                method, profiler._key(instance, element),
+                elapsed, frame[2], element
+            )
+
+            return result
+
+        wrapper.__wrapped__ = function
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+
+        return wrapper
+
+    def _wrap_function(self, function):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            stack = getattr(profiler._local, "stack", None)
+
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+
+                if stack:
+                    stack[-1][2] += elapsed
+
+                profiler._record(
+                    "undocumented", function.__name__, elapsed, 0.0, None
+                )
+
+        wrapper.__wrapped__ = function
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+
+        return wrapper
+
+    def enable(self):
+        """
+        Start profiling.
+
+        :raises RuntimeError: If another profiler is enabled
+        """
+
+        global PROFILER
+
+        if PROFILER is not None:
+            raise RuntimeError("An XMLProfiler is already enabled.")
+
+        for cls in self._classes():
+
+            for method in XMLProfiler.methods:
+
+                if (function := cls.__dict__.get(method)) is not None:
+                    self._originals.append((cls, method, function))
+                    setattr(cls, method, self._wrap(method, function))
+
+        # Undocumented attributes functions are replaced in all pyscribus
+        # modules, as some modules import them with "from … import *"
+
+        import pyscribus.common.xml as xmlc
+
+        for name in XMLProfiler.functions:
+            function = getattr(xmlc, name)
+            wrapper = self._wrap_function(function)
+
+            for module_name, module in list(sys.modules.items()):
+
+                if not module_name.startswith("pyscribus"):
+                    continue
+
+                if getattr(module, name, None) is function:
+                    self._originals.append((module, name, function))
+                    setattr(module, name, wrapper)
+
+        PROFILER = self
+
+    def disable(self):
+        """
+        Stop profiling and restore original methods and functions.
+        """
+
+        global PROFILER
+
+        for cls, method, function in self._originals:
+            setattr(cls, method, function)
+
+        self._originals = []
+
+        if PROFILER is self:
+            PROFILER = None
+
+    def reset(self):
+        """
+        Clear recorded statistics.
+        """
+
+        self.stats = {
+            method: {} for method in XMLProfiler.methods + ["undocumented"]
+        }
+
+    def report(self):
+        """
+        Returns recorded statistics.
+
+        :rtype: dict
+        :returns: ``{"fromxml": {key: stats}, "toxml": {key: stats},
+            "undocumented": {function name: stats}}``, stats being a dict
+            with count, time, max, self and bytes keys.
+        """
+
+        return {
+            method: {key: dict(values) for key, values in stats.items()}
+            for method, stats in self.stats.items()
+        }
+
+    def format(self):
+        """
+        Returns recorded statistics as a text table, sorted by
+        cumulative time.
+
+        :rtype: str
+        """
+
+        lines = [
+            "{:<12} {:<28} {:>8} {:>10} {:>10} {:>10} {:>12}".format(
+                "method", "element", "count", "time", "self", "max", "bytes"
+            )
+        ]
+
+        for method, stats in self.stats.items():
+
+            for key, values in sorted(
+                    stats.items(), key=lambda i: i[1]["time"], reverse=True):
+
+                lines.append(
+                    "{:<12} {:<28} {:>8} {:>10.4f} {:>10.4f} {:>10.4f} {:>12}".format(
+                        method, key, values["count"], values["time"],
+                        values["self"], values["max"], values["bytes"]
+                    )
+                )
+
+        return "\n".join(lines)
+
 # Fonctions =============================================================#
 
+@contextlib.contextmanager
+def profiling(measure_bytes: bool = False):
+    """
+    Context manager profiling fromxml() and toxml() calls of PyScribus
+    elements.
+
+    If logging is enabled (see init_logging), the report is logged when
+    leaving the context.
+
+    :type measure_bytes: boolean
+    :param measure_bytes: Record the serialized size of elements (slow)
+    :rtype: XMLProfiler
+
+    :Example:
+
+    .. code:: python
+
+       import pyscribus.logs as logs
+       import pyscribus.sla as sla
+
+       with logs.profiling() as profiler:
+           slafile = sla.SLA("document.sla", "1.5.5")
+           slafile.save("copy.sla")
+
+       print(profiler.format())
+       stats = profiler.report()["fromxml"]["PAGEOBJECT:text"]
+
+    .. seealso:: :class:`XMLProfiler`
+    """
+
+    profiler = XMLProfiler(measure_bytes)
+    profiler.enable()
+
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+        logger = getLogger()
+
+        if logger:
+            logger.debug("XML profiling:\n" + profiler.format())
+
 def init_logging(
         filepath="test.log",
         formatstr="%(asctime)s:%(levelname)s:%(message)s"):
@@ -150,10 +150,10 @@ class DocumentMark(xmlc.PyScribusElement):
             mtype = xml.get("type")
 
             if mtype is not None:
-                for h,x in mark_type_xml.items():
-                    if mtype == x:
-                        self.type = h
-                        break
+                codes = xmlc.reverse_xml(mark_type_xml)
+
+                if (h := codes.get(mtype)) is not None:
+                    self.type = h
 
             # --- Name and/or label -----------------------------------------
 
@@ -239,10 +239,10 @@ class StoryMarkAbstract(xmlc.PyScribusElement):
         if xml.tag == "MARK":
 
             if (mtype := xml.get("type")) is not None:
-                for h,x in mark_type_xml.items():
-                    if mtype == x:
-                        self.type = h
-                        break
+                codes = xmlc.reverse_xml(mark_type_xml)
+
+                if (h := codes.get(mtype)) is not None:
+                    self.type = h
 
             if (mlabel := xml.get("label")) is not None:
                 self.label = mlabel
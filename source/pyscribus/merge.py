@@ -0,0 +1,597 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Merge of several documents into one.
+
+Colors, gradients, styles and patterns are interned by content hash: a
+resource identical to one of the target document is not added twice, and
+a resource with the same name but another content is renamed, as well as
+its references.
+
+Default styles of a merged document are replaced by the default styles
+of the target document, so that the result has one default style of
+each kind.
+
+.. code:: python
+
+   import pyscribus.sla as sla
+   import pyscribus.merge as merge
+
+   magazine = sla.SLA("cover.sla", "1.5.5")
+
+   articles = [
+       sla.SLA(path, "1.5.5").document
+       for path in ["article-1.sla", "article-2.sla"]
+   ]
+
+   merge.merge(magazine.document, articles)
+   magazine.save("magazine.sla")
+"""
+
+# Imports ===============================================================#
+
+import hashlib
+
+import lxml
+import lxml.etree as ET
+
+import pyscribus.stories as stories
+import pyscribus.pageobjects as pageobjects
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Kinds of interned resources, in merging order: styles use colors,
+# paragraph styles use character styles, patterns use all of them.
+resource_kinds = [
+    "color", "gradient", "character", "paragraph", "table", "cell", "note",
+    "pattern"
+]
+
+# Attributes left out of the digests of resources
+digest_ignored = ["ItemID", "NEXTITEM", "BACKITEM"]
+
+# Classes ===============================================================#
+
+class Merger:
+    """
+    Merge documents into a target document.
+
+    Source documents are consumed: their page objects, pages and
+    resources are moved into the target document and modified.
+
+    :type target: pyscribus.document.Document
+    :param target: Document receiving the merged documents
+    :type gap: float
+    :param gap: Vertical gap between the last page of the target document
+        and the first page of a merged document, in points.
+
+    :ivar dict renamed: Renamed resources of the last merged document, as
+        {kind: {source name: target name}}. Resources interned with the
+        same name are not listed.
+    """
+
+    def __init__(self, target, gap: float = 40):
+        self.target = target
+        self.gap = gap
+
+        self.renamed = {}
+
+        self._mappings = {}
+        self._ids = {}
+        self._layer_levels = {}
+
+        # Per kind of resource: target name -> digest, digest -> target
+        # name, and last suffix number used to rename a name
+        self._names = {kind: {} for kind in resource_kinds}
+        self._digests = {kind: {} for kind in resource_kinds}
+        self._suffixes = {kind: {} for kind in resource_kinds}
+
+        # Per kind of style: name of the default style of the target
+        self._defaults = {}
+
+        for kind in resource_kinds:
+            for resource in self._resources(target, kind):
+                self._intern(kind, resource.name, Merger._digest(resource))
+
+                if getattr(resource, "is_default", False):
+                    self._defaults.setdefault(kind, resource.name)
+
+        self._layers = {layer.name: layer for layer in target.layers}
+        self._master_pages = {mp.name: mp for mp in target.master_pages}
+
+        self._next_id = 1
+
+        for po in self._all_objects(target):
+            try:
+                self._next_id = max(self._next_id, int(po.object_id) + 1)
+            except (TypeError, ValueError):
+                pass
+
+    # --- Resources ------------------------------------------------------
+
+    @staticmethod
+    def _resources(document, kind: str):
+        if kind == "color":
+            return document.colors
+
+        if kind == "gradient":
+            return document.gradients
+
+        if kind == "pattern":
+            return document.patterns
+
+        return document.styles[kind]
+
+    @staticmethod
+    def _digest(resource):
+        xml = resource.toxml()
+
+        if isinstance(xml, (list, tuple)):
+            xml = xml[0]
+
+        # Identifiers of pattern items differ between documents, and are
+        # renumbered before the digest is computed
+        for element in xml.iter():
+            for attribute in digest_ignored:
+                element.attrib.pop(attribute, None)
+
+        return hashlib.blake2b(
+            ET.tostring(xml, method="c14n"), digest_size=16
+        ).hexdigest()
+
+    def _intern(self, kind: str, name: str, digest: str):
+        self._names[kind][name] = digest
+        self._digests[kind].setdefault(digest, name)
+
+    def _free_name(self, kind: str, name: str):
+        number = self._suffixes[kind].get(name, 1)
+
+        while True:
+            number += 1
+            new_name = "{} ({})".format(name, number)
+
+            if new_name not in self._names[kind]:
+                self._suffixes[kind][name] = number
+                return new_name
+
+    def _merge_resources(self, source, kind: str):
+        """
+        Add resources of source document not in target document.
+
+        :rtype: dict
+        :returns: Source name as keys, target name as values
+        """
+
+        mapping = {}
+        added = []
+
+        resources = Merger._resources(source, kind)
+
+        if kind in ["character", "paragraph"]:
+            resources = Merger._parents_first(resources)
+
+        for resource in resources:
+            self._rename_references(resource, kind)
+
+            name = resource.name
+
+            if getattr(resource, "is_default", False):
+
+                # References to the source default style now point to
+                # the target default style
+                if (default := self._defaults.get(kind)) is not None:
+                    mapping[name] = default
+                    continue
+
+                self._defaults[kind] = name
+
+            digest = Merger._digest(resource)
+
+            # NOTE The digest includes the name. A resource renamed
+            # because of a name conflict keeps the digest of its original
+            # name, so the same resource in another source document is
+            # interned as the renamed one.
+
+            if (existing := self._digests[kind].get(digest)) is not None:
+                mapping[name] = existing
+                continue
+
+            if name in self._names[kind]:
+                resource.name = self._free_name(kind, name)
+
+                if self._defaults.get(kind) == name:
+                    self._defaults[kind] = resource.name
+
+            mapping[name] = resource.name
+            self._intern(kind, resource.name, digest)
+            added.append(resource)
+
+        target_resources = Merger._resources(self.target, kind)
+
+        for resource in added:
+            if hasattr(resource, "doc_parent"):
+                resource.doc_parent = self.target
+
+            if hasattr(resource, "sla_parent"):
+                resource.sla_parent = self.target.sla_parent
+
+            target_resources.append(resource)
+
+        self._mappings[kind] = mapping
+
+        self.renamed[kind] = {
+            old: new for old, new in mapping.items() if old != new
+        }
+
+        return mapping
+
+    @staticmethod
+    def _parents_first(resources: list):
+        """
+        Returns styles sorted so that parent styles come before their
+        children.
+        """
+
+        by_name = {resource.name: resource for resource in resources}
+        ordered, seen = [], set()
+
+        for resource in resources:
+            chain = []
+
+            while resource is not None and id(resource) not in seen:
+                seen.add(id(resource))
+                chain.append(resource)
+                resource = by_name.get(resource.parent)
+
+            ordered.extend(reversed(chain))
+
+        return ordered
+
+    def _mapped(self, kind: str, name):
+        if not name:
+            return name
+
+        return self._mappings.get(kind, {}).get(name, name)
+
+    def _rename_references(self, resource, kind: str):
+        """
+        Rename the references of a resource to already merged resources.
+        """
+
+        if kind == "gradient":
+            for stop in resource.stops:
+                stop.color = self._mapped("color", stop.color)
+
+            return
+
+        if kind == "pattern":
+            for item in resource.items:
+                self._merge_pageobject(item, 0, 0, shift_box=False)
+
+            return
+
+        if kind == "note":
+            return
+
+        if (parent := getattr(resource, "parent", None)):
+            resource.parent = self._mapped(kind, parent)
+
+        if kind == "paragraph":
+            resource.character_parent = self._mapped(
+                "character", resource.character_parent
+            )
+
+        if (font := getattr(resource, "font", None)):
+            font["color"] = self._mapped("color", font["color"])
+
+        if (fill := getattr(resource, "fill", None)):
+            fill["color"] = self._mapped("color", fill["color"])
+
+        for border in getattr(resource, "borders", []):
+            for line in getattr(border, "lines", []):
+                line.color = self._mapped("color", line.color)
+
+    # --- Layers ---------------------------------------------------------
+
+    def _merge_layers(self, source):
+        """
+        :rtype: dict
+        :returns: Source layer level as keys, target layer level as values
+        """
+
+        mapping = {}
+
+        next_level = max([layer.level for layer in self.target.layers] + [-1]) + 1
+        next_number = max([layer.number for layer in self.target.layers] + [-1]) + 1
+
+        for layer in source.layers:
+
+            if (existing := self._layers.get(layer.name)) is not None:
+                mapping[layer.level] = existing.level
+                continue
+
+            mapping[layer.level] = next_level
+
+            layer.level = next_level
+            layer.number = next_number
+
+            next_level += 1
+            next_number += 1
+
+            self._layers[layer.name] = layer
+            self.target.layers.append(layer)
+
+        return mapping
+
+    # --- Pages ----------------------------------------------------------
+
+    def _merge_master_pages(self, source):
+        """
+        :rtype: dict
+        :returns: Source master page index as keys, target master page
+            index as values, or None if the target document already has a
+            master page with this name.
+        """
+
+        mapping = {}
+
+        for index, master_page in enumerate(source.master_pages):
+
+            if master_page.name in self._master_pages:
+                mapping[index] = None
+                continue
+
+            mapping[index] = len(self.target.master_pages)
+
+            master_page.doc_parent = self.target
+            master_page.sla_parent = self.target.sla_parent
+
+            self._master_pages[master_page.name] = master_page
+            self.target.master_pages.append(master_page)
+
+        return mapping
+
+    def _page_shift(self, source):
+        """
+        Returns the vertical translation of the source pages, so that
+        they are placed after the target pages.
+
+        :rtype: float
+        """
+
+        if not self.target.pages or not source.pages:
+            return 0
+
+        target_bottom = max(
+            page.box.gety("bottom-left") for page in self.target.pages
+        )
+
+        source_top = min(
+            page.box.gety("top-left") for page in source.pages
+        )
+
+        return float(target_bottom) + self.gap - float(source_top)
+
+    # --- Page objects ---------------------------------------------------
+
+    def _all_objects(self, document):
+        pending = list(document.page_objects)
+
+        while pending:
+            po = pending.pop()
+
+            yield po
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+    def _merge_story(self, story):
+        if story is None:
+            return
+
+        for element in story.sequence:
+
+            if (parent := getattr(element, "parent", None)):
+                element.parent = self._mapped("paragraph", parent)
+
+            if isinstance(element, stories.StoryFragment):
+                if element.font["color"]:
+                    element.set_font(
+                        color=self._mapped("color", element.font["color"])
+                    )
+
+    def _merge_pageobject(self, po, page_offset: int, shift: float,
+            shift_box: bool = True, master_pages: dict = {}):
+        """
+        Renumber a page object and rename its references.
+
+        :rtype: bool
+        :returns: False if the page object must be dropped
+        """
+
+        # --- Identifier, page ---------------------------------------
+
+        old_id = po.object_id
+        po.object_id = str(self._next_id)
+        self._next_id += 1
+
+        if old_id is not False:
+            self._ids[str(old_id)] = po.object_id
+
+        own_page = po.own_page
+
+        if own_page is False:
+            own_page = 0
+
+        if isinstance(own_page, int) and own_page >= 0:
+
+            if po.on_master_page:
+                if (own_page := master_pages.get(own_page)) is None:
+                    return False
+            else:
+                own_page += page_offset
+
+            po.own_page = own_page if own_page else False
+
+        # --- Position -----------------------------------------------
+
+        if shift_box and shift and not po.on_master_page:
+            for box in [po.box, po.rotated_box, po.gbox]:
+                box.translate(0, shift)
+
+            if isinstance(po, pageobjects.GroupObject):
+                po.group_box.translate(0, shift)
+
+        # --- Resources ----------------------------------------------
+
+        po.outline["fill"] = self._mapped("color", po.outline["fill"])
+        po.outline["stroke"] = self._mapped("color", po.outline["stroke"])
+
+        po.layer = self._layer_levels.get(po.layer, po.layer)
+
+        if isinstance(po, pageobjects.SymbolObject):
+            po.pattern = self._mapped("pattern", po.pattern)
+
+        for story in getattr(po, "stories", []):
+            self._merge_story(story)
+
+        if isinstance(po, pageobjects.TableObject):
+            po.style = self._mapped("table", po.style)
+
+            for cell in po.cells:
+                cell.style = self._mapped("cell", cell.style)
+                cell.fill["color"] = self._mapped("color", cell.fill["color"])
+                self._merge_story(cell.story)
+
+        if isinstance(po, pageobjects.GroupObject):
+            po.group_objects = [
+                child for child in po.group_objects
+                if self._merge_pageobject(
+                    child, page_offset, shift, shift_box, master_pages
+                )
+            ]
+
+        po.doc_parent = self.target
+        po.sla_parent = self.target.sla_parent
+
+        return True
+
+    def _relink(self, po):
+        for direction in ["next", "previous"]:
+
+            if (linked := po.linked[direction]) is not None:
+                po.linked[direction] = self._ids.get(str(linked))
+
+        if isinstance(po, pageobjects.GroupObject):
+            for child in po.group_objects:
+                self._relink(child)
+
+    # --- Merging --------------------------------------------------------
+
+    def merge(self, source):
+        """
+        Merge a document into the target document.
+
+        :type source: pyscribus.document.Document
+        :param source: Document to merge
+        :rtype: dict
+        :returns: Renamed resources, as Merger.renamed
+        """
+
+        self._mappings = {}
+        self._ids = {}
+        self.renamed = {}
+
+        # Layers first, as pattern items are on layers
+        self._layer_levels = self._merge_layers(source)
+
+        for kind in resource_kinds:
+            self._merge_resources(source, kind)
+
+        master_pages = self._merge_master_pages(source)
+
+        # --- Pages --------------------------------------------------
+
+        page_offset = len(self.target.pages)
+        shift = self._page_shift(source)
+
+        for index, page in enumerate(source.pages):
+
+            if page.number > 0:
+                page.number += page_offset
+            else:
+                page.number = page_offset + index + 1
+
+            if shift:
+                page.box.translate(0, shift)
+
+            page.doc_parent = self.target
+            page.sla_parent = self.target.sla_parent
+
+            self.target.pages.append(page)
+
+        self.target.page_number = len(self.target.pages)
+
+        # --- Page objects -------------------------------------------
+
+        merged = [
+            po for po in source.page_objects
+            if self._merge_pageobject(
+                po, page_offset, shift, master_pages=master_pages
+            )
+        ]
+
+        for po in merged:
+            self._relink(po)
+
+        self.target.page_objects.extend(merged)
+        self.target.clear_index()
+
+        source.page_objects = []
+        source.pages = []
+
+        return self.renamed
+
+# Fonctions =============================================================#
+
+def merge(target, sources: list, gap: float = 40):
+    """
+    Merge documents into a target document.
+
+    Source documents are consumed: their page objects, pages and
+    resources are moved into the target document.
+
+    :type target: pyscribus.document.Document
+    :param target: Document receiving the merged documents
+    :type sources: list
+    :param sources: List of pyscribus.document.Document
+    :type gap: float
+    :param gap: Vertical gap between pages of merged documents, in points
+    :rtype: list
+    :returns: Renamed resources of each source (see Merger.renamed)
+    """
+
+    merger = Merger(target, gap)
+
+    return [merger.merge(source) for source in sources]
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -0,0 +1,514 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Text overflow estimation, without Scribus.
+
+The story of a text frame (or of a chain of linked text frames) is
+broken into lines using the advance widths of its fonts, then the lines
+are placed in the columns of the frames.
+
+This is an estimation: there is no kerning, hyphenation nor
+justification, and inline objects are ignored.
+
+:Example:
+
+.. code:: python
+
+   estimator = overflow.OverflowEstimator(
+       document, fonts.FontLibrary(["/home/user/fonts"])
+   )
+
+   for frame in estimator.overflowing():
+       print(frame.name, estimator.estimate(frame)["missing_lines"])
+
+"""
+
+# Imports ===============================================================#
+
+import pyscribus.fonts as fonts
+import pyscribus.styles as pstyles
+import pyscribus.stories as stories
+import pyscribus.pageobjects as pageobjects
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Line height / font size of automatic leading without font metrics
+AUTOMATIC_LEADING = 1.2
+
+# Classes ===============================================================#
+
+class OverflowEstimator:
+    """
+    Estimates if stories fit in their text frames.
+
+    Paragraph styles are resolved once. If you modify the styles of the
+    document, call clear().
+
+    :type document: pyscribus.document.Document
+    :param document: Document of the text frames
+    :type library: pyscribus.fonts.FontLibrary
+    :param library: Fonts. If None, a FontLibrary of the default font
+        directories.
+    :type fallback_width: float
+    :param fallback_width: Width of characters of missing fonts, in em
+
+    :ivar set missing_fonts: Names of the fonts not found in library
+    """
+
+    def __init__(self, document, library=None, fallback_width: float = 0.5):
+        self.document = document
+
+        if library is None:
+            library = fonts.FontLibrary()
+
+        self.library = library
+
+        self.fallback = fonts.FontMetrics(
+            [], 1000, 800, -200, 0, {}, int(fallback_width * 1000)
+        )
+
+        self.missing_fonts = set()
+
+        # Font name -> FontMetrics
+        self._fonts = {}
+        # Paragraph style name -> resolved settings
+        self._styles = {}
+
+    def clear(self):
+        """
+        Forget resolved styles and fonts.
+        """
+
+        self._fonts = {}
+        self._styles = {}
+        self.missing_fonts = set()
+
+    # --- Fonts and styles -----------------------------------------------
+
+    def _metrics(self, name):
+        if (metrics := self._fonts.get(name)) is not None:
+            return metrics
+
+        if (metrics := self.library.metrics(name)) is None:
+            self.missing_fonts.add(name)
+            metrics = self.fallback
+
+        self._fonts[name] = metrics
+
+        return metrics
+
+    def style(self, name):
+        """
+        Returns the settings of a paragraph style, resolved through its
+        parents, character style and the default styles.
+
+        :rtype: dict
+        """
+
+        if (resolved := self._styles.get(name)) is not None:
+            return resolved
+
+        paragraph_styles = {}
+        default_paragraph = None
+
+        for style in self.document.styles["paragraph"]:
+            paragraph_styles.setdefault(style.name, style)
+
+            if style.is_default and default_paragraph is None:
+                default_paragraph = style
+
+        character_styles = {}
+        default_character = None
+
+        for style in self.document.styles["character"]:
+            character_styles.setdefault(style.name, style)
+
+            if style.is_default and default_character is None:
+                default_character = style
+
+        def chain(styles, style, default):
+            seen = set()
+
+            while style is not None and id(style) not in seen:
+                seen.add(id(style))
+                yield style
+
+                style = styles.get(style.parent) if style.parent else None
+
+            if default is not None and id(default) not in seen:
+                yield default
+
+        resolved = {
+            "font": None, "size": None,
+            "leading": None, "leading_value": 0,
+            "before": 0, "after": 0,
+            "left": 0, "right": 0, "first-line": 0,
+        }
+
+        found = set()
+        character_parent = None
+
+        for style in chain(
+                paragraph_styles, paragraph_styles.get(name),
+                default_paragraph):
+
+            for key, value in [
+                    ("font", style.font["name"]),
+                    ("size", style.font["size"]),
+                    ("leading", style.leading["mode"]),
+                    ("before", style.space["before"]),
+                    ("after", style.space["after"]),
+                    ("left", style.indentations["left"]),
+                    ("right", style.indentations["right"]),
+                    ("first-line", style.indentations["first-line"])]:
+
+                if key in found or value in [None, "", 0, False]:
+                    continue
+
+                if key == "leading":
+                    resolved["leading_value"] = float(
+                        style.leading["value"].value
+                    )
+                elif key not in ["font", "size"]:
+                    value = float(value.value)
+
+                resolved[key] = value
+                found.add(key)
+
+            if character_parent is None and style.character_parent:
+                character_parent = character_styles.get(style.character_parent)
+
+        for style in chain(
+                character_styles, character_parent, default_character):
+
+            for key in ["name", "size"]:
+                target = "font" if key == "name" else key
+
+                if target not in found and style.font[key]:
+                    resolved[target] = style.font[key]
+                    found.add(target)
+
+        for key, default in [("font", "name"), ("size", "size")]:
+            if resolved[key] is None:
+                resolved[key] = pstyles.StyleAbstract.default_font[default]
+
+        resolved["size"] = float(resolved["size"])
+
+        self._styles[name] = resolved
+
+        return resolved
+
+    # --- Story ----------------------------------------------------------
+
+    def paragraphs(self, story):
+        """
+        Returns the paragraphs of a story, as (paragraph style, runs)
+        tuples. Runs are (text, font name, font size) tuples, or None for
+        line breaks.
+        """
+
+        paragraphs = []
+        runs = []
+
+        for element in story.sequence:
+
+            if isinstance(element, stories.StoryFragment):
+                runs.append(
+                    (element.text, element.font["name"], element.font["size"])
+                )
+                continue
+
+            if isinstance(element, stories.StoryLineBreak):
+                runs.append(None)
+                continue
+
+            if isinstance(element, stories.NonBreakingSpace):
+                runs.append((" ", False, False))
+                continue
+
+            if isinstance(element, stories.NonBreakingHyphen):
+                runs.append(("-", False, False))
+                continue
+
+            if isinstance(element, stories.StoryVariable):
+                runs.append(("00", False, False))
+                continue
+
+            if isinstance(
+                    element,
+                    (stories.StoryParagraphEnding, stories.StoryEnding)):
+                paragraphs.append((element.parent or None, runs))
+                runs = []
+
+        if runs:
+            paragraphs.append((None, runs))
+
+        return paragraphs
+
+    def _words(self, runs, style):
+        """
+        Returns the words of a paragraph as [width, following space width]
+        lists, and the biggest font size and line height.
+        """
+
+        words = []
+        width = 0.0
+        biggest = (0, 0)
+
+        for run in runs:
+
+            if run is None:
+                words.append([width, 0])
+                words.append(None)
+                width = 0.0
+                continue
+
+            text, font, size = run
+
+            metrics = self._metrics(font or style["font"])
+            size = float(size or style["size"])
+            scale = size / metrics.units_per_em
+
+            if size > biggest[0]:
+                biggest = (size, metrics.line_height(size))
+
+            space = metrics.word_width(" ") * scale
+
+            for index, part in enumerate(
+                    text.replace("\t", " ").replace("\n", " ").split(" ")):
+
+                if index:
+                    words.append([width, space])
+                    width = 0.0
+
+                if part:
+                    width += metrics.word_width(part) * scale
+
+        words.append([width, 0])
+
+        if not biggest[0]:
+            metrics = self._metrics(style["font"])
+            biggest = (style["size"], metrics.line_height(style["size"]))
+
+        return words, biggest
+
+    # --- Frames ---------------------------------------------------------
+
+    @staticmethod
+    def _columns(frame):
+        """
+        Returns the columns of a text frame as [width, height] lists.
+        """
+
+        padding = {
+            side: float(frame.padding[side].value)
+            for side in ["left", "right", "top", "bottom"]
+        }
+
+        width = float(frame.box.dims["width"].value)
+        width -= padding["left"] + padding["right"]
+
+        height = float(frame.box.dims["height"].value)
+        height -= padding["top"] + padding["bottom"]
+
+        count = max(1, int(frame.columns["count"] or 1))
+        gap = float(frame.columns["gap"].value)
+
+        column_width = (width - gap * (count - 1)) / count
+
+        return [[max(column_width, 0), max(height, 0)]] * count
+
+    def estimate(self, frame):
+        """
+        Estimates the layout of the story of a text frame in its frame, or
+        in its chain of linked text frames.
+
+        :type frame: pyscribus.pageobjects.TextObject
+        :param frame: Text frame, or any frame of a chain of text frames
+        :rtype: dict
+        :returns: Estimation
+
+        +---------------+-------------------------------------------------+
+        | Key           | Value                                           |
+        +===============+=================================================+
+        | overflow      | True if the story doesn't fit in the frames     |
+        +---------------+-------------------------------------------------+
+        | lines         | Count of lines of the story                     |
+        +---------------+-------------------------------------------------+
+        | missing_lines | Count of lines that don't fit in the frames     |
+        +---------------+-------------------------------------------------+
+        | frames        | Text frames of the chain                        |
+        +---------------+-------------------------------------------------+
+        """
+
+        chain = self.document.text_chain(frame) or [frame]
+
+        columns = []
+
+        for linked in chain:
+            if isinstance(linked, pageobjects.TextObject):
+                columns.extend(OverflowEstimator._columns(linked))
+
+        lines = 0
+        missing = 0
+
+        column = 0
+        y = 0.0
+
+        for story in getattr(chain[0], "stories", []):
+
+            for style_name, runs in self.paragraphs(story):
+                style = self.style(style_name)
+
+                words, (size, automatic) = self._words(runs, style)
+
+                if style["leading"] == "fixed" and style["leading_value"]:
+                    line_height = style["leading_value"]
+                elif automatic:
+                    line_height = automatic
+                else:
+                    line_height = size * AUTOMATIC_LEADING
+
+                if y:
+                    y += style["before"]
+
+                indent = style["left"] + style["right"]
+                x = 0.0
+                first = True
+                line_width = None
+
+                words.append(None)
+
+                for word in words:
+
+                    # Start of a line
+
+                    if line_width is None:
+
+                        while column < len(columns) and \
+                                y + line_height > columns[column][1]:
+                            column += 1
+                            y = 0.0
+
+                        if column < len(columns):
+                            line_width = columns[column][0] - indent
+                        else:
+                            line_width = columns[-1][0] - indent if columns else 0
+
+                        if first:
+                            line_width -= style["first-line"]
+                            first = False
+
+                        line_width = max(line_width, 1.0)
+                        x = 0.0
+
+                    # End of line (line break, end of paragraph)
+
+                    if word is None:
+                        lines += 1
+
+                        if column < len(columns):
+                            y += line_height
+                        else:
+                            missing += 1
+
+                        line_width = None
+                        continue
+
+                    width, space = word
+
+                    if x and x + width > line_width:
+                        lines += 1
+
+                        if column < len(columns):
+                            y += line_height
+                        else:
+                            missing += 1
+
+                        # New line for this word
+                        while column < len(columns) and \
+                                y + line_height > columns[column][1]:
+                            column += 1
+                            y = 0.0
+
+                        if column < len(columns):
+                            line_width = max(columns[column][0] - indent, 1.0)
+
+                        x = 0.0
+
+                    # Words longer than the line
+                    while width > line_width:
+                        lines += 1
+
+                        if column < len(columns):
+                            y += line_height
+                        else:
+                            missing += 1
+
+                        width -= line_width
+
+                    x += width + space
+
+                y += style["after"]
+
+        return {
+            "overflow": missing > 0,
+            "lines": lines,
+            "missing_lines": missing,
+            "frames": chain,
+        }
+
+    def overflows(self, frame):
+        """
+        Returns True if the story of a text frame (or of its chain of
+        linked text frames) doesn't fit in.
+
+        :type frame: pyscribus.pageobjects.TextObject
+        :param frame: Text frame
+        :rtype: bool
+        """
+
+        return self.estimate(frame)["overflow"]
+
+    def overflowing(self):
+        """
+        Returns the text frames of the document whose story doesn't fit.
+
+        Only the first frame of chains of linked text frames is returned.
+
+        :rtype: list
+        """
+
+        found = []
+
+        for frame in self.document.query(ptype="text"):
+
+            if frame.linked["previous"] is not None:
+                if self.document.item(frame.linked["previous"]) is not None:
+                    continue
+
+            if self.overflows(frame):
+                found.append(frame)
+
+        return found
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -25,6 +25,8 @@ PyScribus objects for… page objects manipulations.
 
 import copy
 import math
+import zlib
+import base64
 
 import lxml
 import lxml.etree as ET
@@ -32,7 +34,6 @@ import lxml.etree as ET
 import svg.path as svg
 
 import pyscribus.common.xml as xmlc
-import pyscribus.logs as logs
 import pyscribus.exceptions as exceptions
 import pyscribus.dimensions as dimensions
 import pyscribus.itemattribute as itemattribute
@@ -207,6 +208,31 @@ class PageObject(xmlc.PyScribusElement):
     def fromdefault(self):
         self.shape = {"type": "rectangle", "edited": False}
 
+    def bounds(self):
+        """
+        Returns the axis-aligned bounding box of the page object, rotation
+        included.
+
+        :rtype: tuple
+        :returns: (x min, y min, x max, y max)
+
+        .. seealso:: pyscribus.document.Document.bounds()
+        """
+
+        return self.box.bounds(self.rotated_box.rotation.value)
+
+    @staticmethod
+    def _rotation(rotation):
+        # ROT, LOCALROT -> angle from 0 to 360
+
+        if rotation is None:
+            return 0
+
+        try:
+            return float(rotation) % 360
+        except ValueError:
+            return 0
+
     def fromxml(self, xml: ET._Element, arbitrary_tag: bool = False):
         """
         :type xml: lxml.etree._Element
@@ -271,20 +297,17 @@ class PageObject(xmlc.PyScribusElement):
                     height=height
                 )
 
-                self.rotated_box = copy.deepcopy(self.box)
-
-                if rotation is not None:
-
-                    try:
-                        rdegree = float(rotation)
+                rdegree = PageObject._rotation(rotation)
 
-                        if rdegree > 0:
-                            self.rotated_box.rotate(rdegree)
-                        else:
-                            self.rotated_box.rotation.value = 0
+                self.rotated_box.set_box(
+                    top_lx=xpos,
+                    top_ly=ypos,
+                    width=width,
+                    height=height,
+                    rotation=rdegree
+                )
 
-                    except ValueError:
-                        pass
+                self.rotated = bool(rdegree)
 
             # --- Undocumented gbox --------------------------------------
 
@@ -326,10 +349,10 @@ class PageObject(xmlc.PyScribusElement):
 
             if (istype := xml.get("SCALETYPE")) is not None:
 
-                for human, code in PageObject.image_scaling_type_xml.items():
-                    if istype == code:
-                        self.image_scale["type"] = human
-                        break
+                codes = xmlc.reverse_xml(PageObject.image_scaling_type_xml)
+
+                if (human := codes.get(istype)) is not None:
+                    self.image_scale["type"] = human
 
             # --- Object path, copath and shape --------------------------
 
@@ -338,10 +361,10 @@ class PageObject(xmlc.PyScribusElement):
 
             if (shapetype := xml.get("FRTYPE")) is not None:
 
-                for human,code in PageObject.shape_type_xml.items():
-                    if shapetype == code:
-                        self.shape["type"] = human
-                        break
+                codes = xmlc.reverse_xml(PageObject.shape_type_xml)
+
+                if (human := codes.get(shapetype)) is not None:
+                    self.shape["type"] = human
 
             # NOTE FIXME Currently only working for rectangular shapes
 
@@ -461,20 +484,13 @@ class PageObject(xmlc.PyScribusElement):
                     height=img_height
                 )
 
-                self.image_rotated_box = copy.deepcopy(self.image_box)
-
-                if img_rotation is not None:
-
-                    try:
-                        rdegree = float(img_rotation)
-
-                        if rdegree > 0:
-                            self.image_rotated_box.rotate(rdegree)
-                        else:
-                            self.image_rotated_box.rotation.value = 0
-
-                    except ValueError:
-                        pass
+                self.image_rotated_box.set_box(
+                    top_lx=img_xpos,
+                    top_ly=img_ypos,
+                    width=img_width,
+                    height=img_height,
+                    rotation=PageObject._rotation(img_rotation)
+                )
 
             if (visibleimage := xml.get("PICART")) is not None:
                 self.image_box.visible = xmlc.num_to_bool(visibleimage)
@@ -482,10 +498,10 @@ class PageObject(xmlc.PyScribusElement):
             # --- Page object outline ------------------------------------
 
             if (line_type := xml.get("PLINEART")) is not None:
-                for human, code in PageObject.line_type_xml.items():
-                    if line_type == code:
-                        self.outline["type"] = human
-                        break
+                codes = xmlc.reverse_xml(PageObject.line_type_xml)
+
+                if (human := codes.get(line_type)) is not None:
+                    self.outline["type"] = human
 
             if (fill := xml.get("PCOLOR")) is not None:
                 self.outline["fill"] = fill
@@ -505,16 +521,16 @@ class PageObject(xmlc.PyScribusElement):
                     pass
 
                 if (line_end := xml.get("PLINEEND")) is not None:
-                    for human, code in PageObject.line_endcap_xml.items():
-                        if line_end == code:
-                            self.outline["endcap"] = human
-                            break
+                    codes = xmlc.reverse_xml(PageObject.line_endcap_xml)
+
+                    if (human := codes.get(line_end)) is not None:
+                        self.outline["endcap"] = human
 
                 if (line_join := xml.get("PLINEJOIN")) is not None:
-                    for human, code in PageObject.line_join_xml.items():
-                        if line_join == code:
-                            self.outline["join"] = human
-                            break
+                    codes = xmlc.reverse_xml(PageObject.line_join_xml)
+
+                    if (human := codes.get(line_join)) is not None:
+                        self.outline["join"] = human
 
             # --- ICC profiles -------------------------------------------
 
@@ -645,7 +661,15 @@ class PageObject(xmlc.PyScribusElement):
         # ------------------------------------------------------------
 
         if self.ptype == "image":
-            xml.attrib["ImageData"] = self.data
+
+            if self.blob is None:
+                xml.attrib["ImageData"] = self.data
+            elif self.blob.store.streaming:
+                # Encoded data is written by BlobStore.write()
+                xml.attrib["ImageData"] = self.blob.placeholder()
+            else:
+                xml.attrib["ImageData"] = self.blob.encoded()
+
             xml.attrib["PFILE"] = self.filepath
             xml.attrib["inlineImageExt"] = self.data_type
 
@@ -673,6 +697,9 @@ class PageObject(xmlc.PyScribusElement):
             if self.embedded_icc["profile"]:
                 xml.attrib["EPROF"] = self.embedded_icc["profile"]
 
+        if self.ptype == "symbol" and self.pattern is not None:
+            xml.attrib["pattern"] = self.pattern
+
         # --- Previous / Next item -----------------------------------
 
         # NOTE @NEXTITEM must be the @ItemID of the next EXISTING item
@@ -698,10 +725,9 @@ class PageObject(xmlc.PyScribusElement):
             try:
                 xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                     xml, self.undocumented, True,
-                    self.ptype + " '{}'".format(self.name.strip()),
+                    self.ptype,
                     # FIXME This disable debug for path, copath attributes
                     # ["path", "copath"]
-                    logger=logs.getLogger()
                 )
 
             except AttributeError:
@@ -733,13 +759,19 @@ class PageObject(xmlc.PyScribusElement):
         """
         Returns an independant copy of the page object instance.
 
+        If the page object belongs to a document, the copy gets new
+        ItemIDs and is not linked to other text frames.
+
         Use kwargs to quick set this copy as you made it.
 
         :type kwargs: dict
         :param kwargs: Quick setting (same as __init__)
         """
 
-        duplicate = xmlc.PyScribusElement.copy(kwargs)
+        duplicate = self.clone()
+
+        if self.doc_parent:
+            self.doc_parent.renew_object_ids([duplicate])
 
         if kwargs:
             duplicate._quick_setup(kwargs)
@@ -1263,8 +1295,7 @@ class TableObject(PageObject):
             try:
                 xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                     xml, self.undocumented, True,
-                    self.ptype + " '{}'".format(self.name.strip()),
-                    logger=logs.getLogger()
+                    self.ptype
                 )
 
             except AttributeError:
@@ -1455,8 +1486,7 @@ class GroupObject(PageObject):
             try:
                 xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                     xml, self.undocumented, True,
-                    self.ptype + " '{}'".format(self.name.strip()),
-                    logger=logs.getLogger()
+                    self.ptype
                 )
 
             except AttributeError:
@@ -1706,10 +1736,10 @@ class TextObject(PageObject):
             # FLOP
 
             if (valign := xml.get("VAlign")) is not None:
-                for human, code in TextObject.vertical_alignment_xml.items():
-                    if valign == code:
-                        self.vertical_alignment = human
-                        break
+                codes = xmlc.reverse_xml(TextObject.vertical_alignment_xml)
+
+                if (human := codes.get(valign)) is not None:
+                    self.vertical_alignment = human
 
             if (autotext := xml.get("AUTOTEXT")) is not None:
                 self.is_autotext = xmlc.num_to_bool(autotext)
@@ -1728,10 +1758,10 @@ class TextObject(PageObject):
                 self.columns["gap"].value = float(columnsgap)
 
             if (alignment := xml.get("ALIGN")) is not None:
-                for human, code in xmlc.alignment.items():
-                    if alignment == code:
-                        self.alignment = human
-                        break
+                codes = xmlc.reverse_xml(xmlc.alignment)
+
+                if (human := codes.get(alignment)) is not None:
+                    self.alignment = human
 
             # --- Childs -------------------------------------------------
 
@@ -1806,8 +1836,7 @@ class TextObject(PageObject):
             try:
                 xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                     xml, self.undocumented, True,
-                    self.ptype + " '{}'".format(self.name.strip()),
-                    logger=logs.getLogger()
+                    self.ptype
                 )
 
             except AttributeError:
@@ -1866,8 +1895,13 @@ class ImageObject(PageObject):
     |            |                                 | base64 string |
     +------------+---------------------------------+---------------+
 
+    If the SLA parent has a blob store, incorporated image data is kept
+    in the store, as ``blob``, rather than in ``data``.
+
     :ivar string filepath: File path of the image
-    :ivar string data: Data if the incorporated image
+    :ivar string data: Data if the incorporated image, without blob store
+    :ivar pyscribus.blobs.Blob blob: Data of the incorporated image, in
+        the blob store of the SLA parent
     :ivar string data_type: Filetype of the incorporated image
     """
 
@@ -1877,6 +1911,7 @@ class ImageObject(PageObject):
         #--- Specific attributes to this subclass ------------------------
 
         self.data = "" # ImageData
+        self.blob = None
         self.data_type = ""
         self.filepath = "" # PFILE
 
@@ -1896,7 +1931,7 @@ class ImageObject(PageObject):
 
             if (idata := xml.get("ImageData")) is not None:
                 if idata:
-                    self.data = idata
+                    self.set_data(idata)
 
             if (idata_ext := xml.get("inlineImageExt")) is not None:
                 if idata_ext:
@@ -1930,7 +1965,41 @@ class ImageObject(PageObject):
                     self.filepath = setting_value
 
                 if setting_name == "filedata":
-                    self.data = setting_value
+                    self.set_data(setting_value)
+
+    def set_data(self, data: str):
+        """
+        Set the incorporated image data, in the blob store of the SLA
+        parent if there is one.
+
+        :type data: str
+        :param data: Qt compressed base64 data, as in ImageData
+        """
+
+        store = getattr(self.sla_parent, "blobs", None)
+
+        if data and store is not None:
+            self.blob = store.add(data)
+            self.data = ""
+        else:
+            self.blob = None
+            self.data = data
+
+    def image_data(self):
+        """
+        Returns the incorporated image data, decoded.
+
+        :rtype: bytes
+        :returns: Image file content, empty if no incorporated image
+        """
+
+        if self.blob is not None:
+            return self.blob.decode()
+
+        if self.data:
+            return zlib.decompress(base64.b64decode(self.data)[4:])
+
+        return b""
 
 
 class LineObject(PageObject):
@@ -2480,10 +2549,10 @@ class TableCell(xmlc.PyScribusElement):
 
             if (align := xml.get("TextVertAlign")) is not None:
 
-                for human,code in TableCell.vertical_align.items():
-                    if align == code:
-                        self.align = human
-                        break
+                codes = xmlc.reverse_xml(TableCell.vertical_align)
+
+                if (human := codes.get(align)) is not None:
+                    self.align = human
 
             if (fill_color := xml.get("FillColor")) is not None:
                 self.fill["color"] = fill_color
@@ -2964,6 +3033,9 @@ class RectPath:
     Into a list of :class:`PathPoint` instances.
     """
 
+    # Parsed path is never modified, copies can share it
+    clone_shared = ["svg_path"]
+
     def __init__(self):
         self.raw = None
         self.svg_path = None
@@ -3208,10 +3280,7 @@ def new_from_type(ptype: str, sla_parent=False, doc_parent=False, **kwargs):
             vtype = "render"
 
         else:
-            for human, xml in po_type_xml.items():
-                if str(xml) == ptype:
-                    vtype = human
-                    break
+            vtype = xmlc.reverse_xml(po_type_xml).get(ptype, False)
 
     # --- Creating the new page object ----------------------------------------
 
@@ -32,7 +32,6 @@ Classes for SLA Pages / Master pages.
 import lxml
 import lxml.etree as ET
 
-import pyscribus.logs as logs
 import pyscribus.exceptions as exceptions
 import pyscribus.dimensions as dimensions
 
@@ -331,10 +330,10 @@ class PageAbstract(PyScribusElement):
 
             if (orientation := xml.get("Orientation")) is not None:
 
-                for h,x in PageAbstract.orientation_xml.items():
-                    if orientation == x:
-                        self.orientation = h
-                        break
+                codes = reverse_xml(PageAbstract.orientation_xml)
+
+                if (h := codes.get(orientation)) is not None:
+                    self.orientation = h
 
             #--- Borders ------------------------------------------
 
@@ -383,9 +382,10 @@ class PageAbstract(PyScribusElement):
 
                 if ag_origin is not None:
 
-                    for human,code in PageAbstract.autoguides_origin_xml.items():
-                        if ag_origin == code:
-                            self.auto_guides[case[0]]["origin"] = human
+                    codes = reverse_xml(PageAbstract.autoguides_origin_xml)
+
+                    if (human := codes.get(ag_origin)) is not None:
+                        self.auto_guides[case[0]]["origin"] = human
 
             #--- PDF effects -------------------------------------------------
 
@@ -396,28 +396,28 @@ class PageAbstract(PyScribusElement):
                 self.effect["view-duration"].value = int(view_duration)
 
             if (effect_type := xml.get("effectType")) is not None:
-                for human, code in PageAbstract.effect_type_xml.items():
-                    if effect_type == code:
-                        self.effect["type"] = human
-                        break
+                codes = reverse_xml(PageAbstract.effect_type_xml)
+
+                if (human := codes.get(effect_type)) is not None:
+                    self.effect["type"] = human
 
             if (effect_lines := xml.get("Dm")) is not None:
-                for human, code in PageAbstract.effect_mobile_line_xml.items():
-                    if effect_lines == code:
-                        self.effect["mobile-lines"] = human
-                        break
+                codes = reverse_xml(PageAbstract.effect_mobile_line_xml)
+
+                if (human := codes.get(effect_lines)) is not None:
+                    self.effect["mobile-lines"] = human
 
             if (effect_source := xml.get("M")) is not None:
-                for human, code in PageAbstract.effect_source_xml.items():
-                    if effect_source == code:
-                        self.effect["source"] = human
-                        break
+                codes = reverse_xml(PageAbstract.effect_source_xml)
+
+                if (human := codes.get(effect_source)) is not None:
+                    self.effect["source"] = human
 
             if (effect_direction := xml.get("Di")) is not None:
-                for human, code in PageAbstract.effect_direction_xml.items():
-                    if effect_direction == code:
-                        self.effect["direction"] = human
-                        break
+                codes = reverse_xml(PageAbstract.effect_direction_xml)
+
+                if (human := codes.get(effect_direction)) is not None:
+                    self.effect["direction"] = human
 
             #--- FIXME This records undocumented attributes -------
 
@@ -535,8 +535,7 @@ class PageAbstract(PyScribusElement):
         try:
             # xml = undocumented_to_xml(xml, self.undocumented)
             xml, undoc_attribs = all_undocumented_to_xml(
-                xml, self.undocumented, True, tag,
-                logger=logs.getLogger()
+                xml, self.undocumented, True, tag
             )
 
         except AttributeError:
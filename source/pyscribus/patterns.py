@@ -90,7 +90,7 @@ class Pattern(PyScribusElement):
                 if (att := xml.get(dim)) is not None:
                     self.dims[dim] = dimensions.Dim(float(att))
 
-            for scale in ["x", "x"]:
+            for scale in ["x", "y"]:
                 att_name = "scale{}".format(scale.upper())
 
                 if (att := xml.get(att_name)) is not None:
@@ -176,7 +176,7 @@ class PatternItem(pageobjects.PageObject):
         """
         """
 
-        xml = pageobjects.PageObject.toxml(arbitrary_tag="PatternItem")
+        xml = pageobjects.PageObject.toxml(self, arbitrary_tag="PatternItem")
 
         return xml
 
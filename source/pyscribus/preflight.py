@@ -0,0 +1,801 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Preflight verifier, without Scribus.
+
+Runs the checks enabled in a preflight profile (document.Profile) over
+a document. Checks share the index of page objects and the results of
+the images and fonts readings, and run concurrently.
+
+:Example:
+
+.. code:: python
+
+   verifier = preflight.Preflight(slafile.document, "PDF/X-4")
+
+   for issue in verifier.run():
+       print(issue["check"], issue["item"], issue["message"])
+
+   # Many documents, in worker processes
+
+   for filepath, report in preflight.preflight_files(filepaths):
+       if report["count"]:
+           print(filepath, report["count"])
+
+"""
+
+# Imports ===============================================================#
+
+import os
+import threading
+import concurrent.futures
+
+import pyscribus.sla as sla
+import pyscribus.fonts as fonts
+import pyscribus.images as images
+import pyscribus.stories as stories
+import pyscribus.overflow as overflow
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Profile check name -> Preflight method
+checks = {
+    "Glyphs": "_glyphs",
+    "Orphans": "_orphans",
+    "Overflow": "_overflow",
+    "Pictures": "_pictures",
+    "PartFilledImageFrames": "_part_filled_image_frames",
+    "Resolution": "_resolution",
+    "Transparency": "_transparency",
+    "Annotations": "_annotations",
+    "RasterPDF": "_raster_pdf",
+    "ForGIF": "_for_gif",
+    "NotCMYKOrSpot": "_not_cmyk_or_spot",
+    "FontIsOpenType": "_font_is_opentype",
+    "AppliedMasterDifferentSide": "_applied_master_different_side",
+    "EmptyTextFrames": "_empty_text_frames",
+}
+
+# Image files rasterized by Scribus on PDF export
+raster_pdf_extensions = [".pdf", ".eps", ".epsi", ".ps", ".ai"]
+
+# Master page LEFT attribute by page location in its page set
+master_sides = {"left": "1", "right": "0", "middle": "2"}
+
+# Tolerance of PartFilledImageFrames, in points
+PART_FILLED_TOLERANCE = 0.5
+
+# Classes ===============================================================#
+
+class Preflight:
+    """
+    Preflight verifier of a document.
+
+    Issues are dicts:
+
+    +---------+----------------------------------------------------------+
+    | Key     | Value                                                    |
+    +=========+==========================================================+
+    | check   | Name of the check (see document.Profile.checks)          |
+    +---------+----------------------------------------------------------+
+    | object  | Page object, page, color or font name concerned          |
+    +---------+----------------------------------------------------------+
+    | item    | ItemID of the page object, page number, color or font    |
+    |         | name                                                     |
+    +---------+----------------------------------------------------------+
+    | page    | Page number (from 1), or None                            |
+    +---------+----------------------------------------------------------+
+    | message | Description of the issue                                 |
+    +---------+----------------------------------------------------------+
+
+    .. note:: FontNotEmbedded and DeviceColorsAndOutputIntent depend on
+        the PDF export and are not checked: they are listed as skipped.
+
+    :type document: pyscribus.document.Document
+    :param document: Document
+    :type profile: pyscribus.document.Profile, str
+    :param profile: Profile, or name of a profile of the document. If
+        None, first profile of the document.
+    :type library: pyscribus.fonts.FontLibrary
+    :param library: Fonts, for Glyphs, Overflow and FontIsOpenType
+        checks. If None, a FontLibrary of the default font directories,
+        created on first use.
+    :type workers: int
+    :param workers: Threads running the checks. If None, default of
+        concurrent.futures.ThreadPoolExecutor.
+    :raises ValueError: If the profile is not found
+
+    :ivar list enabled: Names of the checks enabled in the profile
+    :ivar list skipped: Names of the enabled checks that can't be run
+        without Scribus
+    """
+
+    def __init__(self, document, profile=None, library=None, workers=None):
+        self.document = document
+        self.library = library
+        self.workers = workers
+
+        if isinstance(profile, str):
+            named = {p.name: p for p in document.profiles}
+
+            if (profile := named.get(profile)) is None:
+                raise ValueError("Unknown preflight profile.")
+
+        elif profile is None:
+            if not document.profiles:
+                raise ValueError("The document has no preflight profile.")
+
+            profile = document.profiles[0]
+
+        self.profile = profile
+
+        self.enabled = []
+        self.skipped = []
+
+        for check, enabled in profile.checks.items():
+            if check == "auto" or not enabled:
+                continue
+
+            if check in checks:
+                self.enabled.append(check)
+            else:
+                self.skipped.append(check)
+
+        # Shared readings, see _shared()
+        self._readings = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _shared(self, key: str, reader):
+        """
+        Returns a reading shared by the checks, computed once by the first
+        check needing it.
+        """
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if key not in self._readings:
+                self._readings[key] = reader()
+
+        return self._readings[key]
+
+    # --- Issues ---------------------------------------------------------
+
+    @staticmethod
+    def _issue(check: str, sla_object, message: str, page=None):
+        item = getattr(sla_object, "object_id", None)
+
+        if item is None:
+            item = getattr(sla_object, "number", None)
+
+        if item is None:
+            item = getattr(sla_object, "name", sla_object)
+
+        return {
+            "check": check,
+            "object": sla_object,
+            "item": item,
+            "page": page,
+            "message": message,
+        }
+
+    @staticmethod
+    def _page(page_object):
+        if page_object.on_master_page:
+            return None
+
+        return int(page_object.own_page or 0) + 1
+
+    # --- Shared readings ------------------------------------------------
+
+    def _page_objects(self, ptype=None):
+        """
+        Returns the page objects to check, without those on hidden or non
+        printable layers if the profile ignores them.
+        """
+
+        def read():
+            if not self.profile.ignores["OffLayers"]:
+                return self.document.query()
+
+            layers = {
+                layer.number: layer.visible and layer.printable
+                for layer in self.document.layers
+            }
+
+            return [
+                po for po in self.document.query()
+                if layers.get(int(po.layer), True)
+            ]
+
+        page_objects = self._shared("page_objects", read)
+
+        if ptype is None:
+            return page_objects
+
+        return [po for po in page_objects if po.ptype == ptype]
+
+    def _images(self):
+        def read():
+            checked = {id(po) for po in self._page_objects("image")}
+
+            return [
+                result for result in images.preflight(
+                    self.document, self.profile
+                )
+                if id(result["frame"]) in checked
+            ]
+
+        return self._shared("images", read)
+
+    def _fonts(self):
+        def read():
+            if self.library is None:
+                self.library = fonts.FontLibrary()
+
+            return self.library
+
+        return self._shared("library", read)
+
+    def _estimator(self):
+        return self._shared(
+            "estimator",
+            lambda: overflow.OverflowEstimator(self.document, self._fonts())
+        )
+
+    def _fonts_uses(self):
+        """
+        Returns the fonts used by text frames, as a dict with font names as
+        keys and lists of (frame, text) as values.
+        """
+
+        def read():
+            estimator = self._estimator()
+            uses = {}
+
+            for frame in self._page_objects("text"):
+                for story in getattr(frame, "stories", []):
+                    for style_name, runs in estimator.paragraphs(story):
+                        style = estimator.style(style_name)
+
+                        for run in runs:
+                            if run is None:
+                                continue
+
+                            font = run[1] or style["font"]
+                            uses.setdefault(font, []).append((frame, run[0]))
+
+            return uses
+
+        return self._shared("fonts_uses", read)
+
+    # --- Checks ---------------------------------------------------------
+
+    def _glyphs(self):
+        issues = []
+        library = self._fonts()
+
+        for font, uses in self._fonts_uses().items():
+            metrics = library.metrics(font)
+
+            # Frame -> missing characters
+            frames = {}
+
+            for frame, text in uses:
+                missing = frames.setdefault(id(frame), (frame, set()))[1]
+
+                if metrics is None:
+                    continue
+
+                missing.update(
+                    char for char in text
+                    if not char.isspace() and ord(char) not in metrics.advances
+                )
+
+            for frame, missing in frames.values():
+                if metrics is None:
+                    message = "Font {} not found.".format(font)
+                elif missing:
+                    message = "Font {} has no glyph for {}.".format(
+                        font, "".join(sorted(missing))
+                    )
+                else:
+                    continue
+
+                issues.append(
+                    Preflight._issue(
+                        "Glyphs", frame, message, Preflight._page(frame)
+                    )
+                )
+
+        return issues
+
+    def _orphans(self):
+        issues = []
+
+        for po in self._page_objects():
+            if po.on_master_page:
+                continue
+
+            if po.own_page is not False and int(po.own_page) < 0:
+                issues.append(
+                    Preflight._issue(
+                        "Orphans", po, "Object is not on a page."
+                    )
+                )
+
+        return issues
+
+    def _overflow(self):
+        issues = []
+        estimator = self._estimator()
+        checked = {id(po) for po in self._page_objects("text")}
+
+        for frame in estimator.overflowing():
+            if id(frame) not in checked:
+                continue
+
+            estimation = estimator.estimate(frame)
+
+            issues.append(
+                Preflight._issue(
+                    "Overflow", frame,
+                    "Text overflows its frame ({} lines).".format(
+                        estimation["missing_lines"]
+                    ),
+                    Preflight._page(frame)
+                )
+            )
+
+        return issues
+
+    def _pictures(self):
+        issues = []
+
+        for result in self._images():
+            if result["status"] not in ["missing", "unknown"]:
+                continue
+
+            if result["status"] == "missing":
+                message = "Image file {} not found.".format(result["path"])
+            else:
+                message = "Unknown image format."
+
+            issues.append(
+                Preflight._issue(
+                    "Pictures", result["frame"], message,
+                    Preflight._page(result["frame"])
+                )
+            )
+
+        return issues
+
+    def _part_filled_image_frames(self):
+        issues = []
+
+        for result in self._images():
+            frame = result["frame"]
+
+            if result["pixels"] is None or frame.image_scale["type"] == "frame":
+                continue
+
+            placed = [
+                result["pixels"][0] * float(frame.image_scale["horizontal"].value),
+                result["pixels"][1] * float(frame.image_scale["vertical"].value),
+            ]
+
+            for size, dim in zip(placed, ["width", "height"]):
+                frame_size = float(frame.box.dims[dim].value)
+
+                if size + PART_FILLED_TOLERANCE < frame_size:
+                    issues.append(
+                        Preflight._issue(
+                            "PartFilledImageFrames", frame,
+                            "Image doesn't fill its frame.",
+                            Preflight._page(frame)
+                        )
+                    )
+                    break
+
+        return issues
+
+    def _resolution(self):
+        issues = []
+
+        for result in self._images():
+            if result["status"] not in ["low", "high"]:
+                continue
+
+            issues.append(
+                Preflight._issue(
+                    "Resolution", result["frame"],
+                    "Image resolution is too {} ({:.0f} DPI).".format(
+                        result["status"],
+                        min(result["dpi"]) if result["status"] == "low"
+                        else max(result["dpi"])
+                    ),
+                    Preflight._page(result["frame"])
+                )
+            )
+
+        return issues
+
+    def _transparency(self):
+        issues = []
+
+        for layer in self.document.layers:
+            if float(layer.opacity.value) < 1 or layer.blend != "normal":
+                issues.append(
+                    Preflight._issue(
+                        "Transparency", layer, "Layer uses transparency."
+                    )
+                )
+
+        for po in self._page_objects():
+            undocumented = getattr(po, "undocumented", {}) or {}
+
+            transparent = any(
+                float(undocumented.get(att, 0) or 0)
+                for att in ["TransValue", "TransValueS"]
+            )
+
+            blended = any(
+                undocumented.get(att, "0") not in ["", "0"]
+                for att in ["TransBlend", "TransBlendS"]
+            )
+
+            if transparent or blended:
+                issues.append(
+                    Preflight._issue(
+                        "Transparency", po, "Object uses transparency.",
+                        Preflight._page(po)
+                    )
+                )
+
+        return issues
+
+    def _annotations(self):
+        issues = []
+
+        for po in self._page_objects():
+            undocumented = getattr(po, "undocumented", {}) or {}
+
+            if undocumented.get("ANNOTATION", "0") == "1":
+                issues.append(
+                    Preflight._issue(
+                        "Annotations", po, "Object is a PDF annotation.",
+                        Preflight._page(po)
+                    )
+                )
+
+        return issues
+
+    def _raster_pdf(self):
+        issues = []
+
+        for frame in self._page_objects("image"):
+            if not frame.filepath or frame.blob is not None:
+                continue
+
+            extension = os.path.splitext(frame.filepath)[1].lower()
+
+            if extension in raster_pdf_extensions:
+                issues.append(
+                    Preflight._issue(
+                        "RasterPDF", frame,
+                        "Image {} will be rasterized.".format(frame.filepath),
+                        Preflight._page(frame)
+                    )
+                )
+
+        return issues
+
+    def _for_gif(self):
+        issues = []
+
+        for frame in self._page_objects("image"):
+            if frame.filepath and frame.filepath.lower().endswith(".gif"):
+                issues.append(
+                    Preflight._issue(
+                        "ForGIF", frame, "Image is a GIF.",
+                        Preflight._page(frame)
+                    )
+                )
+
+        return issues
+
+    def _not_cmyk_or_spot(self):
+        issues = []
+        colors = {color.name: color for color in self.document.colors}
+
+        # --- Colors used ------------------------------------------------
+
+        used = {}
+
+        def use(name, sla_object, page=None):
+            if name and name != "None" and name not in used:
+                used[name] = (sla_object, page)
+
+        for po in self._page_objects():
+            page = Preflight._page(po)
+
+            use(po.outline["fill"], po, page)
+            use(po.outline["stroke"], po, page)
+
+            if (fill := getattr(po, "fill", None)) is not None:
+                use(fill["color"], po, page)
+
+            for story in getattr(po, "stories", []):
+                for element in story.sequence:
+                    if isinstance(element, stories.StoryFragment):
+                        use(element.font["color"], po, page)
+
+        for style_type in self.document.styles.values():
+            for style in style_type:
+                if (font := getattr(style, "font", None)) is not None:
+                    use(font.get("color"), style)
+
+                if (fill := getattr(style, "fill", None)) is not None:
+                    use(fill.get("color"), style)
+
+        # --- RGB colors -------------------------------------------------
+
+        for name, (sla_object, page) in used.items():
+            if (color := colors.get(name)) is None:
+                continue
+
+            if color.is_rvb:
+                issues.append(
+                    Preflight._issue(
+                        "NotCMYKOrSpot", color,
+                        "Color {} is not CMYK.".format(name), page
+                    )
+                )
+
+        return issues
+
+    def _font_is_opentype(self):
+        issues = []
+        library = self._fonts()
+
+        for font, uses in self._fonts_uses().items():
+            if (found := library.fonts.get(str(font).lower())) is None:
+                continue
+
+            if os.path.splitext(found[0])[1].lower() in [".otf", ".otc"]:
+                issues.append(
+                    Preflight._issue(
+                        "FontIsOpenType", font,
+                        "Font {} is an OpenType font.".format(font),
+                        Preflight._page(uses[0][0])
+                    )
+                )
+
+        return issues
+
+    def _applied_master_different_side(self):
+        issues = []
+        document = self.document
+
+        if not document.page_sets:
+            return issues
+
+        page_set = document.page_sets[
+            min(int(document.page_set), len(document.page_sets) - 1)
+        ]
+
+        columns = int(page_set.columns or 1)
+
+        if columns < 2:
+            return issues
+
+        masters = {mp.name: mp for mp in document.master_pages}
+
+        for index, page in enumerate(document.pages):
+            if (master := masters.get(page.master_name)) is None:
+                continue
+
+            undocumented = getattr(master, "undocumented", {}) or {}
+
+            if (left := undocumented.get("LEFT")) is None:
+                continue
+
+            position = (index + int(page_set.first_page or 0)) % columns
+
+            if position == 0:
+                side = "left"
+            elif position == columns - 1:
+                side = "right"
+            else:
+                side = "middle"
+
+            if left != master_sides[side]:
+                issues.append(
+                    Preflight._issue(
+                        "AppliedMasterDifferentSide", page,
+                        "Master page {} is not a {} page.".format(
+                            master.name, side
+                        ),
+                        index + 1
+                    )
+                )
+
+        return issues
+
+    def _empty_text_frames(self):
+        issues = []
+        items = self.document.items_index()
+
+        for frame in self._page_objects("text"):
+
+            # Frames continuing a story have no story of their own
+            if frame.linked["previous"] is not None:
+                if frame.linked["previous"] in items:
+                    continue
+
+            empty = True
+
+            for story in getattr(frame, "stories", []):
+                for element in story.sequence:
+                    if isinstance(element, stories.StoryFragment):
+                        if element.text.strip():
+                            empty = False
+                            break
+
+                if not empty:
+                    break
+
+            if empty:
+                issues.append(
+                    Preflight._issue(
+                        "EmptyTextFrames", frame, "Text frame is empty.",
+                        Preflight._page(frame)
+                    )
+                )
+
+        return issues
+
+    # --- Run ------------------------------------------------------------
+
+    def run(self):
+        """
+        Run the enabled checks concurrently, and yield their issues as
+        soon as each check ends.
+
+        :rtype: generator
+        :returns: Issues dicts
+        """
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            futures = [
+                pool.submit(getattr(self, checks[check]))
+                for check in self.enabled
+            ]
+
+            for future in concurrent.futures.as_completed(futures):
+                for issue in future.result():
+                    yield issue
+
+    def report(self):
+        """
+        Run the enabled checks and returns their issues by check.
+
+        :rtype: dict
+        :returns: Report
+
+        +----------+--------------------------------------------------------+
+        | Key      | Value                                                  |
+        +==========+========================================================+
+        | profile  | Name of the profile                                    |
+        +----------+--------------------------------------------------------+
+        | issues   | Dict with check names as keys, lists of issues as      |
+        |          | values. Every enabled check is a key.                  |
+        +----------+--------------------------------------------------------+
+        | count    | Count of issues                                        |
+        +----------+--------------------------------------------------------+
+        | skipped  | Names of enabled checks that were not run              |
+        +----------+--------------------------------------------------------+
+        | errors   | True if issues must block the export (the profile      |
+        |          | doesn't ignore errors)                                 |
+        +----------+--------------------------------------------------------+
+        """
+
+        issues = {check: [] for check in self.enabled}
+        count = 0
+
+        for issue in self.run():
+            issues[issue["check"]].append(issue)
+            count += 1
+
+        return {
+            "profile": self.profile.name,
+            "issues": issues,
+            "count": count,
+            "skipped": list(self.skipped),
+            "errors": bool(count) and not self.profile.ignores["Errors"],
+        }
+
+# Fonctions =============================================================#
+
+def _preflight_file(filepath: str, profile=None):
+    """
+    Returns the preflight report of a SLA file, without the objects
+    of the issues, so that it can be sent back by worker processes.
+    """
+
+    slafile = sla.SLA(filepath)
+
+    report = Preflight(slafile.document, profile, workers=1).report()
+
+    for issues in report["issues"].values():
+        for issue in issues:
+            issue["object"] = None
+
+            if not isinstance(issue["item"], (str, int)):
+                issue["item"] = str(issue["item"])
+
+    return report
+
+def preflight_files(filepaths: list, profile=None, workers=None):
+    """
+    Preflight several SLA files in worker processes, yielding their
+    reports as soon as they are done.
+
+    In the reports, the "object" of the issues is None.
+
+    :type filepaths: list
+    :param filepaths: SLA files paths
+    :type profile: str
+    :param profile: Name of the profile of the documents. If None, first
+        profile of each document.
+    :type workers: int
+    :param workers: Number of worker processes. CPU count if None, no
+        pool if 1.
+    :rtype: generator
+    :returns: (file path, report) tuples. The report is the exception
+        raised if the file can't be checked.
+    """
+
+    if workers == 1:
+        for filepath in filepaths:
+            try:
+                yield filepath, _preflight_file(filepath, profile)
+            except Exception as error:
+                yield filepath, error
+
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(_preflight_file, filepath, profile): filepath
+            for filepath in filepaths
+        }
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as error:
+                yield futures[future], error
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
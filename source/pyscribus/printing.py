@@ -408,10 +408,8 @@ class LPI(PyScribusElement):
 
             if (spot := xml.get("SpotFunction")) is not None:
 
-                for human,code in LPI.spot_xml.items():
-                    if code == spot:
-                        self.spot = human
-                        break
+                if (human := reverse_xml(LPI.spot_xml).get(spot)) is not None:
+                    self.spot = human
 
             return True
         else:
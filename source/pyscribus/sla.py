@@ -23,13 +23,17 @@ SLA file.
 
 # Imports ===============================================================#
 
+import os
 import re
 
 import lxml
 import lxml.etree as ET
 
 import pyscribus.common.xml as xmlc
+import pyscribus.common.compress as compress
 
+import pyscribus.logs as logs
+import pyscribus.blobs as blobs
 import pyscribus.exceptions as exceptions
 import pyscribus.dimensions as dimensions
 import pyscribus.document as document
@@ -67,6 +71,25 @@ class SLA(xmlc.PyScribusElement):
     |                       | templated elements        |               |
     |                       | (ex: %TITLE%)             |               |
     +-----------------------+---------------------------+---------------+
+    | mapImages             | Keep only offsets of      | False         |
+    |                       | embedded images data in   |               |
+    |                       | the memory-mapped SLA     |               |
+    |                       | file                      |               |
+    +-----------------------+---------------------------+---------------+
+    | compression           | Compression of the SLA    | "auto"        |
+    |                       | file: "gzip", "xz",       |               |
+    |                       | "zstd", False, or "auto"  |               |
+    |                       | to guess it               |               |
+    +-----------------------+---------------------------+---------------+
+    | cancelled             | threading.Event stopping  | None          |
+    |                       | the parsing once set      |               |
+    |                       | (raises                   |               |
+    |                       | exceptions.Cancelled)     |               |
+    +-----------------------+---------------------------+---------------+
+
+    :ivar pyscribus.blobs.BlobStore blobs: Embedded images data of image
+        frames
+    :ivar string filepath: Path of the parsed SLA file, if any
     """
 
     def __init__(self, filepath="", version="", **kwargs):
@@ -76,6 +99,12 @@ class SLA(xmlc.PyScribusElement):
             self.version = version.split(".")
 
         self.document = None
+        self.filepath = ""
+
+        # Undocumented attributes of the last export, see toxml()
+        self.undocumented_report = None
+
+        self.blobs = blobs.BlobStore()
 
         self.templating = {
             "active": False,
@@ -154,34 +183,133 @@ class SLA(xmlc.PyScribusElement):
             else:
                 return self.document.append(sla_object)
 
-    def save(self, filepath: str):
+    def save(self, filepath: str, compression="auto", level=None,
+             cancelled=None):
         """
         Save SLA file.
 
+        The file is compressed as it is written if compression is set, or
+        if the file path ends with .gz, .xz or .zst.
+
+        If cancelled is set, the file is written as filepath + ".part",
+        and moved to filepath once complete, so that a cancelled saving
+        doesn't leave a truncated file.
+
         :type filepath: str
         :param filepath: SLA file path
+        :type compression: str, bool
+        :param compression: "gzip", "xz", "zstd", False for no compression,
+            "auto" to guess it from the file extension.
+        :type level: int
+        :param level: Compression level. Lower is faster, higher is
+            smaller. Default level of the compression format if None.
+        :type cancelled: threading.Event
+        :param cancelled: Event stopping the saving once set
         :rtype: boolean
         :returns: True if successfull
+        :raises pyscribus.exceptions.Cancelled: If cancelled is set before
+            the file is complete
+
+        .. seealso:: :func:`pyscribus.common.compress.open_file`,
+            :func:`pyscribus.aio.save`
         """
 
-        xml = self.toxml()
+        # Embedded images data is written from the blob store, not
+        # copied in the XML tree
+        self.blobs.streaming = True
+
+        try:
+            with xmlc.cancellable(cancelled):
+                xml = self.toxml()
+        finally:
+            self.blobs.streaming = False
+
+        # Overwriting the memory-mapped file would corrupt the blobs
+        if self.blobs.filepath == os.path.realpath(filepath):
+            self.blobs.detach()
+
+        if cancelled is None:
+            self._write(filepath, xml, compression, level)
+            return True
+
+        if cancelled.is_set():
+            raise exceptions.Cancelled()
 
-        xml_string = '<?xml version="1.0" encoding="UTF-8"?>' + "\n"
-        xml_string += str(
-            ET.tostring(
-                xml,
-                encoding="unicode",
-                pretty_print=True
+        # The compression is guessed from the final file path
+        if compression == "auto":
+            compression = compress.from_path(filepath)
+
+        partial = filepath + ".part"
+
+        try:
+            self._write(partial, xml, compression, level, cancelled)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+            raise
+
+        os.replace(partial, filepath)
+
+        return True
+
+    def _write(self, filepath: str, xml, compression, level, cancelled=None):
+        with compress.open_file(filepath, "wb", compression, level) as slaf:
+            stream = slaf
+
+            if cancelled is not None:
+                stream = compress.CancellableStream(slaf, cancelled)
+
+            writer = self.blobs.writer(stream)
+
+            writer.write(b'<?xml version="1.0" encoding="UTF-8"?>' + b"\n")
+
+            ET.ElementTree(xml).write(
+                writer, encoding="UTF-8", pretty_print=True
             )
-        )
 
-        with open(filepath, "w", encoding="utf8") as slaf:
-            slaf.write(xml_string)
+            writer.flush()
+
+    async def save_async(self, filepath: str, compression="auto",
+                         level=None):
+        """
+        Save SLA file without blocking the event loop.
+
+        Serialization and writing are done by the default job runner of
+        :mod:`pyscribus.aio`.
+
+        :Example:
+
+        .. code:: python
+
+           await slafile.save_async("output.sla.gz")
+
+        :type filepath: str
+        :param filepath: SLA file path
+        :type compression: str, bool
+        :param compression: See save()
+        :type level: int
+        :param level: See save()
+        :rtype: boolean
+        :returns: True if successfull
+
+        .. seealso:: :func:`pyscribus.aio.save`
+        """
+
+        # Imported here as pyscribus.aio imports this module
+        import pyscribus.aio as aio
+
+        return await aio.save(self, filepath, compression, level)
 
     def toxml(self, optional: bool = True):
         """
         Return SLA as lxml.etree._Element
 
+        Undocumented attributes exported are counted by kind of element
+        in ``undocumented_report`` (a
+        :class:`pyscribus.common.xml.UndocumentedCollector`), and logged
+        once if logging is enabled.
+
         :type optional: bool
         :param optional: Includes optional attributes (True by default)
         :returns: xml
@@ -197,7 +325,17 @@ class SLA(xmlc.PyScribusElement):
                 "SLA file has no SCRIBUSUTF8NEW/DOCUMENT"
             )
         else:
-            dx = self.document.toxml(optional)
+            # If a collector is already active, its owner reports
+            reporting = xmlc.UNDOCUMENTED_COLLECTOR.get() is None
+
+            with xmlc.undocumented_collector() as collector:
+                dx = self.document.toxml(optional)
+
+            self.undocumented_report = collector
+
+            if reporting and (logger := logs.getLogger()):
+                collector.log(logger)
+
             xml.append(dx)
 
         return xml
@@ -249,16 +387,48 @@ class SLA(xmlc.PyScribusElement):
         """
         Import SLA data from a file path.
 
+        Compressed files (.sla.gz, .sla.xz, .sla.zst) are decompressed as
+        they are parsed.
+
         :type filepath: str
         :param filepath: SLA file path
         :type kwargs: dict
-        :param kwargs: kwargs
+        :param kwargs: kwargs (see SLA kwargs table)
         :returns: True if successfull parsing
         :rtype: boolean
+        :raises pyscribus.exceptions.Cancelled: If kwargs["cancelled"] is
+            set while parsing
         """
 
-        xml = ET.parse(filepath).getroot()
-        success = self.fromxml(xml)
+        sla_compression = kwargs.get("compression", "auto")
+
+        if sla_compression == "auto":
+            sla_compression = compress.from_path(filepath)
+
+            if not sla_compression:
+                sla_compression = compress.from_content(filepath)
+
+        # NOTE Offsets of embedded images data are only usable in
+        # uncompressed files
+        if kwargs.get("mapImages", False) and not sla_compression:
+            self.blobs.map(filepath)
+
+        cancelled = kwargs.get("cancelled", None)
+
+        with compress.open_file(filepath, "rb", sla_compression) as slaf:
+            if cancelled is None:
+                xml = ET.parse(slaf).getroot()
+            else:
+                stream = compress.CancellableStream(slaf, cancelled)
+                xml = ET.parse(stream).getroot()
+
+        if cancelled is not None and cancelled.is_set():
+            raise exceptions.Cancelled()
+
+        self.filepath = os.path.realpath(filepath)
+
+        with xmlc.cancellable(cancelled):
+            success = self.fromxml(xml)
 
         return success
 
@@ -0,0 +1,506 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Split of a document into several SLA files, by page ranges or sections.
+
+The source SLA is parsed once. Each part only keeps its pages, the page
+objects on these pages (by OwnPage), and the styles, colors, patterns,
+master pages and marks they reference.
+
+Parts are written by a pool of worker processes (forked, so the source
+document is not serialized for each worker), or of threads if forking is
+not available.
+
+.. code:: python
+
+   import pyscribus.sla as sla
+   import pyscribus.split as split
+
+   book = sla.SLA("book.sla", "1.5.5")
+
+   # One file per section
+   split.split(book, "chapter-{index:02d}.sla")
+
+   # Explicit page ranges, first and last pages included
+   split.split(book, "part-{index}.sla", [(1, 20), (21, 64)])
+"""
+
+# Imports ===============================================================#
+
+import copy
+import multiprocessing
+import concurrent.futures
+
+import pyscribus.sla as sla
+import pyscribus.marks as marks
+import pyscribus.styles as pstyles
+import pyscribus.pageobjects as pageobjects
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Colors kept in all parts, as Scribus expects them
+kept_colors = ["Black", "White", "Registration", "None"]
+
+# Splitter used by worker processes, see _write_part()
+_SPLITTER = None
+
+# Classes ===============================================================#
+
+class Splitter:
+    """
+    Split a SLA into several SLA, by page ranges.
+
+    The source SLA is not modified: parts are made of copies of its pages
+    and page objects. Page objects out of pages (on the pasteboard) are
+    not kept.
+
+    :type slafile: pyscribus.sla.SLA
+    :param slafile: SLA to split
+    """
+
+    def __init__(self, slafile):
+        self.slafile = slafile
+        self.document = slafile.document
+
+        # Pages sorted by page number, as page ranges are about page
+        # numbers
+        self.pages = sorted(self.document.pages, key=lambda p: p.number)
+
+        # Page objects by page index (from 0)
+        self.page_objects = {}
+
+        for po in self.document.page_objects:
+            own_page = po.own_page
+
+            if own_page is False:
+                own_page = 0
+
+            if po.on_master_page or not isinstance(own_page, int):
+                continue
+
+            if own_page >= 0:
+                self.page_objects.setdefault(own_page, []).append(po)
+
+    def section_ranges(self):
+        """
+        Returns the page ranges of the sections of the document.
+
+        :rtype: list
+        :returns: List of (first page, last page, section name) tuples
+        """
+
+        ranges = []
+
+        for section in self.document.sections:
+            first = max(1, section.range["from"])
+            last = max(first, section.range["to"])
+
+            ranges.append((first, last, section.name))
+
+        return ranges
+
+    # --- Parts ----------------------------------------------------------
+
+    def part(self, first: int, last: int):
+        """
+        Returns a new SLA with pages from first to last (included).
+
+        :type first: int
+        :param first: First page (from 1)
+        :type last: int
+        :param last: Last page (from 1)
+        :rtype: pyscribus.sla.SLA
+        """
+
+        source = self.document
+
+        part_sla = sla.SLA(version=".".join(self.slafile.version))
+        part_sla.templating = self.slafile.templating
+        part_sla.blobs = self.slafile.blobs
+
+        part_doc = copy.copy(source)
+        part_doc.sla_parent = part_sla
+        part_doc.clear_index()
+        part_sla.document = part_doc
+
+        # Copies refer to the part SLA and document instead of the source
+        # ones, which are not copied.
+        memo = {id(self.slafile): part_sla, id(source): part_doc}
+
+        # --- Pages and page objects ---------------------------------
+
+        selected = self.pages[first - 1:last]
+
+        objects = []
+
+        for index in range(first - 1, first - 1 + len(selected)):
+            objects.extend(self.page_objects.get(index, []))
+
+        part_doc.pages = copy.deepcopy(selected, memo)
+        part_doc.page_objects = copy.deepcopy(objects, memo)
+        part_doc.page_number = len(part_doc.pages)
+
+        # Pages are moved at the position of the first page of the source
+        # document, so is the content of the pages.
+
+        shift = 0
+
+        if selected:
+            shift = float(self.pages[0].box.gety("top-left")) - float(
+                selected[0].box.gety("top-left")
+            )
+
+        for number, page in enumerate(part_doc.pages, start=1):
+            page.number = number
+
+            if shift:
+                page.box.translate(0, shift)
+
+        ids = set()
+
+        for po in part_doc.page_objects:
+            own_page = (po.own_page or 0) - (first - 1)
+            po.own_page = own_page if own_page else False
+
+            Splitter._shift(po, shift, ids)
+
+        for po in part_doc.page_objects:
+            Splitter._unlink(po, ids)
+
+        # --- Resources ----------------------------------------------
+
+        refs = self._references(part_doc.page_objects)
+
+        part_doc.master_pages = [
+            mp for mp in source.master_pages
+            if mp.name in {page.master_name for page in part_doc.pages}
+        ]
+
+        part_doc.patterns = [
+            pattern for pattern in source.patterns
+            if pattern.name in refs["pattern"]
+        ]
+
+        paragraph_styles = Splitter._used_styles(
+            source.styles["paragraph"], refs["paragraph"]
+        )
+
+        for style in paragraph_styles:
+            refs["character"].add(style.character_parent)
+
+        part_doc.styles = {
+            "note": source.styles["note"],
+            "paragraph": paragraph_styles,
+            "character": Splitter._used_styles(
+                source.styles["character"], refs["character"]
+            ),
+            "table": Splitter._used_styles(
+                source.styles["table"], refs["table"]
+            ),
+            "cell": Splitter._used_styles(
+                source.styles["cell"], refs["cell"]
+            ),
+        }
+
+        for style_type in ["paragraph", "character", "table", "cell"]:
+            for style in part_doc.styles[style_type]:
+                Splitter._style_colors(style, refs["color"])
+
+        for gradient in source.gradients:
+            for stop in gradient.stops:
+                refs["color"].add(stop.color)
+
+        part_doc.colors = [
+            color for color in source.colors
+            if color.name in refs["color"] or color.name in kept_colors
+        ]
+
+        part_doc.marks = [
+            mark for mark in source.marks
+            if Splitter._used_mark(mark, refs["mark"], ids)
+        ]
+
+        # --- Sections -----------------------------------------------
+
+        part_doc.sections = []
+
+        for section in source.sections:
+            start = max(section.range["from"], first)
+            end = min(section.range["to"], last)
+
+            if start > end:
+                continue
+
+            part_section = copy.deepcopy(section)
+            part_section.range = {
+                "from": start - first + 1, "to": end - first + 1
+            }
+            part_section.numerotation["start"] += start - section.range["from"]
+
+            part_doc.sections.append(part_section)
+
+        return part_sla
+
+    @staticmethod
+    def _shift(po, shift: float, ids: set):
+        ids.add(po.object_id)
+
+        if shift:
+            for box in [po.box, po.rotated_box, po.gbox]:
+                box.translate(0, shift)
+
+        if isinstance(po, pageobjects.GroupObject):
+            if shift:
+                po.group_box.translate(0, shift)
+
+            for child in po.group_objects:
+                Splitter._shift(child, shift, ids)
+
+    @staticmethod
+    def _unlink(po, ids: set):
+        # Text chains going out of the part are cut
+
+        for direction in ["next", "previous"]:
+            if po.linked[direction] not in ids:
+                po.linked[direction] = None
+
+        if isinstance(po, pageobjects.GroupObject):
+            for child in po.group_objects:
+                Splitter._unlink(child, ids)
+
+    # --- References -----------------------------------------------------
+
+    def _references(self, page_objects: list):
+        """
+        Returns names of the resources referenced by page objects.
+
+        :rtype: dict
+        """
+
+        refs = {
+            "color": set(), "paragraph": set(), "character": set(),
+            "table": set(), "cell": set(), "pattern": set(), "mark": set(),
+        }
+
+        patterns = {pattern.name: pattern for pattern in self.document.patterns}
+
+        pending = list(page_objects)
+
+        while pending:
+            po = pending.pop()
+
+            refs["color"].add(po.outline["fill"])
+            refs["color"].add(po.outline["stroke"])
+
+            for story in getattr(po, "stories", []):
+                Splitter._story_references(story, refs)
+
+            if isinstance(po, pageobjects.TableObject):
+                refs["table"].add(po.style)
+
+                for cell in po.cells:
+                    refs["cell"].add(cell.style)
+                    refs["color"].add(cell.fill["color"])
+                    Splitter._story_references(cell.story, refs)
+
+            if isinstance(po, pageobjects.GroupObject):
+                pending.extend(po.group_objects)
+
+            if isinstance(po, pageobjects.SymbolObject):
+                if po.pattern not in refs["pattern"]:
+                    refs["pattern"].add(po.pattern)
+
+                    if (pattern := patterns.get(po.pattern)) is not None:
+                        pending.extend(pattern.items)
+
+        return refs
+
+    @staticmethod
+    def _story_references(story, refs: dict):
+        if story is None:
+            return
+
+        for element in story.sequence:
+
+            if isinstance(element, marks.StoryMarkAbstract):
+                refs["mark"].add(element.label)
+                continue
+
+            if (parent := getattr(element, "parent", None)):
+                refs["paragraph"].add(parent)
+
+            if (font := getattr(element, "font", None)):
+                refs["color"].add(font.get("color"))
+
+    @staticmethod
+    def _used_styles(styles: list, names: set):
+        """
+        Returns styles named in names, their parents, and default styles.
+
+        :rtype: list
+        """
+
+        by_name = {style.name: style for style in styles}
+        used = set()
+
+        for style in styles:
+            if style.is_default or style.name in pstyles.StyleAbstract.default_name.values():
+                names.add(style.name)
+
+        for name in list(names):
+
+            while name and name not in used and name in by_name:
+                used.add(name)
+                name = by_name[name].parent
+
+        return [style for style in styles if style.name in used]
+
+    @staticmethod
+    def _style_colors(style, colors: set):
+        if (font := getattr(style, "font", None)):
+            colors.add(font["color"])
+
+        if (fill := getattr(style, "fill", None)):
+            colors.add(fill["color"])
+
+        for border in getattr(style, "borders", []):
+            for line in getattr(border, "lines", []):
+                colors.add(line.color)
+
+    @staticmethod
+    def _used_mark(mark, labels: set, ids: set):
+        if mark.type == "variable":
+            return True
+
+        if mark.type == "objectref":
+            return mark.target_object in ids
+
+        return mark.label in labels
+
+    # --- Writing --------------------------------------------------------
+
+    def write(self, filepath_format: str, ranges=None, workers=None,
+            compression="auto", level=None):
+        """
+        Write parts of the SLA.
+
+        :type filepath_format: str
+        :param filepath_format: Format of the file paths of parts, with
+            ``{index}`` (from 1), ``{first}``, ``{last}`` and ``{name}``
+            (section name) fields. Ex: ``chapter-{index:02d}.sla``
+        :type ranges: list
+        :param ranges: List of (first page, last page) tuples, pages
+            counted from 1. The ranges of the document sections if None.
+        :type workers: int
+        :param workers: Number of worker processes (or threads). CPU count
+            if None, no pool if 1.
+        :type compression: str, bool
+        :param compression: Compression of the parts (see SLA.save)
+        :type level: int
+        :param level: Compression level (see SLA.save)
+        :rtype: list
+        :returns: File paths of the parts
+        """
+
+        global _SPLITTER
+
+        if ranges is None:
+            ranges = self.section_ranges()
+
+        jobs = []
+
+        for index, page_range in enumerate(ranges, start=1):
+            first, last = page_range[0], page_range[1]
+
+            if len(page_range) > 2:
+                name = page_range[2]
+            else:
+                name = str(index)
+
+            filepath = filepath_format.format(
+                index=index, first=first, last=last, name=name
+            )
+
+            jobs.append((first, last, filepath, compression, level))
+
+        if workers == 1 or len(jobs) < 2:
+            return [_write_part(self, *job) for job in jobs]
+
+        # Forked workers share the parsed document without serializing it
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            _SPLITTER = self
+
+            try:
+                with concurrent.futures.ProcessPoolExecutor(
+                        workers,
+                        mp_context=multiprocessing.get_context("fork")
+                        ) as pool:
+                    return list(
+                        pool.map(_write_forked_part, *zip(*jobs))
+                    )
+
+            finally:
+                _SPLITTER = None
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            return list(
+                pool.map(lambda job: _write_part(self, *job), jobs)
+            )
+
+# Fonctions =============================================================#
+
+def _write_part(splitter, first, last, filepath, compression, level):
+    part_sla = splitter.part(first, last)
+    part_sla.save(filepath, compression, level)
+
+    return filepath
+
+def _write_forked_part(first, last, filepath, compression, level):
+    return _write_part(_SPLITTER, first, last, filepath, compression, level)
+
+def split(slafile, filepath_format: str, ranges=None, workers=None,
+        compression="auto", level=None):
+    """
+    Split a SLA into several SLA files, by page ranges or sections.
+
+    :type slafile: pyscribus.sla.SLA
+    :param slafile: SLA to split
+    :type filepath_format: str
+    :param filepath_format: Format of the file paths of parts
+        (see Splitter.write)
+    :type ranges: list
+    :param ranges: List of (first page, last page) tuples, pages counted
+        from 1. The ranges of the document sections if None.
+    :type workers: int
+    :param workers: Number of worker processes. CPU count if None.
+    :rtype: list
+    :returns: File paths of the parts
+
+    .. seealso:: :class:`Splitter`
+    """
+
+    splitter = Splitter(slafile)
+
+    return splitter.write(filepath_format, ranges, workers, compression, level)
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
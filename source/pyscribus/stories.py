@@ -23,6 +23,9 @@ PyScribus classes for stories
 
 # Imports ===============================================================#
 
+import collections
+import collections.abc
+
 import lxml
 import lxml.etree as ET
 
@@ -163,6 +166,290 @@ class StoryParagraphEnding(PyScribusElement):
         return xml
 
 
+class InternedMapping(collections.abc.Mapping):
+    """
+    Immutable mapping of fixed keys, interned: instanciating a mapping
+    with the values of an existing one returns the existing instance.
+
+    Instances are shared by all the objects using the same values, so
+    most comparisons are identity checks and hashes are precomputed.
+    Interned instances are kept in a bounded FormatCache, emptied by
+    pyscribus.common.xml.clear_format_caches().
+
+    Instanciate it like a dict, from a mapping (keys not in ``fields``
+    are ignored) and/or keywords arguments. Use replace() to get the
+    mapping with other values.
+    """
+
+    __slots__ = ["_values", "_hash", "_xml"]
+
+    # Keys of the mapping
+    fields = []
+
+    # Values of missing keys, function normalizing values
+    _missing = ()
+    _normalize = None
+
+    # Mapping of missing keys only
+    _default = None
+
+    # Shared by copies, see pyscribus.common.xml.clone()
+    clone_immutable = True
+
+    def __new__(cls, mapping=None, **values):
+        if mapping is None and not values:
+            if cls._default is None:
+                cls._default = cls._intern(cls._missing)
+
+            return cls._default
+
+        if mapping.__class__ is cls:
+            if not values:
+                return mapping
+
+            current = list(mapping._values)
+
+        else:
+            current = list(cls._missing)
+
+            if mapping is not None:
+                for key, value in mapping.items():
+                    if (index := cls._positions.get(key)) is not None:
+                        current[index] = value
+
+        for key, value in values.items():
+            if (index := cls._positions.get(key)) is None:
+                raise KeyError(
+                    "{} has no {} key".format(cls.__name__, key)
+                )
+
+            current[index] = value
+
+        if cls._normalize is not None:
+            current = map(cls._normalize, current)
+
+        return cls._intern(tuple(current))
+
+    @classmethod
+    def _intern(cls, values: tuple):
+        # Types in the key, as 12 == 12.0 but their XML differ
+        key = (values, tuple(map(type, values)))
+
+        return cls._interned.get(key, cls._create, values)
+
+    @classmethod
+    def _create(cls, values: tuple):
+        mapping = object.__new__(cls)
+        mapping._values = values
+        mapping._hash = hash((cls.__name__, values))
+        mapping._xml = cls._toxml(values)
+
+        return mapping
+
+    @staticmethod
+    def _toxml(values: tuple):
+        return None
+
+    def replace(self, **values):
+        """
+        Returns the mapping with other values.
+
+        :rtype: InternedMapping
+        """
+
+        return self.__class__(self, **values)
+
+    def copy(self):
+        """
+        Returns the mapping as a new dict.
+
+        :rtype: dict
+        """
+
+        return dict(zip(self.fields, self._values))
+
+    # --- Mapping --------------------------------------------------------
+
+    def __getitem__(self, key):
+        return self._values[self._positions[key]]
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+
+        # Equal values can be interned twice, as the interned instances
+        # are forgotten when their cache is emptied
+        if other.__class__ is self.__class__:
+            return self._values == other._values
+
+        return collections.abc.Mapping.__eq__(self, other)
+
+    def __repr__(self):
+        return "{}({})".format(
+            self.__class__.__name__,
+            ", ".join(
+                "{}={!r}".format(key, value)
+                for key, value in zip(self.fields, self._values)
+            )
+        )
+
+    # --- Copies ---------------------------------------------------------
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (self.__class__._intern, (self._values,))
+
+
+class FontSpec(InternedMapping):
+    """
+    Font details of a story fragment: name, size, color and opacity
+    (shade). False for undefined details.
+
+    :Example:
+
+    .. code:: python
+
+       bold = stories.FontSpec(name="Arial Bold")
+       bigger = bold.replace(size=14)
+
+    """
+
+    __slots__ = []
+
+    fields = ["name", "size", "color", "opacity"]
+
+    # XML attributes of the fields
+    fields_xml = ["FONT", "FONTSIZE", "FCOLOR", "FSHADE"]
+
+    # Order of the XML attributes in exports
+    _export_order = [0, 2, 3, 1]
+
+    _missing = (False, False, False, False)
+    _positions = {key: index for index, key in enumerate(fields)}
+    _interned = FormatCache()
+    _default = None
+
+    # XML attributes values -> FontSpec
+    _attributes = FormatCache()
+
+    @staticmethod
+    def _toxml(values: tuple):
+        return tuple(
+            (FontSpec.fields_xml[index], str(values[index]))
+            for index in FontSpec._export_order
+            if values[index]
+        )
+
+    def xml_attributes(self):
+        """
+        Returns the XML attributes of the defined font details.
+
+        :rtype: tuple
+        :returns: Tuple of (attribute name, attribute value) tuples
+        """
+
+        return self._xml
+
+    @staticmethod
+    def fromxml(xml: ET._Element):
+        """
+        Returns the font details of an XML element (ITEXT…).
+
+        :type xml: lxml.etree._Element
+        :param xml: XML element
+        :rtype: FontSpec
+        """
+
+        values = tuple(
+            [xml.get(attribute, False) for attribute in FontSpec.fields_xml]
+        )
+
+        # XML values are always strings, the types can be skipped
+        return FontSpec._attributes.get(values, FontSpec._intern, values)
+
+
+class FeatureSet(InternedMapping):
+    """
+    Font special formatting of a story fragment (FEATURES): True for
+    enabled features.
+
+    :Example:
+
+    .. code:: python
+
+       features = stories.FeatureSet(smallcaps=True, underline=True)
+
+    """
+
+    __slots__ = []
+
+    fields = [
+        "inherit", "smallcaps", "allcaps", "superscript", "strike",
+        "subscript", "underline", "underlinewords"
+    ]
+
+    _missing = (False,) * 8
+    _normalize = bool
+    _positions = {key: index for index, key in enumerate(fields)}
+    _interned = FormatCache()
+    _default = None
+
+    # FEATURES attribute -> FeatureSet
+    _strings = FormatCache()
+
+    @staticmethod
+    def _toxml(values: tuple):
+        return " ".join(
+            key for key, value in zip(FeatureSet.fields, values) if value
+        )
+
+    def toxmlstr(self):
+        """
+        Returns the enabled features, separated by spaces, as in the
+        FEATURES attribute.
+
+        :rtype: str
+        """
+
+        return self._xml
+
+    @staticmethod
+    def fromstring(features: str):
+        """
+        Returns the feature set of a FEATURES attribute. Unknown features
+        are ignored.
+
+        :type features: str
+        :param features: Features separated by spaces
+        :rtype: FeatureSet
+        """
+
+        return FeatureSet._strings.get(
+            features, FeatureSet._fromstring, features
+        )
+
+    @staticmethod
+    def _fromstring(features: str):
+        return FeatureSet(dict.fromkeys(features.split(), True))
+
+
 class StoryFragment(PyScribusElement):
     """
     Text fragment (ITEXT) in Scribus stories.
@@ -171,8 +458,8 @@ class StoryFragment(PyScribusElement):
     :param kwargs: Quick setting (see kwargs table)
 
     :ivar string text: Text content
-    :ivar dict font: Font details
-    :ivar dict features: Font special formatting
+    :ivar FontSpec font: Font details
+    :ivar FeatureSet features: Font special formatting
 
     +----------------+---------------------------------+--------------+
     | Kwargs         | Setting                         | Type         |
@@ -230,24 +517,9 @@ class StoryFragment(PyScribusElement):
         # StoryParagraphEnding in Story.sequence
         self.paragraph_style = False
 
-        self.font = {
-            "name": False,
-            "size": False,
-            "color": False,
-            "opacity": False
-        }
-
-        # Features
-        self.features = {
-            "inherit": False,
-            "smallcaps": False,
-            "allcaps": False,
-            "superscript": False,
-            "strike": False,
-            "subscript": False,
-            "underline": False,
-            "underlinewords": False,
-        }
+        # Shared immutable values, see set_font() and set_features()
+        self.font = FontSpec()
+        self.features = FeatureSet()
 
         if kwargs:
             self._quick_setup(kwargs)
@@ -264,56 +536,73 @@ class StoryFragment(PyScribusElement):
         if settings:
             PyScribusElement._quick_setup(self, settings)
 
+            font = {}
+            features = {}
+
             for setting_name, setting_value in settings.items():
 
                 if setting_name == "text":
                     self.text = setting_value
 
-                if setting_value == "features":
-                    self.features = setting_value
+                if setting_name == "features":
+                    self.features = FeatureSet(setting_value)
 
                 if setting_name == "fontsize":
-                    self.font["size"] = setting_value
+                    font["size"] = setting_value
 
                 if setting_name == "fontcolor":
-                    self.font["color"] = setting_value
+                    font["color"] = setting_value
 
                 if setting_name == "fontopacity":
-                    self.font["opacity"] = setting_value
+                    font["opacity"] = setting_value
 
                 if setting_name == "font":
-                    self.font["name"] = setting_value
+                    font["name"] = setting_value
 
-                if setting_name in self.features.keys():
+                if setting_name in FeatureSet.fields:
+                    features[setting_name] = setting_value
 
-                    if setting_value:
-                        self.features[setting_name] = True
-                    else:
-                        self.features[setting_name] = False
+            if font:
+                self.set_font(**font)
+
+            if features:
+                self.features = FeatureSet(self.features, **features)
 
     def fromdefault(self):
         self.text = ""
 
         self.paragraph_style = False
 
-        self.font = {
-            "name": False,
-            "size": False,
-            "color": False,
-            "opacity": False
-        }
+        self.font = FontSpec()
+        self.features = FeatureSet()
+
+    @staticmethod
+    def fromtemplate(text, font, features):
+        """
+        Returns a new fragment from font and features mappings, without
+        the kwargs processing of instanciation.
+
+        :type text: str
+        :param text: Fragment text
+        :type font: FontSpec, dict
+        :param font: Font details
+        :type features: FeatureSet, dict
+        :param features: Font special formatting
+        :rtype: StoryFragment
+        """
 
-        self.features = {
-            "inherit": False,
-            "smallcaps": False,
-            "allcaps": False,
-            "superscript": False,
-            "strike": False,
-            "subscript": False,
-            "underline": False,
-            "underlinewords": False,
+        fragment = StoryFragment.__new__(StoryFragment)
+
+        fragment.__dict__ = {
+            "pyscribus_defaults": [],
+            "text": text,
+            "paragraph_style": False,
+            "font": FontSpec(font),
+            "features": FeatureSet(features),
         }
 
+        return fragment
+
     def __iadd__(self, fragment):
         """
         += operator can be used to join another fragment text.
@@ -348,25 +637,15 @@ class StoryFragment(PyScribusElement):
     def toxml(self):
         xml = ET.Element("ITEXT")
 
-        have_features = len([f for f in self.features.values() if f])
-
-        if have_features:
-            features = []
+        # Font details and features may have been replaced by dicts
+        features = FeatureSet(self.features)
+        font = FontSpec(self.font)
 
-            for f,v in self.features.items():
-                if v:
-                    features.append(f)
+        if features._xml:
+            xml.attrib["FEATURES"] = features._xml
 
-            features = " ".join(features)
-
-            xml.attrib["FEATURES"] = features
-
-        for case in zip(
-                    ["name", "color", "opacity", "size"],
-                    ["FONT", "FCOLOR", "FSHADE", "FONTSIZE"],
-                    ):
-            if self.font[case[0]]:
-                xml.attrib[case[1]] = self.font[case[0]]
+        for attribute, value in font._xml:
+            xml.attrib[attribute] = value
 
         xml.attrib["CH"] = self.text
 
@@ -382,13 +661,7 @@ class StoryFragment(PyScribusElement):
             if (features := xml.get("FEATURES")) is not None:
                 self.set_features(features)
 
-            for case in zip(
-                        ["name", "color", "opacity", "size"],
-                        ["FONT", "FCOLOR", "FSHADE", "FONTSIZE"],
-                        ):
-
-                if (att := xml.get(case[1])) is not None:
-                    self.font[case[0]] = att
+            self.font = FontSpec.fromxml(xml)
 
             # TODO Reste de l’implémentation, puis :
 
@@ -396,14 +669,42 @@ class StoryFragment(PyScribusElement):
         else:
             return False
 
+    def set_font(self, **font):
+        """
+        Set font details of the fragment.
+
+        :type font: dict
+        :param font: Font details to change (name, size, color, opacity)
+
+        :Example:
+
+        .. code:: python
+
+           fragment.set_font(name="Arial Bold", size=12)
+
+        """
+
+        self.font = FontSpec(self.font, **font)
+
     def set_features(self, features: str):
-        # TODO
+        """
+        Enable font features of the fragment.
+
+        :type features: str
+        :param features: Features separated by spaces, as in the FEATURES
+            attribute. Ex: ``"smallcaps underline"``
+        """
 
-        features = features.split()
+        enabled = FeatureSet.fromstring(features)
 
-        for feature in features:
-            if feature in self.features.keys():
-                self.features[feature] = True
+        # Current features are kept if there are any
+        if self.features != FeatureSet():
+            enabled = FeatureSet(
+                self.features,
+                **{key: True for key, value in enabled.items() if value}
+            )
+
+        self.features = enabled
 
 
 class StoryVariable(PyScribusElement):
@@ -481,6 +782,68 @@ variable_classes = {
 
 # Parsing functions =====================================================#
 
+def note_mark(label: str, sla_document=False):
+    """
+    Returns the mark of a note in a story, and adds the note and its
+    mark to the document.
+
+    :type label: str
+    :param label: Note label (@id of <note> in PSM)
+    :type sla_document: pyscribus.document.Document
+    :param sla_document: Instance of PyScribus Document where notes & marks will 
+        be stored.
+    :rtype: pyscribus.marks.StoryNoteMark
+    """
+
+    # Mark of the note in the story ----------------------
+
+    story_note = marks.StoryNoteMark(label=label)
+    story_note.fromdefault()
+
+    # Note content in DOCUMENT ---------------------------
+
+    # TODO FIXME Now that the mark is in the story,
+    # we must add the note content into the DOCUMENT
+    # <Notes>
+
+    if sla_document:
+        document_note = notes.Note()
+        document_note.fromdefault()
+        document_note.parent_mark = label
+
+        # TODO FIXME Handle note style
+        # TODO FIXME Handle note text
+
+        sla_document.notes.append(document_note)
+
+    # Mark of the note in the DOCUMENT marks -------------
+
+    if sla_document:
+        document_mark = marks.DocumentMark()
+        document_mark.fromdefault("note")
+        document_mark.label = label
+        sla_document.marks.append(document_mark)
+
+    return story_note
+
+def psm_paragraph(html: str):
+    """
+    Returns a paragraph text in PSM enclosed in a <p> element, if it isn't
+    already.
+
+    :type html: str
+    :param html: Paragraph text in PSM (PyScribus Story Markup)
+    :rtype: str
+    """
+
+    if not html.startswith("<p>"):
+        html = "<p>{}".format(html)
+
+    if not html.endswith("</p>"):
+        html = "{}</p>".format(html)
+
+    return html
+
 def sequencefromhtml(
         html,
         font={
@@ -501,6 +864,38 @@ def sequencefromhtml(
         be stored.
     :rtype: list
     :returns: List of pyscribus.stories.Story sequence elements
+
+    .. seealso:: sequencefromelement
+    """
+
+    return sequencefromelement(
+        ET.fromstring(psm_paragraph(html)),
+        font=font,
+        alternate_emphasis=alternate_emphasis,
+        sla_document=sla_document
+    )
+
+def sequencefromelement(
+        parsed,
+        font={
+            "italic": "Arial Italic",
+            "bold": "Arial Bold",
+            "bold-italic": "Arial Bold Italic"},
+        alternate_emphasis: bool = False,
+        sla_document=False):
+    """
+    :type parsed: lxml.etree._Element
+    :param parsed: Paragraph in PSM (PyScribus Story Markup), as parsed
+        <p> element
+    :type font: dict
+    :param font: Fonts used for text emphasis
+    :type alternate_emphasis: boolean
+    :param alternate_emphasis: Nested emphasis returns to regular font.
+    :type sla_document: pyscribus.document.Document
+    :param sla_document: Instance of PyScribus Document where notes & marks will 
+        be stored.
+    :rtype: list
+    :returns: List of pyscribus.stories.Story sequence elements
     """
 
     def tag_to_data(fragment, tag):
@@ -509,22 +904,22 @@ def sequencefromhtml(
         """
 
         if tag in ["em", "i"]:
-            fragment.font = font["italic"]
+            fragment.set_font(name=font["italic"])
 
         if tag in ["b", "strong"]:
-            fragment.font = font["bold"]
+            fragment.set_font(name=font["bold"])
 
         if tag in ["sup"]:
-            fragment.features["superscript"] = True
+            fragment.set_features("superscript")
 
         if tag in ["sub"]:
-            fragment.features["subscript"] = True
+            fragment.set_features("subscript")
 
         if tag in ["u"]:
-            fragment.features["underline"] = True
+            fragment.set_features("underline")
 
         if tag in ["sc"]:
-            fragment.features["smallcaps"] = True
+            fragment.set_features("smallcaps")
 
         return fragment
 
@@ -552,17 +947,17 @@ def sequencefromhtml(
                     if name == "font-variant":
 
                         if value == "small-caps":
-                            fragment.features["smallcaps"] = True
+                            fragment.set_features("smallcaps")
 
                     if name == "text-transform":
 
                         if value == "uppercase":
-                            fragment.features["allcaps"] = True
+                            fragment.set_features("allcaps")
 
                     if name == "text-decoration":
 
                         if value == "underline":
-                            fragment.features["underline"] = True
+                            fragment.set_features("underline")
 
         return fragment
 
@@ -578,38 +973,7 @@ def sequencefromhtml(
                 "<note> without @id."
             )
         else:
-            # Mark of the note in the story ----------------------
-
-            story_note = marks.StoryNoteMark(label=nid)
-            story_note.fromdefault()
-
-            # Note content in DOCUMENT ---------------------------
-
-            # TODO FIXME Now that the mark is in the story,
-            # we must add the note content into the DOCUMENT
-            # <Notes>
-
-            if sla_document:
-                document_note = notes.Note()
-                document_note.fromdefault()
-                document_note.parent_mark = nid
-
-                # TODO FIXME Handle note style
-                # TODO FIXME Handle note text
-
-                sla_document.notes.append(document_note)
-
-            # Mark of the note in the DOCUMENT marks -------------
-
-            if sla_document:
-                document_mark = marks.DocumentMark()
-                document_mark.fromdefault("note")
-                document_mark.label = nid
-                sla_document.marks.append(document_mark)
-
-            # ----------------------------------------------------
-
-            sequence.append(story_note)
+            sequence.append(note_mark(nid, sla_document))
 
         return sequence, sla_document
 
@@ -627,7 +991,7 @@ def sequencefromhtml(
         if element.tag in ["pgno", "pgco"]:
             is_fragment = False
 
-            variable = Story.variable_classes[element.tag]()
+            variable = variable_classes[element.tag]()
             sequence.append(variable)
 
         if element.tag == "br":
@@ -661,7 +1025,7 @@ def sequencefromhtml(
                         if element_class in ["pgno", "pgco"]:
                             is_fragment = False
 
-                            variable = Story.variable_classes[element_class]()
+                            variable = variable_classes[element_class]()
                             sequence.append(variable)
 
                             break
@@ -727,19 +1091,6 @@ def sequencefromhtml(
 
     global variable_classes
 
-    # Prepare parsing -----------------------------------------------
-
-    # Encapsulate html in a <p> element if it doesn't exists, to
-    # make lxml parsing work.
-
-    if not html.startswith("<p>"):
-        html = "<p>{}".format(html)
-
-    if not html.endswith("</p>"):
-        html = "{}</p>".format(html)
-
-    parsed = ET.fromstring(html)
-
     # Parsing--------------------------------------------------------
 
     sequence = []
@@ -767,6 +1118,367 @@ def sequencefromhtml(
 
     return sequence
 
+# PSM converter =========================================================#
+
+# PSM tag -> emphasis font
+psm_tag_fonts = {
+    "em": "italic", "i": "italic", "b": "bold", "strong": "bold",
+}
+
+# PSM tag -> StoryFragment feature
+psm_tag_features = {
+    "sup": "superscript", "sub": "subscript", "u": "underline",
+    "sc": "smallcaps",
+}
+
+# PSM tags of text fragments
+psm_fragment_tags = [
+    "em", "i", "span", "b", "strong", "sup", "sub", "u", "sc"
+]
+
+# (CSS property, value) of span @style -> StoryFragment feature
+psm_css_features = {
+    ("font-variant", "small-caps"): "smallcaps",
+    ("text-transform", "uppercase"): "allcaps",
+    ("text-decoration", "underline"): "underline",
+}
+
+class PSMConverter:
+    """
+    Converter of PSM (PyScribus Story Markup) paragraphs into story
+    sequences, equivalent to sequencefromhtml().
+
+    Paragraphs are compiled into immutable templates, cached by markup,
+    emphasis fonts and alternate emphasis. Converting again a cached
+    paragraph only instanciates the elements of its template.
+
+    :type cache_size: int
+    :param cache_size: Maximum count of cached templates
+
+    :Example:
+
+    .. code:: python
+
+       converter = stories.PSMConverter()
+
+       sequence = converter.convert("By <sc>Jane Doe</sc>")
+       sequences = converter.convert_many(captions, sla_document=document)
+
+    """
+
+    default_font = {
+        "italic": "Arial Italic",
+        "bold": "Arial Bold",
+        "bold-italic": "Arial Bold Italic"
+    }
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+
+        # (markup, font items, alternate emphasis) -> template
+        self._templates = collections.OrderedDict()
+        # span @style -> features names
+        self._css = {}
+
+        self._font = FontSpec()
+        self._features = FeatureSet()
+
+    def clear(self):
+        """
+        Empty the templates cache.
+        """
+
+        self._templates = collections.OrderedDict()
+
+    # --- Compilation ----------------------------------------------------
+
+    def _css_features(self, style: str):
+        if (features := self._css.get(style)) is not None:
+            return features
+
+        features = []
+
+        for rule in style.split(";"):
+            rule = rule.strip().replace(": ", ":").split(":")
+            name, value = rule[0], ":".join(rule[1:])
+
+            if (feature := psm_css_features.get((name, value))) is not None:
+                features.append(feature)
+
+        features = tuple(features)
+        self._css[style] = features
+
+        return features
+
+    def _fragment(self, text, element, font: dict, read_tag: bool = True):
+        """
+        Returns the template of a text fragment formatted by element.
+        """
+
+        font_name = False
+        features = []
+
+        if read_tag:
+            if (emphasis := psm_tag_fonts.get(element.tag)) is not None:
+                font_name = font[emphasis]
+
+            if (feature := psm_tag_features.get(element.tag)) is not None:
+                features.append(feature)
+
+        if element.tag == "span" and "style" in element.attrib:
+            features.extend(self._css_features(element.attrib["style"]))
+
+        fragment_font = self._font
+
+        if font_name:
+            fragment_font = self._font.replace(name=font_name)
+
+        fragment_features = self._features
+
+        if features:
+            fragment_features = self._features.replace(
+                **dict.fromkeys(features, True)
+            )
+
+        return ("fragment", text, fragment_font, fragment_features)
+
+    def _compile_element(self, element, previous, template, font,
+            alternate_emphasis):
+
+        is_fragment = element.tag in psm_fragment_tags
+
+        if element.tag == "note":
+            is_fragment = False
+            template.append(PSMConverter._note(element))
+
+        elif element.tag in variable_classes:
+            is_fragment = False
+            template.append(("element", variable_classes[element.tag]))
+
+        elif element.tag == "br":
+            is_fragment = False
+            template.append(("element", StoryLineBreak))
+
+        elif element.tag == "span" and "class" in element.attrib:
+            classes = element.attrib["class"].split()
+
+            if len([c for c in ["pgno", "pgco", "note"] if c in classes]) > 1:
+                raise ValueError(
+                    "Incompatible classes in span element @class : '{}'".format(
+                        ",".join(classes)
+                    )
+                )
+
+            for element_class in classes:
+
+                if element_class in variable_classes:
+                    is_fragment = False
+                    template.append(
+                        ("element", variable_classes[element_class])
+                    )
+                    break
+
+                if element_class == "note":
+                    is_fragment = False
+                    template.append(PSMConverter._note(element))
+                    break
+
+        elif not is_fragment:
+            raise ValueError(
+                "Unknown PSM element <{}>.".format(element.tag)
+            )
+
+        if is_fragment:
+            read_tag = True
+
+            if alternate_emphasis:
+                if previous.tag in ["b", "strong", "i", "em"]:
+                    if element.tag in ["b", "strong", "i", "em"]:
+                        read_tag = False
+
+            template.append(
+                self._fragment(element.text, element, font, read_tag)
+            )
+
+        for sub_element in element:
+            self._compile_element(
+                sub_element, element, template, font, alternate_emphasis
+            )
+
+        if element.tail is not None:
+            template.append(self._fragment(element.tail, previous, font))
+
+    @staticmethod
+    def _note(element):
+        if (nid := element.get("id")) is None:
+            raise ValueError("<note> without @id.")
+
+        return ("note", nid)
+
+    def compile(self, parsed, font=None, alternate_emphasis: bool = False):
+        """
+        Returns the template of a parsed PSM paragraph.
+
+        :type parsed: lxml.etree._Element
+        :param parsed: Paragraph, as parsed <p> element
+        :type font: dict
+        :param font: Fonts used for text emphasis
+        :type alternate_emphasis: bool
+        :param alternate_emphasis: Nested emphasis returns to regular font.
+        :rtype: tuple
+        """
+
+        if font is None:
+            font = PSMConverter.default_font
+
+        template = []
+
+        if parsed.text is not None:
+            template.append(("fragment", parsed.text, self._font, self._features))
+
+        for element in parsed:
+            self._compile_element(
+                element, parsed, template, font, alternate_emphasis
+            )
+
+        if parsed.tail is not None:
+            template.append(("fragment", parsed.tail, self._font, self._features))
+
+        return tuple(template)
+
+    # --- Conversion -----------------------------------------------------
+
+    @staticmethod
+    def instanciate(template: tuple, sla_document=False):
+        """
+        Returns a new story sequence from a template.
+
+        :type template: tuple
+        :param template: Template (see compile())
+        :type sla_document: pyscribus.document.Document
+        :param sla_document: Instance of PyScribus Document where notes & marks will 
+            be stored.
+        :rtype: list
+        """
+
+        sequence = []
+
+        for entry in template:
+
+            if entry[0] == "fragment":
+                sequence.append(StoryFragment.fromtemplate(*entry[1:]))
+
+            elif entry[0] == "element":
+                sequence.append(entry[1]())
+
+            else:
+                sequence.append(note_mark(entry[1], sla_document))
+
+        return sequence
+
+    def _key(self, html: str, font, alternate_emphasis: bool):
+        if font is None:
+            return (html, None, bool(alternate_emphasis))
+
+        return (html, tuple(sorted(font.items())), bool(alternate_emphasis))
+
+    def _cached(self, key):
+        if (template := self._templates.get(key)) is not None:
+            self._templates.move_to_end(key)
+
+        return template
+
+    def _store(self, key, template):
+        self._templates[key] = template
+
+        if len(self._templates) > self.cache_size:
+            self._templates.popitem(last=False)
+
+    def convert(self, html: str, font=None, alternate_emphasis: bool = False,
+            sla_document=False):
+        """
+        Returns the story sequence of a PSM paragraph.
+
+        :type html: str
+        :param html: Paragraph text in PSM (PyScribus Story Markup)
+        :type font: dict
+        :param font: Fonts used for text emphasis
+        :type alternate_emphasis: bool
+        :param alternate_emphasis: Nested emphasis returns to regular font.
+        :type sla_document: pyscribus.document.Document
+        :param sla_document: Instance of PyScribus Document where notes & marks will 
+            be stored.
+        :rtype: list
+        :returns: List of pyscribus.stories.Story sequence elements
+        """
+
+        key = self._key(html, font, alternate_emphasis)
+
+        if (template := self._cached(key)) is None:
+            template = self.compile(
+                ET.fromstring(psm_paragraph(html)), font, alternate_emphasis
+            )
+            self._store(key, template)
+
+        return PSMConverter.instanciate(template, sla_document)
+
+    def convert_many(self, htmls: list, font=None,
+            alternate_emphasis: bool = False, sla_document=False):
+        """
+        Returns the story sequences of PSM paragraphs. Paragraphs not in
+        the cache are parsed together.
+
+        :type htmls: list
+        :param htmls: Paragraphs texts in PSM (PyScribus Story Markup)
+        :type font: dict
+        :param font: Fonts used for text emphasis
+        :type alternate_emphasis: bool
+        :param alternate_emphasis: Nested emphasis returns to regular font.
+        :type sla_document: pyscribus.document.Document
+        :param sla_document: Instance of PyScribus Document where notes & marks will 
+            be stored.
+        :rtype: list
+        :returns: List of story sequences, in the order of htmls
+        """
+
+        keys = [self._key(html, font, alternate_emphasis) for html in htmls]
+        templates = [self._cached(key) for key in keys]
+
+        # --- Parsing of the paragraphs not in the cache -----------------
+
+        missing = {}
+
+        for key, template in zip(keys, templates):
+            if template is None:
+                missing.setdefault(key, psm_paragraph(key[0]))
+
+        if missing:
+            try:
+                parsed = ET.fromstring(
+                    "<story>{}</story>".format("".join(missing.values()))
+                )
+            except ET.XMLSyntaxError:
+                parsed = []
+
+            if len(parsed) != len(missing):
+                parsed = [ET.fromstring(html) for html in missing.values()]
+
+            compiled = {}
+
+            for key, element in zip(missing, parsed):
+                compiled[key] = self.compile(element, font, alternate_emphasis)
+                self._store(key, compiled[key])
+
+            templates = [
+                compiled[key] if template is None else template
+                for key, template in zip(keys, templates)
+            ]
+
+        return [
+            PSMConverter.instanciate(template, sla_document)
+            for template in templates
+        ]
+
 # Story class ===========================================================#
 
 class Story(PyScribusElement):
@@ -883,13 +1595,14 @@ class Story(PyScribusElement):
               ]
            )
 
-        .. seealso:: pyscribus.stories.Story.append_paragraph
+        .. seealso:: pyscribus.stories.Story.append_paragraph,
+            pyscribus.stories.StoryBuilder
         """
 
         if paragraphs:
 
-            for paragraph in paragraphs:
-                self._append_paragraph(paragraph)
+            with StoryBuilder(self) as builder:
+                builder.extend(paragraphs)
 
             return True
         else:
@@ -971,11 +1684,10 @@ class Story(PyScribusElement):
                 if inherit_style:
                     # Get the last paragraph ending style
 
-                    ps = [
-                        e.parent
-                        for e in self.sequence
-                        if isinstance(e, StoryParagraphEnding)
-                    ][-1]
+                    for element in reversed(self.sequence):
+                        if isinstance(element, StoryParagraphEnding):
+                            ps = element.parent
+                            break
 
                 if style:
                     ps = style
@@ -1089,7 +1801,7 @@ class Story(PyScribusElement):
                     var_name = element.get("name")
 
                     if var_name is not None:
-                        var_instance = Story.variable_classes[var_name]()
+                        var_instance = variable_classes[var_name]()
                         self.sequence.append(var_instance)
 
                 # Story end
@@ -1274,4 +1986,233 @@ class Story(PyScribusElement):
 
         return False
 
+
+class StoryBuilder:
+    """
+    Appends many paragraphs at the end of a story, in linear time.
+
+    PSM texts are parsed by batches, and the current paragraph style and
+    the end of the story are tracked, so that appending a paragraph
+    doesn't depend on the length of the story. Only one batch of
+    paragraphs is kept in memory: generators are never read whole.
+
+    Paragraphs without style take the current style, which is the style
+    of the last paragraph appended with one.
+
+    The story is ended (see Story.end_contents) by close(), or at the end
+    of a with block.
+
+    :type story: pyscribus.stories.Story
+    :param story: Story to append paragraphs to
+    :type font: dict
+    :param font: Fonts used for text emphasis (see Story.append_paragraph)
+    :type alternate_emphasis: bool
+    :param alternate_emphasis: Nested emphasis returns to regular font.
+    :type batch_size: int
+    :param batch_size: Count of paragraphs parsed at once
+
+    :ivar str style: Current paragraph style, False if none
+
+    :Example:
+
+    .. code:: python
+
+       with stories.StoryBuilder(story) as builder:
+           builder.append("Chapter I", "Title1")
+           builder.append("First paragraph of content", "Normal")
+
+           # Paragraphs of content, in Normal style
+           builder.extend(line.strip() for line in novel_file)
+
+    """
+
+    def __init__(self, story, font=None, alternate_emphasis: bool = False,
+            batch_size: int = 512):
+
+        if font is None:
+            font = {
+                "bold": "Arial Bold",
+                "italic": "Arial Italic",
+                "bold-italic": "Arial Bold Italic"
+            }
+
+        StoryBuilder._check_font(font)
+
+        self.story = story
+        self.font = font
+        self.alternate_emphasis = alternate_emphasis
+        self.batch_size = max(1, int(batch_size))
+
+        self.style = False
+
+        for element in reversed(story.sequence):
+            if isinstance(element, StoryParagraphEnding):
+                self.style = element.parent
+                break
+
+        # (PSM text, style, ending, font, alternate emphasis)
+        self._pending = []
+        self._ending = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pending = []
+            self._close_story()
+
+        return False
+
+    @staticmethod
+    def _check_font(font: dict):
+        for font_style in ["bold", "italic", "bold-italic"]:
+
+            if font_style not in font:
+
+                raise ValueError(
+                    "Missing {} setting to font param".format(font_style)
+                )
+
+    def append(self, text: str, style=None, ending: bool = True,
+            alternate_emphasis=None, font=None):
+        """
+        Append a paragraph.
+
+        :type text: str
+        :param text: Paragraph text in PSM (PyScribus Story Markup)
+        :type style: str
+        :param style: Style of the paragraph. If None, the current style.
+            If False, no style.
+        :type ending: bool
+        :param ending: Add a paragraph ending
+        :type alternate_emphasis: bool
+        :param alternate_emphasis: Nested emphasis returns to regular font.
+            If None, the one of the builder.
+        :type font: dict
+        :param font: Fonts used for text emphasis. If None, the ones of
+            the builder.
+        """
+
+        if font is None:
+            font = self.font
+        else:
+            StoryBuilder._check_font(font)
+
+        if alternate_emphasis is None:
+            alternate_emphasis = self.alternate_emphasis
+
+        self._pending.append(
+            (psm_paragraph(text), style, bool(ending), font, alternate_emphasis)
+        )
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, paragraphs):
+        """
+        Append paragraphs.
+
+        :type paragraphs: iterable
+        :param paragraphs: Paragraphs as PSM texts, (PSM text, style)
+            tuples, or Story.append_paragraph() kwargs dictionnaries
+        """
+
+        for paragraph in paragraphs:
+
+            if isinstance(paragraph, str):
+                self.append(paragraph)
+
+            elif isinstance(paragraph, dict):
+                if (style := paragraph.get("style", False)) is False:
+                    if paragraph.get("inherit_style", False):
+                        style = None
+
+                self.append(
+                    paragraph.get("text", ""),
+                    style,
+                    paragraph.get("ending", True),
+                    paragraph.get("alternate_emphasis", None),
+                    paragraph.get("font", None),
+                )
+
+            else:
+                self.append(*paragraph)
+
+    def flush(self):
+        """
+        Parse the pending paragraphs and append them to the story.
+        """
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+
+        # --- Parsing of the whole batch ---------------------------------
+
+        try:
+            parsed = ET.fromstring(
+                "<story>{}</story>".format(
+                    "".join(paragraph[0] for paragraph in pending)
+                )
+            )
+        except ET.XMLSyntaxError:
+            parsed = []
+
+        if len(parsed) != len(pending):
+            # One paragraph at a time, to raise the parsing error of the
+            # faulty paragraph.
+            parsed = [ET.fromstring(paragraph[0]) for paragraph in pending]
+
+        # --- Story sequence ---------------------------------------------
+
+        sequence = self.story.sequence
+
+        if sequence and isinstance(sequence[-1], StoryEnding):
+            self._ending = sequence.pop()
+
+        document = self.story.doc_parent
+
+        for element, paragraph in zip(parsed, pending):
+            _, style, ending, font, alternate_emphasis = paragraph
+
+            sequence.extend(
+                sequencefromelement(
+                    element,
+                    font=font,
+                    alternate_emphasis=alternate_emphasis,
+                    sla_document=document
+                )
+            )
+
+            if ending:
+                if style is None:
+                    style = self.style
+                else:
+                    self.style = style
+
+                sequence.append(StoryParagraphEnding(parent=style))
+
+    def _close_story(self):
+        sequence = self.story.sequence
+
+        if not sequence or not isinstance(sequence[-1], StoryEnding):
+            if self._ending is None:
+                sequence.append(StoryEnding())
+            else:
+                sequence.append(self._ending)
+
+        self._ending = None
+
+    def close(self):
+        """
+        Append the pending paragraphs and end the story.
+        """
+
+        self.flush()
+        self._close_story()
+
 # vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -23,11 +23,12 @@ PyScribus classes for styles manipulation.
 
 # Imports ===============================================================#
 
+import copy
+
 import lxml
 import lxml.etree as ET
 
 import pyscribus.common.xml as xmlc
-import pyscribus.logs as logs
 import pyscribus.exceptions as exceptions
 import pyscribus.dimensions as dimensions
 
@@ -118,17 +119,15 @@ class NoteStyle(xmlc.PyScribusElement):
         nt = xml.get("Type")
 
         # for h,x in NoteStyle.num_type_xml.items():
-        for h,x in xmlc.num_type_xml.items():
-            if nt == x:
-                self.num_type = h
-                break
+        if (h := xmlc.reverse_xml(xmlc.num_type_xml).get(nt)) is not None:
+            self.num_type = h
 
         rg = xml.get("Range")
 
-        for h,x in NoteStyle.range_type_xml.items():
-            if rg == x:
-                self.range = h
-                break
+        codes = xmlc.reverse_xml(NoteStyle.range_type_xml)
+
+        if (h := codes.get(rg)) is not None:
+            self.range = h
 
         return True
 
@@ -346,7 +345,11 @@ class StyleAbstract(xmlc.PyScribusElement):
         self.name = StyleAbstract.default_name[self.style_type]
 
         if self.style_type in ["paragraph", "character"]:
-            self.font = StyleAbstract.default_font
+            # NOTE Updates self.font instead of replacing it, as
+            # default_font doesn't have strike, underline, etc. keys
+
+            for key, value in StyleAbstract.default_font.items():
+                self.font[key] = copy.copy(value)
 
         # TODO Le reste
 
@@ -610,8 +613,7 @@ class StyleAbstract(xmlc.PyScribusElement):
             if self.style_type not in ["paragraph", "character"]:
                 xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                     xml, self.undocumented, True,
-                    self.style_type + " style " + self.name,
-                    logger=logs.getLogger()
+                    self.style_type + " style"
                 )
 
         except AttributeError:
@@ -769,10 +771,10 @@ class ParagraphStyle(StyleAbstract):
 
             if (leading := xml.get("LINESPMode")) is not None:
 
-                for human, code in ParagraphStyle.leading_xml.items():
-                    if leading == code:
-                        self.leading["mode"] = human
-                        break
+                codes = xmlc.reverse_xml(ParagraphStyle.leading_xml)
+
+                if (human := codes.get(leading)) is not None:
+                    self.leading["mode"] = human
 
                 if self.leading["mode"] == "fixed":
                     leading_value = xml.get("LINESP")
@@ -783,10 +785,10 @@ class ParagraphStyle(StyleAbstract):
             #--- Alignment --------------------------------------------------
 
             if (alignment := xml.get("ALIGN")) is not None:
-                for human, code in xmlc.alignment.items():
-                    if alignment == code:
-                        self.font["alignment"] = human
-                        break
+                codes = xmlc.reverse_xml(xmlc.alignment)
+
+                if (human := codes.get(alignment)) is not None:
+                    self.font["alignment"] = human
 
             #--- Spaces before and after paragraph --------------------------
 
@@ -891,8 +893,7 @@ class ParagraphStyle(StyleAbstract):
         try:
             xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                 xml, self.undocumented, True,
-                self.style_type + " style " + self.name,
-                logger=logs.getLogger()
+                self.style_type + " style"
             )
 
         except AttributeError:
@@ -1083,8 +1084,7 @@ class CharacterStyle(StyleAbstract):
         try:
             xml, undoc_attribs = xmlc.all_undocumented_to_xml(
                 xml, self.undocumented, True,
-                self.style_type + " style " + self.name,
-                logger=logs.getLogger()
+                self.style_type + " style"
             )
 
         except AttributeError:
@@ -1163,12 +1163,10 @@ class TableBorder(xmlc.PyScribusElement):
 
         # Find the side of the table border -------------------------
 
-        if xml.tag in TableBorder.sides_xml.values():
+        codes = xmlc.reverse_xml(TableBorder.sides_xml)
 
-            for h,x in TableBorder.sides_xml.items():
-                if x == xml.tag:
-                    self.side = h
-                    break
+        if (h := codes.get(xml.tag)) is not None:
+            self.side = h
 
         if not self.side:
             msg = "Invalid side for TableBorder"
@@ -1306,10 +1304,10 @@ class StyleTab(xmlc.PyScribusElement):
 
         if (tab_type := xml.get("Type")) is not None:
             try:
-                for human,code in StyleTab.tab_type_xml.items():
-                    if code == tab_type:
-                        self.type = human
-                        break
+                codes = xmlc.reverse_xml(StyleTab.tab_type_xml)
+
+                if (human := codes.get(tab_type)) is not None:
+                    self.type = human
 
             except IndexError:
                 self.type = "left"
@@ -1466,28 +1464,28 @@ class RuleStyleLine(xmlc.PyScribusElement):
 
             if (dash := xml.get("Dash")) is not None:
 
-                for human, code in RuleStyleLine.dash_xml.items():
-                    if code == dash:
-                        self.style = human
-                        break
+                codes = xmlc.reverse_xml(RuleStyleLine.dash_xml)
+
+                if (human := codes.get(dash)) is not None:
+                    self.style = human
 
             # --- Line end -----------------------------------------------
 
             if (line_end := xml.get("LineEnd")) is not None:
 
-                for human, code in RuleStyleLine.lineend_xml.items():
-                    if code == line_end:
-                        self.end = human
-                        break
+                codes = xmlc.reverse_xml(RuleStyleLine.lineend_xml)
+
+                if (human := codes.get(line_end)) is not None:
+                    self.end = human
 
             # --- Line join ----------------------------------------------
 
             if (line_join := xml.get("LineJoin")) is not None:
 
-                for human, code in RuleStyleLine.linejoin_xml.items():
-                    if code == line_join:
-                        self.join = human
-                        break
+                codes = xmlc.reverse_xml(RuleStyleLine.linejoin_xml)
+
+                if (human := codes.get(line_join)) is not None:
+                    self.join = human
 
             return True
 
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+# -*- coding:Utf-8 -*-
+
+# PyScribus, python library for Scribus SLA
+# Copyright (C) 2020 Étienne Nadji
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Symbols (instances of patterns) expansion.
+
+A symbol page object only references a pattern by its name. The
+SymbolRegistry of a document places the pattern items of a symbol on
+the page, according to the symbol position and size.
+
+:Example:
+
+.. code:: python
+
+   registry = document.symbols()
+
+   for symbol in registry.instances("Icon"):
+       for item in registry.expand(symbol):
+           print(item.name, item.box.getx("top-left"))
+
+"""
+
+# Imports ===============================================================#
+
+import collections
+
+import pyscribus.dimensions as dimensions
+
+# Variables globales ====================================================#
+
+__author__ = "Etienne Nadji <etnadji@eml.cc>"
+
+# Classes ===============================================================#
+
+class SymbolItem:
+    """
+    Read-only view of a pattern item, as placed by a symbol instance.
+
+    Attributes other than box are those of the pattern item, shared by
+    all the instances of the pattern: do not modify them.
+
+    :type item: pyscribus.patterns.PatternItem
+    :param item: Pattern item
+    :type box: pyscribus.dimensions.DimBox
+    :param box: Box of the pattern item on the page
+
+    :ivar pyscribus.patterns.PatternItem item: Pattern item
+    :ivar pyscribus.dimensions.DimBox box: Box of the pattern item on the
+        page
+    """
+
+    __slots__ = ["item", "box"]
+
+    def __init__(self, item, box):
+        object.__setattr__(self, "item", item)
+        object.__setattr__(self, "box", box)
+
+    def __getattr__(self, name):
+        return getattr(self.item, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Symbol items are read-only.")
+
+    def __repr__(self):
+        return "<SymbolItem {} ({}, {})>".format(
+            self.item.name,
+            self.box.getx("top-left"),
+            self.box.gety("top-left"),
+        )
+
+
+class SymbolRegistry:
+    """
+    Registry of the patterns of a document, expanding symbols into
+    their pattern items.
+
+    Patterns geometry is read once, at registration. Expansions are
+    cached by pattern, scale and position.
+
+    .. note:: Symbols rotation is not applied.
+
+    :type document: pyscribus.document.Document
+    :param document: Document
+    :type cache_size: int
+    :param cache_size: Maximum count of cached expansions
+
+    :ivar dict patterns: Pattern name as keys, (pattern, width, height,
+        items geometry) as values. Items geometry is a list of (pattern
+        item, x, y, width, height).
+    """
+
+    def __init__(self, document, cache_size: int = 4096):
+        self.document = document
+        self.cache_size = cache_size
+
+        self.patterns = {}
+
+        # (pattern name, scale x, scale y, x, y) -> tuple of SymbolItem
+        self._expansions = collections.OrderedDict()
+
+        for pattern in document.patterns:
+            self.register(pattern)
+
+    def register(self, pattern):
+        """
+        Add a pattern to the registry, or update it.
+
+        :type pattern: pyscribus.patterns.Pattern
+        :param pattern: Pattern
+        """
+
+        geometry = []
+
+        for item in pattern.items:
+            geometry.append(
+                (
+                    item,
+                    float(item.box.getx("top-left")),
+                    float(item.box.gety("top-left")),
+                    float(item.box.dims["width"].value),
+                    float(item.box.dims["height"].value),
+                )
+            )
+
+        dims = []
+
+        for dim in ["width", "height"]:
+            if pattern.dims[dim] is None:
+                dims.append(0)
+            else:
+                dims.append(float(pattern.dims[dim].value))
+
+        self.patterns[pattern.name] = (pattern, dims[0], dims[1], geometry)
+
+        self._forget(pattern.name)
+
+    def unregister(self, name: str):
+        """
+        Remove a pattern from the registry.
+
+        :type name: str
+        :param name: Pattern name
+        :rtype: bool
+        :returns: True if the pattern was in the registry
+        """
+
+        self._forget(name)
+
+        return self.patterns.pop(name, None) is not None
+
+    def clear(self):
+        """
+        Read again all the patterns of the document.
+        """
+
+        self.patterns = {}
+        self._expansions = collections.OrderedDict()
+
+        for pattern in self.document.patterns:
+            self.register(pattern)
+
+    def _forget(self, name: str):
+        for key in [key for key in self._expansions if key[0] == name]:
+            del self._expansions[key]
+
+    def scale(self, symbol):
+        """
+        Returns the scale of the pattern of a symbol.
+
+        :type symbol: pyscribus.pageobjects.SymbolObject
+        :param symbol: Symbol
+        :rtype: tuple
+        :returns: (horizontal scale, vertical scale)
+        """
+
+        _, width, height, _ = self.patterns[symbol.pattern]
+
+        scale = []
+
+        for size, dim in zip([width, height], ["width", "height"]):
+
+            if size:
+                scale.append(float(symbol.box.dims[dim].value) / size)
+            else:
+                scale.append(1.0)
+
+        return tuple(scale)
+
+    def expand(self, symbol):
+        """
+        Returns the pattern items of a symbol, placed on the page.
+
+        :type symbol: pyscribus.pageobjects.SymbolObject
+        :param symbol: Symbol
+        :rtype: tuple
+        :returns: Tuple of SymbolItem
+        :raises KeyError: If the pattern of the symbol is not registered
+        """
+
+        if symbol.pattern not in self.patterns:
+            raise KeyError(
+                "Unknown pattern {} for symbol {}.".format(
+                    symbol.pattern, symbol.object_id
+                )
+            )
+
+        scale_x, scale_y = self.scale(symbol)
+
+        key = (
+            symbol.pattern, scale_x, scale_y,
+            float(symbol.box.getx("top-left")),
+            float(symbol.box.gety("top-left")),
+        )
+
+        if (expansion := self._expansions.get(key)) is not None:
+            self._expansions.move_to_end(key)
+            return expansion
+
+        expansion = []
+
+        for item, x, y, width, height in self.patterns[symbol.pattern][3]:
+            box = dimensions.DimBox()
+
+            box.set_box(
+                top_lx=key[3] + x * scale_x,
+                top_ly=key[4] + y * scale_y,
+                width=width * scale_x,
+                height=height * scale_y,
+            )
+
+            expansion.append(SymbolItem(item, box))
+
+        expansion = tuple(expansion)
+
+        self._expansions[key] = expansion
+
+        if len(self._expansions) > self.cache_size:
+            self._expansions.popitem(last=False)
+
+        return expansion
+
+    def instances(self, name=None):
+        """
+        Returns the symbols of the document.
+
+        :type name: str
+        :param name: Only returns the symbols of this pattern
+        :rtype: list
+        """
+
+        symbols = self.document.query(ptype="symbol")
+
+        if name is None:
+            return symbols
+
+        return [symbol for symbol in symbols if symbol.pattern == name]
+
+# vim:set shiftwidth=4 softtabstop=4 spl=en:
@@ -128,12 +128,10 @@ class Section(xmlc.PyScribusElement):
 
             if num_type is not None:
 
-                for human,code in xmlc.num_type_xml.items():
+                codes = xmlc.reverse_xml(xmlc.num_type_xml)
 
-                    if code == num_type:
-
-                        self.numerotation["type"] = human
-                        break
+                if (human := codes.get(num_type)) is not None:
+                    self.numerotation["type"] = human
 
             num_start = xml.get("Start")
 
@@ -265,11 +263,10 @@ class TOC(xmlc.PyScribusElement):
 
             if (placement := xml.get("NumberPlacement")) is not None:
 
-                for human, code in TOC.placement_to_xml.items():
+                codes = xmlc.reverse_xml(TOC.placement_to_xml)
 
-                    if placement == code:
-                        self.placement = human
-                        break
+                if (human := codes.get(placement)) is not None:
+                    self.placement = human
 
             #--------------------------------------------------------
 
@@ -127,19 +127,19 @@ def analyse_hi(xml):
         rend = xml.attrib["rend"]
 
         if "italic" in rend or rend == "italic":
-            first_frag.font = ITALIC_FONT
+            first_frag.set_font(name=ITALIC_FONT)
         elif "small-caps" in rend or rend == "small-caps":
-            first_frag.features["smallcaps"] = True
+            first_frag.set_features("smallcaps")
         elif "line-through" in rend or rend == "line-through":
-            first_frag.features["strike"] = True
+            first_frag.set_features("strike")
         elif "underline" in rend or rend == "underline":
-            first_frag.features["underline"] = True
+            first_frag.set_features("underline")
         elif "capitale" in rend or rend == "capitale":
-            first_frag.features["allcaps"] = True
+            first_frag.set_features("allcaps")
         elif "bold" in rend or rend == "bold":
-            first_frag.font = BOLD_FONT
+            first_frag.set_font(name=BOLD_FONT)
         elif "sup" in rend or rend == "sup":
-            first_frag.features["superscript"] = True
+            first_frag.set_features("superscript")
         else:
             print("rend:", rend)
 
@@ -183,7 +183,7 @@ def analyse_p(xml, notes, check_notes=True, check_hi=True, check_links=True):
         elif inpara.tag == teitag("ref"):
             if check_links:
                 lf = stories.StoryFragment(text=inpara.text)
-                lf.features["underline"] = True
+                lf.set_features("underline")
                 p_frags.append(lf)
         else:
             print("Inconnu dans p", inpara.tag)
@@ -233,7 +233,7 @@ def analyse_list_item(xml, notes):
         elif inpara.tag == teitag("ref"):
             if check_links:
                 lf = stories.StoryFragment(text=inpara.text)
-                lf.features["underline"] = True
+                lf.set_features("underline")
                 li_frags.append(lf)
         elif inpara.tag == teitag("list"):
             sublist_frags, notes = analyse_list(inpara, notes)